@@ -1,24 +1,87 @@
-import feedparser
-
-from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect
+import signal
+import threading
+from datetime import timezone
+
+import click
+from flask_openapi3 import APIBlueprint, OpenAPI, Info, Tag
+from flask import Response, redirect, request, send_file, stream_with_context, url_for
+from werkzeug.http import http_date
 from flask_cors import CORS
 
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
-from model import Session, Episodio, Profile
-from logger import logger
+from config import (
+    AGENDADOR_CONCORRENCIA,
+    EXPORTACAO_TAMANHO_LOTE,
+    FEED_TIMEOUT,
+    IMPORTACAO_CONCORRENCIA,
+    IMPORTACAO_TAMANHO_LOTE,
+    PUBLICACAO_LINK,
+)
+from model import (
+    Session,
+    SessionLeitura,
+    Capa,
+    Episodio,
+    Importacao,
+    Profile,
+    assinatura_episodio,
+    engine,
+    engine_leitura,
+    init_db,
+    termos_busca,
+)
+from logger import amostrado, configura_logging, logger
+from services.agendador import executa_agendador
+from services.agrupamento import agrupador_insercoes
+from services.cache import cache_respostas, configura_cache
+from services.capas import ORIGINAL, CapaInvalidaError, cache_capas
+from services.compressao import configura_compressao
+from services.consultas import (
+    apresenta_busca_episodios,
+    apresenta_pagina_episodios,
+    consulta_busca_episodios,
+    consulta_duplicado,
+    consulta_episodio,
+    consulta_pagina_episodios,
+    consulta_profile,
+    consulta_versao_dados,
+)
+from services.exportacao import exporta_json, exporta_ndjson
+from services.feed import le_opml
+from services.importacao import importa_feeds
+from services.lote import aplica_operacoes
+from services.metricas import configura_metricas
+from services.publicacao import feed_publicado
+from services.tarefas import FilaCheiaError, enfileira_importacao
 
 from schemas.episodio import (
+    EpisodioBuscaQuery,
+    EpisodioBuscaViewSchema,
+    EpisodioCamposQuery,
     EpisodioDelSchema,
+    EpisodioExportacaoQuery,
+    EpisodioListagemQuery,
+    EpisodioListaViewSchema,
+    EpisodioLoteSchema,
+    EpisodioLoteViewSchema,
     EpisodioSchema,
     EpisodioPath,
     EpisodioViewSchema,
+    apresenta_campos_episodio,
     apresenta_episodio,
-    apresenta_episodios,
+    decodifica_cursor,
 )
+from schemas.capa import CapaPath, CapaQuery
 from schemas.error import ErrorSchema
-from schemas.importacao import ImportacaoFeedSchema, ImportacaoFeedViewSchema
+from schemas.importacao import (
+    ImportacaoFeedSchema,
+    ImportacaoFeedsSchema,
+    ImportacaoFeedsViewSchema,
+    ImportacaoPath,
+    ImportacaoViewSchema,
+    apresenta_importacao,
+)
 from schemas.profile import (
     ProfileSchema,
     ProfileViewSchema,
@@ -27,8 +90,90 @@ from schemas.profile import (
 )
 
 info = Info(title="Poscast API", version="1.0.0")
-app = OpenAPI(__name__, info=info)
-CORS(app)
+
+# rotas da API, registradas no app criado por `create_app`
+api = APIBlueprint("api", __name__)
+
+
+def encerra_sessao(exception=None):
+    """Encerra as sessões da requisição, devolvendo as conexões aos pools"""
+    Session.remove()
+    SessionLeitura.remove()
+
+
+@click.command("init-db")
+@click.option(
+    "--leitura",
+    is_flag=True,
+    help="Inicializa também a base de leitura (DB_URL_LEITURA), quando não é uma réplica gerenciada",
+)
+def init_db_command(leitura):
+    """Cria ou atualiza a base de dados: tabelas, colunas e índices que faltam."""
+    init_db(engine)
+    if leitura and engine_leitura is not engine:
+        init_db(engine_leitura)
+    click.echo("Base de dados inicializada")
+
+
+@click.command("agendador")
+@click.option(
+    "--concorrencia",
+    type=int,
+    default=AGENDADOR_CONCORRENCIA,
+    show_default=True,
+    help="Feeds atualizados ao mesmo tempo",
+)
+@click.option("--uma-vez", is_flag=True, help="Atualiza os feeds vencidos e termina")
+def agendador_command(concorrencia, uma_vez):
+    """Atualiza periodicamente os feeds já importados, cada um no seu intervalo."""
+    parar = threading.Event()
+
+    # termina após as atualizações em andamento
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: parar.set())
+
+    click.echo(f"Agendador iniciado, até {concorrencia} feeds por vez")
+    executa_agendador(concorrencia, uma_vez=uma_vez, parar=parar)
+
+
+def create_app() -> OpenAPI:
+    """Cria e configura o app da API.
+
+    Não acessa a base de dados: ela deve ser criada antes, com `flask init-db`.
+    """
+    configura_logging()
+
+    app = OpenAPI(__name__, info=info)
+    CORS(app)
+
+    app.teardown_appcontext(encerra_sessao)
+
+    # métricas das requisições, dos comandos SQL e das importações, em /metrics
+    configura_metricas(app, [engine, engine_leitura])
+
+    # respostas grandes são comprimidas com brotli ou gzip, conforme o cliente aceitar
+    configura_compressao(app)
+
+    # respostas dos endpoints de leitura ficam em cache até a próxima escrita na
+    # base, feita por este ou por outro processo
+    configura_cache(
+        app,
+        [
+            "api.list_episodios",
+            "api.busca_episodios",
+            "api.get_episodio",
+            "api.get_profile",
+            "api.feed_rss",
+        ],
+        versao_dados=lambda: SessionLeitura().execute(consulta_versao_dados()).scalar(),
+    )
+
+    app.register_api(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(agendador_command)
+
+    return app
+
 
 # Definindo tags
 
@@ -56,15 +201,27 @@ importacao_tag = Tag(
     description="Importação de profile e episódios via feed rss do podcast",
 )
 
+# Tag para endpoints que servem as capas do cache local
+capa_tag = Tag(
+    name="Capa",
+    description="Capas de episódios e do profile, e suas miniaturas, servidas do cache local",
+)
 
-@app.get("/", tags=[home_tag])
+# Tag para o feed rss gerado a partir do catálogo
+publicacao_tag = Tag(
+    name="Publicação",
+    description="Feed rss do podcast, gerado a partir do profile e dos episódios",
+)
+
+
+@api.get("/", tags=[home_tag])
 def home():
     """Redireciona para /openapi, tela que permite a escolha do estilo de documentação."""
     return redirect("/openapi")
 
 
 # Endpoints para Episodio
-@app.post(
+@api.post(
     "/episodios",
     tags=[episodio_tag],
     responses={"200": EpisodioSchema, "409": ErrorSchema, "400": ErrorSchema},
@@ -82,57 +239,79 @@ def add_episodio(form: EpisodioSchema):
 
     logger.debug("Adicionando episódio de título: %s", episodio.titulo)
 
-    try:
-        # criando conexão com a base
-        session = Session()
-        # adidiconando episódio
-        session.add(episodio)
-        # efetivando o comando de adição de novo item na tabela
-        session.commit()
+    # gravado na mesma transação que as inserções simultâneas; títulos e áudios
+    # iguais, a menos de maiúsculas e espaços, são recusados como duplicados
+    resposta, status = agrupador_insercoes.insere(episodio)
 
+    if status == 200:
         logger.debug("Adicionado episódio de título: %s", episodio.titulo)
+    else:
+        logger.warning(
+            "Erro ao adicionar episódio %s, %s", episodio.titulo, resposta["message"]
+        )
 
-        return apresenta_episodio(episodio), 200
+    return resposta, status
 
-    except IntegrityError:
-        # como a duplicidade do nome é a provável razão do IntegrityError
-        error_msg = "Episódio com mesmo título já salvo na base"
 
-        logger.warning("Erro ao adicionar episódio %s, %s", episodio.titulo, error_msg)
+@api.post(
+    "/episodios/lote",
+    tags=[episodio_tag],
+    responses={"200": EpisodioLoteViewSchema, "400": ErrorSchema},
+)
+def lote_episodios(body: EpisodioLoteSchema):
+    """Cria, atualiza e remove vários Episodio em uma única transação
+    Retorna o resultado de cada operação. Uma operação com conflito não impede as demais.
+    """
+    logger.debug("Aplicando lote de %d operações de episódio", len(body.operacoes))
 
-        return {"message": error_msg}, 409
+    # criando conexão com a base
+    session = Session()
 
-    except Exception:
+    try:
+        resultados = aplica_operacoes(session, body.operacoes)
+
+    except Exception as e:
         # caso um erro fora do previsto
-        error_msg = "Não foi possível salvar o episódio"
+        session.rollback()
+        error_msg = "Não foi possível aplicar o lote de episódios"
 
-        logger.warning("Erro ao adicionar episódio %s, %s", episodio.titulo, error_msg)
+        logger.warning("Erro ao aplicar lote de episódios: %s, %s", e, error_msg)
 
         return {"message": error_msg}, 400
 
+    return {"resultados": resultados}, 200
+
 
-@app.get(
+@api.get(
     "/episodios/<int:episodio_id>",
     tags=[episodio_tag],
     responses={"200": EpisodioViewSchema, "404": ErrorSchema},
 )
-def get_episodio(path: EpisodioPath):
+def get_episodio(path: EpisodioPath, query: EpisodioCamposQuery):
     """Faz a busca por um Episodio a partir do id
-    Retorna uma representação do Episodio
+    Retorna uma representação do Episodio, só com os campos pedidos em `fields`
     """
     episodio_id = path.episodio_id
 
-    logger.debug("Buscando dados do episodio com id: %s", episodio_id)
+    logger.debug("Buscando dados do episodio com id: %s", episodio_id, extra=amostrado)
 
-    # criando conexão com a base
-    session = Session()
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
 
     try:
-        # buscando episódio pelo ID
-        episodio = session.query(Episodio).filter(Episodio.id == episodio_id).one()
+        campos = query.campos
+        # com `fields` busca só as colunas pedidas, sem criar objetos ORM
+        linha = session.execute(consulta_episodio(episodio_id, campos)).one()
+
+        if campos:
+            logger.debug("Encotrado episódio com id %s", episodio_id, extra=amostrado)
+
+            return apresenta_campos_episodio(linha, campos), 200
+
+        episodio = linha[0]
         titulo = episodio.titulo
 
-        logger.debug("Encotrado episódio %s", titulo)
+        logger.debug("Encotrado episódio %s", titulo, extra=amostrado)
 
         return apresenta_episodio(episodio), 200
 
@@ -153,33 +332,83 @@ def get_episodio(path: EpisodioPath):
         return {"message": error_msg}, 400
 
 
-@app.get(
+@api.get(
     "/episodios",
     tags=[episodio_tag],
-    responses={"200": EpisodioViewSchema, "404": ErrorSchema},
+    responses={"200": EpisodioListaViewSchema, "400": ErrorSchema},
 )
-def list_episodios():
-    """Faz a busca por todos os Episodio cadastrados
-    Retorna uma representação da listagem de Episodios encontradas.
+def list_episodios(query: EpisodioListagemQuery):
+    """Faz a busca paginada pelos Episodio cadastrados, dos mais novos aos mais antigos
+    Retorna uma representação da página de Episodios encontrados e o cursor da próxima página.
     """
-    logger.debug("Buscando episódios")
+    logger.debug("Buscando episódios", extra=amostrado)
 
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    episodios = session.query(Episodio).order_by(Episodio.data_insercao.desc()).all()
+    cursor = None
+    if query.cursor:
+        try:
+            cursor = decodifica_cursor(query.cursor)
+        except ValueError as e:
+            logger.warning("Erro ao buscar episódios: %s", e)
+            return {"message": str(e)}, 400
+
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
+    resultado = session.execute(
+        consulta_pagina_episodios(query.limit, query.campos, cursor)
+    ).all()
+
+    logger.debug("%d episodios econtrados", min(len(resultado), query.limit), extra=amostrado)
+
+    # retorna a representação dos Episodio
+    return apresenta_pagina_episodios(resultado, query.limit, query.campos), 200
+
+
+@api.get(
+    "/episodios/busca",
+    tags=[episodio_tag],
+    responses={"200": EpisodioBuscaViewSchema, "400": ErrorSchema},
+)
+def busca_episodios(query: EpisodioBuscaQuery):
+    """Faz a busca textual de Episodio pelo título e pela descrição
+    Retorna uma página dos Episodios encontrados, dos mais relevantes aos menos relevantes.
+    """
+    logger.debug("Buscando episódios por: %s", query.q, extra=amostrado)
+
+    termos = termos_busca(query.q)
+    if not termos:
+        return {"message": "Informe ao menos um termo para a busca"}, 400
+
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
+    resultado = session.execute(
+        consulta_busca_episodios(termos, query.limit, query.offset, query.campos)
+    ).all()
+
+    logger.debug("%d episodios econtrados", min(len(resultado), query.limit), extra=amostrado)
+
+    return apresenta_busca_episodios(resultado, query.limit, query.offset, query.campos), 200
+
+
+@api.get("/episodios/exportacao", tags=[episodio_tag])
+def exporta_episodios(query: EpisodioExportacaoQuery):
+    """Exporta o catálogo completo de Episodio
+    A resposta é enviada aos poucos, em NDJSON ou JSON, enquanto os episódios são
+    lidos da base, sem montar o catálogo inteiro na memória.
+    """
+    logger.debug("Exportando episódios em %s", query.formato)
+
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
 
-    if not episodios:
-        # se não há episodios cadastrados
-        return {"episodios": []}, 200
+    if query.formato == "json":
+        corpo, mimetype = exporta_json(session, EXPORTACAO_TAMANHO_LOTE), "application/json"
     else:
-        logger.debug("%d episodios econtrados", len(episodios))
+        corpo, mimetype = exporta_ndjson(session, EXPORTACAO_TAMANHO_LOTE), "application/x-ndjson"
 
-        # retorna a representação dos Episodio
-        return apresenta_episodios(episodios), 200
+    return Response(stream_with_context(corpo), mimetype=mimetype)
 
 
-@app.delete(
+@api.delete(
     "/episodios/<int:episodio_id>",
     tags=[episodio_tag],
     responses={"200": EpisodioDelSchema, "404": ErrorSchema},
@@ -204,6 +433,7 @@ def delete_episodio(path: EpisodioPath):
         # deletando episódio
         session.delete(episodio)
         session.commit()
+        cache_respostas.invalida()
 
         logger.debug("Deletado episódio %s", titulo)
 
@@ -226,10 +456,10 @@ def delete_episodio(path: EpisodioPath):
         return {"message": error_msg}, 400
 
 
-@app.put(
+@api.put(
     "/episodios/<int:episodio_id>",
     tags=[episodio_tag],
-    responses={"200": EpisodioViewSchema, "404": ErrorSchema},
+    responses={"200": EpisodioViewSchema, "404": ErrorSchema, "409": ErrorSchema},
 )
 def update_episodio(path: EpisodioPath, form: EpisodioSchema):
     """Atualiza um Episodio a partir do id
@@ -254,6 +484,12 @@ def update_episodio(path: EpisodioPath, form: EpisodioSchema):
             logger.warning("Erro ao atualizar episódio: %s", error_msg)
             return {"message": error_msg}, 404
 
+        assinatura = assinatura_episodio(form.titulo, form.audio)
+        if session.execute(consulta_duplicado(assinatura, episodio_id)).first():
+            error_msg = "Episódio com mesmo título já salvo na base"
+            logger.warning("Erro ao atualizar episódio %s, %s", episodio_id, error_msg)
+            return {"message": error_msg}, 409
+
         # atualizando informações do episódio
         episodio.titulo = form.titulo
         episodio.audio = form.audio
@@ -261,10 +497,18 @@ def update_episodio(path: EpisodioPath, form: EpisodioSchema):
         episodio.descricao = form.descricao
 
         session.commit()
+        cache_respostas.invalida()
 
         logger.debug("Atualizado episódio com id %s", episodio_id)
         return apresenta_episodio(episodio), 200
 
+    except IntegrityError:
+        # a mesma assinatura, gravada por uma escrita concorrente
+        session.rollback()
+        error_msg = "Episódio com mesmo título já salvo na base"
+        logger.warning("Erro ao atualizar episódio %s, %s", episodio_id, error_msg)
+        return {"message": error_msg}, 409
+
     # trata erro inesperado na atualização
     except Exception as e:
         # reverte em caso de erro
@@ -275,7 +519,7 @@ def update_episodio(path: EpisodioPath, form: EpisodioSchema):
 
 
 # Endpoints para Profile
-@app.post(
+@api.post(
     "/profile",
     tags=[profile_tag],
     responses={
@@ -310,6 +554,7 @@ def add_profile(form: ProfileSchema):
         session.add(profile)
         # efetivando o comando de adição de novo item na tabela
         session.commit()
+        cache_respostas.invalida()
 
         logger.debug("Adicionado profile de nome: %s", profile.nome)
 
@@ -324,7 +569,7 @@ def add_profile(form: ProfileSchema):
         return {"message": error_msg}, 400
 
 
-@app.get(
+@api.get(
     "/profile",
     tags=[profile_tag],
     responses={"200": ProfileViewSchema, "404": ErrorSchema},
@@ -333,25 +578,25 @@ def get_profile():
     """Faz a busca pelo Profile único permitido
     Retorna uma representação do Episodio
     """
-    logger.debug("Buscando profile")
+    logger.debug("Buscando profile", extra=amostrado)
 
-    # criando conexão com a base
-    session = Session()
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
 
     # busca Profile para vê se já está cadastrado
-    profile = session.query(Profile).first()
+    profile = session.execute(consulta_profile()).scalar()
 
     if not profile:
         # se não há Profile cadastrado
         return {}, 200
 
-    logger.debug("%d profile econtrado", profile)
+    logger.debug("Profile %s econtrado", profile.nome, extra=amostrado)
 
     # retorna a representação do Profile
     return apresenta_profile(profile), 200
 
 
-@app.delete(
+@api.delete(
     "/profile",
     tags=[profile_tag],
     responses={"200": ProfileDelSchema, "404": ErrorSchema},
@@ -383,6 +628,7 @@ def delete_profile():
         # deletando profile
         session.delete(profile)
         session.commit()
+        cache_respostas.invalida()
 
         logger.debug("Deletado profile %s", nome)
 
@@ -397,98 +643,203 @@ def delete_profile():
         return {"message": error_msg}, 400
 
 
-@app.post(
+@api.post(
     "/importacoes/feed-rss",
     tags=[importacao_tag],
-    responses={"200": ImportacaoFeedViewSchema, "400": ErrorSchema},
+    responses={"202": ImportacaoViewSchema, "503": ErrorSchema},
 )
 def importar_rss(form: ImportacaoFeedSchema):
+    """Agenda a importação do profile e dos episódios de um feed rss
+    A importação é executada em segundo plano. Retorna a Importacao criada, cujo
+    andamento pode ser acompanhado em GET /importacoes/<id>.
+    """
     rss_feed_url = form.feed
 
+    logger.debug("Agendando importação do feed %s", rss_feed_url)
+
+    # criando conexão com a base
     session = Session()
 
-    # cria uma lista para mandar todo os erros encontrados durante a importação
-    erros_encontrados = []
+    importacao = Importacao(feed=rss_feed_url)
+    session.add(importacao)
+    session.commit()
 
     try:
-        # faz a análise do rss_feed
-        feed = feedparser.parse(rss_feed_url)
-
-        # se não encontrou um título, o feed não é compatível
-        if not feed or "title" not in feed.feed:
-            return {"message": "Feed RSS inválido ou inacessível"}, 400
-
-        # cria perfil com o padrão do rss_feed
-        profile = Profile(
-            nome=feed.channel.title,
-            autor=feed.channel.author,
-            descricao=feed.channel.summary,
-            capa=feed.channel.image.href,
+        enfileira_importacao(
+            importacao.id,
+            form.tamanho_lote or IMPORTACAO_TAMANHO_LOTE,
+            forcar=form.forcar,
+            sincronizar=form.sincronizar,
         )
 
-        # adiciona Profile caso ainda não exista um
-        if session.query(Profile).count() == 0:
-            try:
-                # adidiconando profile
-                session.add(profile)
-                # efetivando o comando de adição de novo item na tabela
-                session.commit()
-
-                logger.debug("Adicionado profile de nome: %s", profile.nome)
-
-            except Exception:
-                # caso um erro fora do previsto
-                error_msg = "Não foi possível salvar o profile"
-
-                logger.warning(
-                    "Erro ao adicionar profile %s, %s", profile.nome, error_msg
-                )
-
-                erros_encontrados.append({"message": error_msg})
-
-        # inicia uma lista para salvar todos os Episodio na base
-        episodios_no_feed = []
-
-        # Fixando a importação em 10 até desenvolvimento de paginação e player
-        for entry in feed.entries[:10]:
-            try:
-                # busca na base se o episodio já existe
-                session.query(Episodio).filter_by(titulo=entry.title).one()
-
-                # se ja existir um episódio com titulo, não adiciona na lista
-                # e também joga o erro para a lista específica
-                erros_encontrados.append(
-                    {"message": f"Episódio com título '{entry.title}' já existe"}
-                )
-
-            except NoResultFound:
-                # se nao encontrou o episódio, cria um com as informações do
-                # feed e adiciona a lista que será adicionada
-                # se não tiver uma capa, fica vazio
-                episodio = Episodio(
-                    titulo=entry.title,
-                    descricao=entry.summary,
-                    capa=getattr(entry, "image", {}).get("href", ""),
-                    audio=entry.links[1].href if len(entry.links) > 1 else "",
-                )
-
-                episodios_no_feed.append(episodio)
-
-        # adiciona todos os episodios que já não existiam
-        session.add_all(episodios_no_feed)
+    except FilaCheiaError as e:
+        # remove a importação que não pôde ser agendada
+        session.delete(importacao)
         session.commit()
 
-        # cria representacao
-        return {
-            "perfil": apresenta_profile(profile) if profile.data_insercao else {},
-            "episodios": (
-                apresenta_episodios(episodios_no_feed).get("episodios", [])
-                if episodios_no_feed
-                else []
-            ),
-            "erros": erros_encontrados,
-        }, 200
-
-    # erro caso o feed não tenha conseguido ser analisado pele feedparser
-    except Exception as e:
-        return {"message": "Erro ao processar o feed RSS", "error": str(e)}, 400
+        logger.warning("Erro ao agendar importação do feed %s: %s", rss_feed_url, e)
+
+        return {"message": str(e)}, 503
+
+    return apresenta_importacao(importacao), 202
+
+
+@api.post(
+    "/importacoes/feeds",
+    tags=[importacao_tag],
+    responses={"200": ImportacaoFeedsViewSchema, "400": ErrorSchema},
+)
+def importar_feeds(form: ImportacaoFeedsSchema):
+    """Importa vários feeds rss, informados em uma lista ou em um arquivo OPML
+    Os feeds são buscados em paralelo. Retorna um relatório da importação de cada feed.
+    """
+    urls = list(form.feeds)
+
+    if form.opml:
+        try:
+            urls.extend(le_opml(form.opml.read()))
+        except Exception as e:
+            logger.warning("Erro ao ler arquivo OPML: %s", e)
+            return {"message": "Arquivo OPML inválido"}, 400
+
+    if not urls:
+        return {"message": "Nenhum feed informado"}, 400
+
+    logger.debug("Importando %d feeds", len(urls))
+
+    # criando conexão com a base
+    session = Session()
+
+    relatorios = importa_feeds(
+        session,
+        urls,
+        form.tamanho_lote or IMPORTACAO_TAMANHO_LOTE,
+        form.concorrencia or IMPORTACAO_CONCORRENCIA,
+        timeout=form.timeout or FEED_TIMEOUT,
+        forcar=form.forcar,
+        sincronizar=form.sincronizar,
+    )
+
+    return {"importacoes": relatorios}, 200
+
+
+@api.get(
+    "/importacoes/<int:importacao_id>",
+    tags=[importacao_tag],
+    responses={"200": ImportacaoViewSchema, "404": ErrorSchema},
+)
+def get_importacao(path: ImportacaoPath):
+    """Faz a busca por uma Importacao a partir do id
+    Retorna o status, as contagens e os erros da importação
+    """
+    importacao_id = path.importacao_id
+
+    # criando conexão com a base
+    session = Session()
+
+    importacao = (
+        session.query(Importacao).filter(Importacao.id == importacao_id).one_or_none()
+    )
+
+    if not importacao:
+        error_msg = f"Importação com ID {importacao_id} não encontrada"
+        logger.warning("Erro ao buscar importação: %s", error_msg)
+        return {"message": error_msg}, 404
+
+    return apresenta_importacao(importacao), 200
+
+
+# Endpoints para Capa
+@api.get(
+    "/capas",
+    tags=[capa_tag],
+    responses={"302": None, "404": ErrorSchema, "502": ErrorSchema},
+)
+def get_capa_por_url(query: CapaQuery):
+    """Redireciona para a capa, ou uma miniatura, no cache local
+    Na primeira vez, a capa é buscada no endereço de origem e as miniaturas são geradas.
+    """
+    url = query.url
+
+    # criando conexão com a base
+    session = Session()
+
+    # só busca capas usadas na base, para não baixar endereços arbitrários;
+    # a maioria das requisições é de capas já guardadas no cache
+    usada = (
+        session.query(Capa.id).filter(Capa.url == url).first()
+        or session.query(Profile.id).filter(Profile.capa == url).first()
+        or session.query(Episodio.id).filter(Episodio.capa == url).first()
+    )
+    if not usada:
+        error_msg = "Capa não encontrada"
+        logger.warning("Erro ao buscar capa '%s', %s", url, error_msg)
+        return {"message": error_msg}, 404
+
+    try:
+        capa = cache_capas.obtem(session, url)
+    except CapaInvalidaError as e:
+        logger.warning("Erro ao buscar capa '%s', %s", url, e)
+        return {"message": "Não foi possível obter a capa"}, 502
+
+    resposta = redirect(
+        url_for(
+            "api.get_capa",
+            hash_conteudo=capa.hash_conteudo,
+            tamanho=query.tamanho or ORIGINAL,
+        )
+    )
+    # o conteúdo no endereço de origem pode mudar; o da capa redirecionada, não
+    resposta.headers["Cache-Control"] = "public, max-age=86400"
+    return resposta
+
+
+@api.get(
+    "/capas/<hash_conteudo>/<tamanho>",
+    tags=[capa_tag],
+    responses={"200": None, "404": ErrorSchema, "502": ErrorSchema},
+)
+def get_capa(path: CapaPath):
+    """Retorna a capa, ou uma miniatura, a partir do hash do conteúdo
+    O conteúdo de um endereço nunca muda, e pode ficar em cache no cliente indefinidamente.
+    """
+    # criando conexão com a base
+    session = Session()
+
+    if path.tamanho != ORIGINAL and path.tamanho not in map(str, cache_capas.tamanhos):
+        return {"message": "Tamanho de capa não disponível"}, 404
+
+    try:
+        arquivo = cache_capas.arquivo(session, path.hash_conteudo, path.tamanho)
+    except CapaInvalidaError as e:
+        logger.warning("Erro ao buscar capa %s, %s", path.hash_conteudo, e)
+        return {"message": "Não foi possível obter a capa"}, 502
+
+    if not arquivo:
+        return {"message": "Capa não encontrada"}, 404
+
+    resposta = send_file(
+        arquivo.caminho,
+        mimetype=arquivo.mimetype,
+        etag=f"{path.hash_conteudo}-{path.tamanho}",
+        conditional=True,
+    )
+    resposta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resposta
+
+
+# Endpoint do feed publicado
+@api.get("/feed.xml", tags=[publicacao_tag], responses={"200": None, "304": None})
+def feed_rss():
+    """Publica o catálogo como um feed rss de podcast
+    Só os episódios novos ou alterados desde a última geração são renderizados, e o
+    feed fica em cache até a próxima escrita, com ETag e Last-Modified.
+    """
+    # criando conexão com a base de leitura
+    session = SessionLeitura()
+
+    corpo, atualizado_em = feed_publicado.gera(session, PUBLICACAO_LINK or request.host_url)
+
+    resposta = Response(corpo, mimetype="application/rss+xml")
+    resposta.headers["Last-Modified"] = http_date(atualizado_em.replace(tzinfo=timezone.utc))
+    return resposta
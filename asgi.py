@@ -0,0 +1,424 @@
+import asyncio
+import contextlib
+import functools
+import time
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import NoResultFound
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from config import (
+    FEED_TIMEOUT,
+    IMPORTACAO_ASYNC_MAX,
+    IMPORTACAO_CONCORRENCIA,
+    IMPORTACAO_TAMANHO_LOTE,
+)
+from model import Importacao, Session, termos_busca
+from model.assincrono import SessionLeituraAsync, engine_leitura_async
+from logger import amostrado, logger
+from services.cache import RespostaCacheada, cache_respostas, calcula_etag, confere_etag
+from services.compressao import escolhe_representacao
+from services.consultas import (
+    apresenta_busca_episodios,
+    apresenta_pagina_episodios,
+    consulta_busca_episodios,
+    consulta_episodio,
+    consulta_pagina_episodios,
+    consulta_profile,
+    consulta_versao_dados,
+)
+from services.feed import le_opml
+from services.importacao_assincrona import (
+    aguarda_importacoes,
+    enfileira_importacao_async,
+    importa_feeds_async,
+)
+from services.metricas import (
+    REQUISICAO_DURACAO,
+    REQUISICOES_EM_ANDAMENTO,
+    RESPOSTA_BYTES,
+    instrumenta_engine,
+)
+from services.tarefas import FilaCheiaError
+
+from app import create_app
+from schemas.episodio import (
+    EpisodioBuscaQuery,
+    EpisodioCamposQuery,
+    EpisodioListagemQuery,
+    apresenta_campos_episodio,
+    apresenta_episodio,
+    decodifica_cursor,
+)
+from schemas.importacao import (
+    ImportacaoFeedSchema,
+    ImportacaoFeedsSchema,
+    apresenta_importacao,
+)
+from schemas.profile import apresenta_profile
+
+# Modo ASGI da API, servido por `uvicorn --factory asgi:create_asgi_app`.
+#
+# Os endpoints de leitura e de importação, que passam a maior parte do tempo
+# esperando a base ou os servidores dos feeds, são atendidos aqui, no loop de
+# eventos, sem uma thread por requisição. As demais rotas, e a documentação, são
+# repassadas ao app WSGI de `create_app`. Rotas, parâmetros e respostas são os
+# mesmos do app WSGI, validados pelos mesmos schemas.
+
+
+def _parametros(schema, valores) -> dict:
+    """Extrai de `valores` (query string ou formulário) os campos do schema, como
+    o flask-openapi3 faz no app WSGI. Arquivos são lidos à parte.
+    """
+    parametros = {}
+    for campo, propriedades in schema.schema().get("properties", {}).items():
+        if propriedades.get("format") == "binary":
+            continue
+
+        if propriedades.get("type") == "array":
+            valor = valores.getlist(campo) or None
+        else:
+            valor = valores.get(campo)
+
+        if valor is not None:
+            parametros[campo] = valor
+
+    return parametros
+
+
+def _query(schema, request: Request) -> BaseModel:
+    return schema(**_parametros(schema, request.query_params))
+
+
+def _com_etag(request: Request, entrada: RespostaCacheada) -> Response:
+    representacao = entrada.representacao(request.headers.get("Accept-Encoding"))
+
+    if confere_etag(request.headers.get("If-None-Match"), representacao.etag):
+        resposta = Response(status_code=304)
+        representacao.aplica(resposta.headers, com_corpo=False)
+    else:
+        resposta = Response(
+            representacao.corpo, status_code=entrada.status, media_type=entrada.mimetype
+        )
+        representacao.aplica(resposta.headers)
+
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
+
+
+def _comprimida(request: Request, resposta: Response) -> Response:
+    representacao = escolhe_representacao(
+        resposta.body,
+        resposta.media_type,
+        None,
+        request.headers.get("Accept-Encoding"),
+    )
+    if not representacao.codificacao:
+        return resposta
+
+    comprimida = Response(
+        representacao.corpo,
+        status_code=resposta.status_code,
+        media_type=resposta.media_type,
+    )
+    representacao.aplica(comprimida.headers)
+    return comprimida
+
+
+async def _responde(request: Request, handler, cacheavel: bool) -> Response:
+    # mesma chave do cache do app WSGI, o `request.full_path` do flask
+    chave = f"{request.url.path}?{request.url.query}"
+    cacheavel = cacheavel and request.method == "GET"
+
+    if cacheavel:
+        async with SessionLeituraAsync() as session:
+            versao_dados = await session.scalar(consulta_versao_dados())
+
+        versao = cache_respostas.versao_atual(versao_dados)
+        entrada = cache_respostas.obtem(chave, versao)
+        if entrada is not None:
+            return _com_etag(request, entrada)
+
+    try:
+        dados, status = await handler(request)
+    except ValidationError as e:
+        return Response(e.json(), status_code=422, media_type="application/json")
+
+    resposta = JSONResponse(dados, status_code=status)
+
+    if not cacheavel or status != 200:
+        return _comprimida(request, resposta)
+
+    entrada = RespostaCacheada(
+        corpo=resposta.body,
+        status=status,
+        mimetype="application/json",
+        etag=calcula_etag(resposta.body),
+    )
+    cache_respostas.guarda(chave, entrada, versao)
+
+    return _com_etag(request, entrada)
+
+
+def rota(endpoint: str, cacheavel: bool = False):
+    """Adapta um handler assíncrono que retorna (dados, status), como as rotas do
+    app WSGI, medindo a requisição com o mesmo `endpoint` nas métricas e, com
+    `cacheavel`, usando o cache de respostas e os ETags do app WSGI
+    """
+
+    def decorador(handler):
+        @functools.wraps(handler)
+        async def executa(request: Request) -> Response:
+            metodo, inicio, status = request.method, time.perf_counter(), 500
+            REQUISICOES_EM_ANDAMENTO.labels(metodo, endpoint).inc()
+
+            try:
+                resposta = await _responde(request, handler, cacheavel)
+                status = resposta.status_code
+                RESPOSTA_BYTES.labels(metodo, endpoint).inc(len(resposta.body))
+                return resposta
+
+            finally:
+                REQUISICAO_DURACAO.labels(metodo, endpoint, str(status)).observe(
+                    time.perf_counter() - inicio
+                )
+                REQUISICOES_EM_ANDAMENTO.labels(metodo, endpoint).dec()
+
+        return executa
+
+    return decorador
+
+
+# Endpoints de leitura
+
+
+@rota("api.get_episodio", cacheavel=True)
+async def get_episodio(request: Request):
+    """Faz a busca por um Episodio a partir do id"""
+    episodio_id = request.path_params["episodio_id"]
+    query = _query(EpisodioCamposQuery, request)
+
+    logger.debug("Buscando dados do episodio com id: %s", episodio_id, extra=amostrado)
+
+    try:
+        async with SessionLeituraAsync() as session:
+            resultado = await session.execute(consulta_episodio(episodio_id, query.campos))
+            linha = resultado.one()
+
+    except NoResultFound:
+        # se não encontrou o episódio ao buscar pelo `one()`
+        error_msg = f"Episódio com ID {episodio_id} não encontrado"
+
+        logger.warning("Erro ao buscar episódio: %s", error_msg)
+
+        return {"message": error_msg}, 404
+
+    except Exception:
+        # caso um erro fora do previsto
+        error_msg = "Não foi possível encontrar o episódio"
+
+        logger.warning("Erro ao buscar episódio com ID %s, %s", episodio_id, error_msg)
+
+        return {"message": error_msg}, 400
+
+    if query.campos:
+        return apresenta_campos_episodio(linha, query.campos), 200
+
+    return apresenta_episodio(linha[0]), 200
+
+
+@rota("api.list_episodios", cacheavel=True)
+async def list_episodios(request: Request):
+    """Faz a busca paginada pelos Episodio cadastrados, dos mais novos aos mais antigos"""
+    query = _query(EpisodioListagemQuery, request)
+
+    cursor = None
+    if query.cursor:
+        try:
+            cursor = decodifica_cursor(query.cursor)
+        except ValueError as e:
+            logger.warning("Erro ao buscar episódios: %s", e)
+            return {"message": str(e)}, 400
+
+    async with SessionLeituraAsync() as session:
+        resultado = await session.execute(
+            consulta_pagina_episodios(query.limit, query.campos, cursor)
+        )
+        resultado = resultado.all()
+
+    logger.debug("%d episodios econtrados", min(len(resultado), query.limit), extra=amostrado)
+
+    return apresenta_pagina_episodios(resultado, query.limit, query.campos), 200
+
+
+@rota("api.busca_episodios", cacheavel=True)
+async def busca_episodios(request: Request):
+    """Faz a busca textual de Episodio pelo título e pela descrição"""
+    query = _query(EpisodioBuscaQuery, request)
+
+    termos = termos_busca(query.q)
+    if not termos:
+        return {"message": "Informe ao menos um termo para a busca"}, 400
+
+    async with SessionLeituraAsync() as session:
+        resultado = await session.execute(
+            consulta_busca_episodios(termos, query.limit, query.offset, query.campos)
+        )
+        resultado = resultado.all()
+
+    logger.debug("%d episodios econtrados", min(len(resultado), query.limit), extra=amostrado)
+
+    return apresenta_busca_episodios(resultado, query.limit, query.offset, query.campos), 200
+
+
+@rota("api.get_profile", cacheavel=True)
+async def get_profile(request: Request):
+    """Faz a busca pelo Profile único permitido"""
+    async with SessionLeituraAsync() as session:
+        profile = (await session.execute(consulta_profile())).scalar()
+
+    if not profile:
+        # se não há Profile cadastrado
+        return {}, 200
+
+    return apresenta_profile(profile), 200
+
+
+# Endpoints de importação
+
+
+def _cria_importacao(feed: str) -> dict:
+    session = Session()
+    try:
+        importacao = Importacao(feed=feed)
+        session.add(importacao)
+        session.commit()
+        return apresenta_importacao(importacao)
+    finally:
+        Session.remove()
+
+
+def _remove_importacao(importacao_id: int):
+    session = Session()
+    try:
+        session.query(Importacao).filter(Importacao.id == importacao_id).delete()
+        session.commit()
+    finally:
+        Session.remove()
+
+
+@rota("api.importar_rss")
+async def importar_rss(request: Request):
+    """Agenda a importação do profile e dos episódios de um feed rss.
+    A busca do feed é feita no loop de eventos, sem ocupar um worker.
+    """
+    form = ImportacaoFeedSchema(**_parametros(ImportacaoFeedSchema, await request.form()))
+
+    logger.debug("Agendando importação do feed %s", form.feed)
+
+    importacao = await asyncio.to_thread(_cria_importacao, form.feed)
+
+    try:
+        enfileira_importacao_async(
+            request.app.state.cliente,
+            importacao["id"],
+            form.tamanho_lote or IMPORTACAO_TAMANHO_LOTE,
+            forcar=form.forcar,
+            sincronizar=form.sincronizar,
+        )
+
+    except FilaCheiaError as e:
+        # remove a importação que não pôde ser agendada
+        await asyncio.to_thread(_remove_importacao, importacao["id"])
+
+        logger.warning("Erro ao agendar importação do feed %s: %s", form.feed, e)
+
+        return {"message": str(e)}, 503
+
+    return importacao, 202
+
+
+@rota("api.importar_feeds")
+async def importar_feeds(request: Request):
+    """Importa vários feeds rss, informados em uma lista ou em um arquivo OPML"""
+    formulario = await request.form()
+    form = ImportacaoFeedsSchema(**_parametros(ImportacaoFeedsSchema, formulario))
+
+    urls = list(form.feeds)
+
+    opml = formulario.get("opml")
+    if opml is not None and hasattr(opml, "read"):
+        try:
+            urls.extend(le_opml(await opml.read()))
+        except Exception as e:
+            logger.warning("Erro ao ler arquivo OPML: %s", e)
+            return {"message": "Arquivo OPML inválido"}, 400
+
+    if not urls:
+        return {"message": "Nenhum feed informado"}, 400
+
+    logger.debug("Importando %d feeds", len(urls))
+
+    relatorios = await importa_feeds_async(
+        request.app.state.cliente,
+        urls,
+        form.tamanho_lote or IMPORTACAO_TAMANHO_LOTE,
+        form.concorrencia or IMPORTACAO_CONCORRENCIA,
+        timeout=form.timeout or FEED_TIMEOUT,
+        forcar=form.forcar,
+        sincronizar=form.sincronizar,
+    )
+
+    return {"importacoes": relatorios}, 200
+
+
+@contextlib.asynccontextmanager
+async def ciclo_de_vida(app: Starlette):
+    # um único cliente http, com as conexões reaproveitadas entre as importações
+    async with httpx.AsyncClient(
+        headers={"User-Agent": "feedcast-api"},
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=IMPORTACAO_ASYNC_MAX),
+    ) as cliente:
+        app.state.cliente = cliente
+        yield
+        await aguarda_importacoes()
+
+    await engine_leitura_async.dispose()
+
+
+def create_asgi_app() -> Starlette:
+    """Cria o app ASGI da API, que repassa ao app WSGI as rotas não atendidas
+    aqui. Assim como `create_app`, não acessa a base de dados.
+    """
+    # os comandos SQL da engine assíncrona entram nas métricas totais
+    instrumenta_engine(engine_leitura_async.sync_engine)
+
+    rotas = [
+        Route("/episodios", list_episodios, methods=["GET"]),
+        Route("/episodios/busca", busca_episodios, methods=["GET"]),
+        Route("/episodios/{episodio_id:int}", get_episodio, methods=["GET"]),
+        Route("/profile", get_profile, methods=["GET"]),
+        Route("/importacoes/feed-rss", importar_rss, methods=["POST"]),
+        Route("/importacoes/feeds", importar_feeds, methods=["POST"]),
+        # as demais rotas, inclusive os outros métodos das rotas acima
+        Mount("/", WSGIMiddleware(create_app())),
+    ]
+
+    return Starlette(
+        routes=rotas,
+        # os mesmos cabeçalhos CORS do app WSGI, também nas rotas assíncronas
+        middleware=[
+            Middleware(
+                CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
+            )
+        ],
+        lifespan=ciclo_de_vida,
+    )
@@ -0,0 +1,254 @@
+"""Benchmarks reproduzíveis da importação de feeds e dos endpoints de leitura.
+
+Cada execução usa uma base sqlite nova em um diretório temporário e grava os
+resultados em um arquivo json, que pode ser comparado com o de outra execução
+por `benchmarks/compara.py`.
+
+Uso:
+    python -m benchmarks.bench --saida resultados.json
+    python -m benchmarks.bench --feeds 10,1000 --bases 10000 --requisicoes 100
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.gera_rss import PALAVRAS, gera_rss, texto_aleatorio  # noqa: E402
+
+
+def _lista_inteiros(valor: str):
+    return [int(item) for item in valor.split(",") if item]
+
+
+def percentis(amostras_ms: list) -> dict:
+    """Resume as latências, em milissegundos, de uma série de requisições"""
+    quantis = statistics.quantiles(amostras_ms, n=100, method="inclusive")
+    return {
+        "requisicoes": len(amostras_ms),
+        "media_ms": round(statistics.fmean(amostras_ms), 3),
+        "p50_ms": round(quantis[49], 3),
+        "p99_ms": round(quantis[98], 3),
+        "max_ms": round(max(amostras_ms), 3),
+    }
+
+
+def mede_importacao(diretorio: str, entradas: int, tamanho_lote: int) -> dict:
+    """Importa um feed sintético com `entradas` itens, lido de um arquivo local"""
+    from model import Session
+    from services.importacao import importa_feed
+
+    caminho = os.path.join(diretorio, f"feed-{entradas}.xml")
+    # o prefixo evita que episódios de feeds anteriores sejam tratados como repetidos
+    gera_rss(caminho, entradas, prefixo=f"Importação {entradas}")
+
+    session = Session()
+    inicio = time.perf_counter()
+    resultado = importa_feed(session, caminho, tamanho_lote, forcar=True, arquivo_local=True)
+    segundos = time.perf_counter() - inicio
+    Session.remove()
+
+    return {
+        "entradas": entradas,
+        "adicionados": len(resultado["episodios"]),
+        "segundos": round(segundos, 4),
+        "episodios_por_segundo": round(entradas / segundos, 1),
+    }
+
+
+def limpa_episodios():
+    """Remove os episódios e feeds gravados pelos benchmarks de importação"""
+    from model import engine
+
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("DELETE FROM episodio")
+        conexao.exec_driver_sql("DELETE FROM feed")
+
+
+def popula_base(total: int, semente: int = 42):
+    """Completa a tabela de episódios até `total` linhas, com inserções em massa"""
+    from model import Episodio, assinatura_episodio, engine
+
+    gerador = random.Random(semente)
+
+    with engine.begin() as conexao:
+        atual = conexao.exec_driver_sql("SELECT count(*) FROM episodio").scalar()
+
+        for inicio in range(atual, total, 10000):
+            fim = min(inicio + 10000, total)
+            episodios = [
+                {
+                    "titulo": f"Base {numero} - {texto_aleatorio(gerador, 4)}",
+                    "descricao": texto_aleatorio(gerador, 40),
+                    "capa": f"https://example.com/capas/{numero}.jpg",
+                    "audio": f"https://example.com/audios/{numero}.mp3",
+                }
+                for numero in range(inicio, fim)
+            ]
+            # sem o ORM a assinatura não é calculada pelo modelo
+            for episodio in episodios:
+                episodio["assinatura"] = assinatura_episodio(
+                    episodio["titulo"], episodio["audio"]
+                )
+
+            conexao.execute(Episodio.__table__.insert(), episodios)
+
+
+def mede_requisicoes(cliente, urls: list) -> dict:
+    """Mede a latência de cada GET pelo test client, sem o cache de respostas"""
+    from services.cache import cache_respostas
+
+    amostras = []
+    for url in urls:
+        # mede o caminho completo até a base, não o cache em memória
+        cache_respostas.invalida()
+
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        amostras.append((time.perf_counter() - inicio) * 1000)
+
+        if resposta.status_code != 200:
+            raise RuntimeError(f"GET {url} retornou {resposta.status_code}")
+
+    return percentis(amostras)
+
+
+def mede_leituras(total: int, requisicoes: int, semente: int = 42) -> list:
+    """Mede a latência dos endpoints de leitura com `total` episódios na base"""
+    from app import create_app
+    from model import Episodio, Session
+    from schemas.episodio import codifica_cursor
+    from sqlalchemy import String, type_coerce
+
+    gerador = random.Random(semente)
+    cliente = create_app().test_client()
+
+    session = Session()
+    ids = [episodio_id for (episodio_id,) in session.query(Episodio.id)]
+    # cursor que aponta para o meio da listagem, para medir uma página profunda
+    meio = (
+        session.query(Episodio.id, type_coerce(Episodio.data_insercao, String))
+        .order_by(Episodio.data_insercao.desc(), Episodio.id.desc())
+        .offset(total // 2)
+        .first()
+    )
+    Session.remove()
+
+    cursor = codifica_cursor(meio[1], meio[0])
+
+    cenarios = {
+        "list_episodios": ["/episodios?limit=20"] * requisicoes,
+        "list_episodios_pagina_profunda": [f"/episodios?limit=20&cursor={cursor}"]
+        * requisicoes,
+        "list_episodios_fields": ["/episodios?limit=20&fields=id,titulo,capa"]
+        * requisicoes,
+        "get_episodio": [
+            f"/episodios/{gerador.choice(ids)}" for _ in range(requisicoes)
+        ],
+        "busca_episodios": [
+            f"/episodios/busca?q={gerador.choice(PALAVRAS)}&limit=20"
+            for _ in range(requisicoes)
+        ],
+        "get_profile": ["/profile"] * requisicoes,
+    }
+
+    resultados = []
+    for endpoint, urls in cenarios.items():
+        resultado = mede_requisicoes(cliente, urls)
+        resultados.append({"episodios_na_base": total, "endpoint": endpoint, **resultado})
+        print(
+            f"  {endpoint}: p50 {resultado['p50_ms']} ms, p99 {resultado['p99_ms']} ms",
+            flush=True,
+        )
+
+    return resultados
+
+
+def metadados() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "data": datetime.utcnow().isoformat() + "Z",
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saida", default="bench_output.json", help="arquivo json de resultados")
+    parser.add_argument("--feeds", type=_lista_inteiros, default=[10, 1000, 50000],
+                        help="quantidade de entradas dos feeds importados")
+    parser.add_argument("--bases", type=_lista_inteiros, default=[10000, 100000, 1000000],
+                        help="quantidade de episódios na base nas medições de leitura")
+    parser.add_argument("--requisicoes", type=int, default=200,
+                        help="requisições por endpoint em cada medição")
+    parser.add_argument("--tamanho-lote", type=int, default=500,
+                        help="tamanho do lote da importação")
+    args = parser.parse_args()
+
+    saida = os.path.abspath(args.saida)
+    resultados = {"metadados": metadados(), "importacao": [], "leitura": []}
+
+    with tempfile.TemporaryDirectory(prefix="feedcast-bench-") as diretorio:
+        # a base é sempre um sqlite novo no diretório temporário, mesmo com
+        # DB_URL definida no ambiente; precisa ser definida antes de importar o
+        # config e o model, que criam a engine na importação
+        os.environ["DB_URL"] = "sqlite:///" + os.path.join(diretorio, "bench.sqlite3")
+        os.environ.pop("DB_URL_LEITURA", None)
+        os.environ.pop("DB_URL_ASYNC", None)
+        # os logs também ficam no diretório temporário
+        os.chdir(diretorio)
+
+        from model import engine, init_db
+
+        init_db(engine)
+
+        print("Importação:", flush=True)
+        for entradas in args.feeds:
+            resultado = mede_importacao(diretorio, entradas, args.tamanho_lote)
+            resultados["importacao"].append(resultado)
+            print(
+                f"  {entradas} entradas: {resultado['segundos']} s, "
+                f"{resultado['episodios_por_segundo']} episódios/s",
+                flush=True,
+            )
+
+        limpa_episodios()
+
+        # a base cresce a cada medição, do menor para o maior tamanho
+        for total in sorted(args.bases):
+            print(f"Leitura com {total} episódios:", flush=True)
+            popula_base(total)
+            resultados["leitura"].extend(mede_leituras(total, args.requisicoes))
+
+        os.chdir(RAIZ)
+
+    with open(saida, "w") as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    print(f"Resultados gravados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
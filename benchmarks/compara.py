@@ -0,0 +1,84 @@
+"""Compara dois arquivos de resultados de `benchmarks/bench.py`.
+
+Termina com código 1 se alguma medição piorou além da tolerância, para que
+possa ser usado antes do deploy.
+
+Uso:
+    python -m benchmarks.compara base.json novo.json --tolerancia 0.2
+"""
+import argparse
+import json
+import sys
+
+
+def _indexa(resultados: dict) -> dict:
+    """Retorna as medições comparáveis, pela chave que as identifica"""
+    medicoes = {}
+
+    for item in resultados.get("importacao", []):
+        # na importação, quanto maior a vazão melhor; compara o tempo total
+        medicoes[("importacao", item["entradas"], "segundos")] = item["segundos"]
+
+    for item in resultados.get("leitura", []):
+        chave = ("leitura", item["episodios_na_base"], item["endpoint"])
+        medicoes[chave + ("p50_ms",)] = item["p50_ms"]
+        medicoes[chave + ("p99_ms",)] = item["p99_ms"]
+
+    return medicoes
+
+
+def compara(base: dict, novo: dict, tolerancia: float) -> list:
+    """Retorna as medições presentes nos dois resultados, com a variação e se
+    ela é uma regressão
+    """
+    medicoes_base = _indexa(base)
+    medicoes_novo = _indexa(novo)
+
+    comparacoes = []
+    for chave, valor_base in medicoes_base.items():
+        if chave not in medicoes_novo or not valor_base:
+            continue
+
+        valor_novo = medicoes_novo[chave]
+        variacao = (valor_novo - valor_base) / valor_base
+        comparacoes.append(
+            {
+                "medicao": "/".join(str(parte) for parte in chave),
+                "base": valor_base,
+                "novo": valor_novo,
+                "variacao": variacao,
+                "regressao": variacao > tolerancia,
+            }
+        )
+
+    return comparacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", help="resultados de referência")
+    parser.add_argument("novo", help="resultados a comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="piora relativa aceita antes de apontar regressão")
+    args = parser.parse_args()
+
+    with open(args.base) as arquivo:
+        base = json.load(arquivo)
+    with open(args.novo) as arquivo:
+        novo = json.load(arquivo)
+
+    comparacoes = compara(base, novo, args.tolerancia)
+
+    for item in comparacoes:
+        marcador = "REGRESSÃO" if item["regressao"] else "ok"
+        print(
+            f"{marcador:10} {item['medicao']}: {item['base']} -> {item['novo']} "
+            f"({item['variacao']:+.1%})"
+        )
+
+    if any(item["regressao"] for item in comparacoes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
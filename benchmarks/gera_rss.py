@@ -0,0 +1,67 @@
+"""Gera feeds rss sintéticos em disco para os benchmarks de importação.
+
+Uso:
+    python -m benchmarks.gera_rss 1000 /tmp/feed-1000.xml
+"""
+import random
+import sys
+from xml.sax.saxutils import escape
+
+# vocabulário usado para gerar títulos e descrições com termos buscáveis
+PALAVRAS = (
+    "podcast nerd cinema games ciência história música política tecnologia "
+    "espaço dragões guerra futebol livros séries quadrinhos viagem comida "
+    "programação inteligência artificial economia saúde filosofia mitologia"
+).split()
+
+CABECALHO = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+<channel>
+<title>{titulo}</title>
+<link>https://example.com</link>
+<description>Feed sintético para benchmark</description>
+<itunes:author>Benchmark</itunes:author>
+<itunes:summary>Feed sintético para benchmark</itunes:summary>
+<itunes:image href="https://example.com/capa.jpg"/>
+"""
+
+ITEM = """<item>
+<title>{titulo}</title>
+<guid isPermaLink="false">{guid}</guid>
+<link>https://example.com/episodios/{numero}</link>
+<description>{descricao}</description>
+<pubDate>Mon, 01 Jan 2024 10:00:00 +0000</pubDate>
+<itunes:image href="https://example.com/capas/{numero}.jpg"/>
+<enclosure url="https://example.com/audios/{numero}.mp3" length="1000" type="audio/mpeg"/>
+</item>
+"""
+
+
+def texto_aleatorio(gerador: random.Random, palavras: int) -> str:
+    return " ".join(gerador.choice(PALAVRAS) for _ in range(palavras))
+
+
+def gera_rss(caminho: str, entradas: int, prefixo: str = "Episódio", semente: int = 42):
+    """Grava em `caminho` um feed rss com `entradas` itens, do mais novo ao mais antigo.
+    A `semente` torna o conteúdo reproduzível entre execuções.
+    """
+    gerador = random.Random(semente)
+
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(CABECALHO.format(titulo=escape(f"{prefixo} - feed sintético")))
+
+        for numero in range(entradas, 0, -1):
+            arquivo.write(
+                ITEM.format(
+                    titulo=escape(f"{prefixo} {numero} - {texto_aleatorio(gerador, 4)}"),
+                    guid=f"{prefixo}-{numero}",
+                    numero=numero,
+                    descricao=escape(texto_aleatorio(gerador, 40)),
+                )
+            )
+
+        arquivo.write("</channel>\n</rss>\n")
+
+
+if __name__ == "__main__":
+    gera_rss(sys.argv[2], int(sys.argv[1]))
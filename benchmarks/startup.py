@@ -0,0 +1,90 @@
+"""Mede o tempo de inicialização da aplicação, como em um worker novo.
+
+Cada amostra roda em um processo python novo, sem módulos em cache, e mede
+separadamente o `import app` e a chamada a `create_app()`.
+
+Uso:
+    python -m benchmarks.startup --saida startup.json
+    python -m benchmarks.startup --execucoes 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.bench import metadados  # noqa: E402
+
+# executado em cada processo novo; imprime os tempos em json
+MEDICAO = """
+import json, sys, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+create_app()
+criado = time.perf_counter()
+print(json.dumps({"import_ms": (importado - inicio) * 1000,
+                  "create_app_ms": (criado - importado) * 1000,
+                  "total_ms": (criado - inicio) * 1000}))
+"""
+
+
+def mede_inicializacao(diretorio: str) -> dict:
+    """Inicia um processo novo e retorna os tempos medidos nele"""
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, PYTHONDONTWRITEBYTECODE="")
+    resultado = subprocess.run(
+        [sys.executable, "-c", MEDICAO],
+        cwd=diretorio,
+        env=ambiente,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def resume(amostras: list) -> dict:
+    resumo = {"execucoes": len(amostras)}
+
+    for medicao in ("import_ms", "create_app_ms", "total_ms"):
+        valores = [amostra[medicao] for amostra in amostras]
+        resumo[medicao] = {
+            "p50": round(statistics.median(valores), 3),
+            "min": round(min(valores), 3),
+            "max": round(max(valores), 3),
+        }
+
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saida", default="startup_output.json", help="arquivo json de resultados")
+    parser.add_argument("--execucoes", type=int, default=10,
+                        help="quantidade de processos iniciados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="feedcast-startup-") as diretorio:
+        # a primeira execução aquece o cache de bytecode e o do sistema de arquivos
+        mede_inicializacao(diretorio)
+        amostras = [mede_inicializacao(diretorio) for _ in range(args.execucoes)]
+
+    resultados = {"metadados": metadados(), "inicializacao": resume(amostras)}
+
+    for medicao, valores in resultados["inicializacao"].items():
+        if isinstance(valores, dict):
+            print(f"  {medicao}: p50 {valores['p50']} ms, max {valores['max']} ms")
+
+    with open(os.path.abspath(args.saida), "w") as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    print(f"Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
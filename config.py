@@ -0,0 +1,140 @@
+import os
+
+# quantidade de episódios verificados e gravados por lote durante a importação
+IMPORTACAO_TAMANHO_LOTE = int(os.environ.get("IMPORTACAO_TAMANHO_LOTE", 500))
+
+# tempo máximo, em segundos, para buscar um feed rss
+FEED_TIMEOUT = float(os.environ.get("FEED_TIMEOUT", 30))
+
+# bytes de um feed baixado mantidos em memória; o restante vai para um arquivo temporário
+FEED_MEMORIA_MAX = int(os.environ.get("FEED_MEMORIA_MAX", 1024 * 1024))
+
+# endereço do site do podcast, no <link> do feed publicado em /feed.xml; vazio
+# usa o endereço da própria API
+PUBLICACAO_LINK = os.environ.get("PUBLICACAO_LINK", "")
+
+# quantidade de episódios alterados lidos da base por vez ao gerar o /feed.xml
+PUBLICACAO_TAMANHO_LOTE = int(os.environ.get("PUBLICACAO_TAMANHO_LOTE", 500))
+
+# quantidade de importações executadas em paralelo em segundo plano
+IMPORTACAO_WORKERS = int(os.environ.get("IMPORTACAO_WORKERS", 2))
+
+# quantidade de importações que podem aguardar na fila por um worker livre
+IMPORTACAO_FILA = int(os.environ.get("IMPORTACAO_FILA", 20))
+
+# quantidade de feeds buscados em paralelo na importação de vários feeds
+IMPORTACAO_CONCORRENCIA = int(os.environ.get("IMPORTACAO_CONCORRENCIA", 8))
+
+# quantidade de importações em andamento ao mesmo tempo no modo ASGI, em que a
+# busca dos feeds não ocupa uma thread
+IMPORTACAO_ASYNC_MAX = int(os.environ.get("IMPORTACAO_ASYNC_MAX", 500))
+
+# quantidade de feeds atualizados em paralelo pelo agendador
+AGENDADOR_CONCORRENCIA = int(os.environ.get("AGENDADOR_CONCORRENCIA", 4))
+
+# intervalo, em segundos, entre as atualizações de um feed recém importado
+AGENDADOR_INTERVALO = int(os.environ.get("AGENDADOR_INTERVALO", 3600))
+
+# limites, em segundos, do intervalo ajustado à frequência de publicação de cada feed
+AGENDADOR_INTERVALO_MIN = int(os.environ.get("AGENDADOR_INTERVALO_MIN", 900))
+AGENDADOR_INTERVALO_MAX = int(os.environ.get("AGENDADOR_INTERVALO_MAX", 86400))
+
+# espera máxima, em segundos, entre as tentativas de um feed com falhas seguidas
+AGENDADOR_BACKOFF_MAX = int(os.environ.get("AGENDADOR_BACKOFF_MAX", 86400))
+
+# variação aleatória aplicada aos intervalos, como fração (0.1 = até 10% para mais ou menos)
+AGENDADOR_JITTER = float(os.environ.get("AGENDADOR_JITTER", 0.1))
+
+# tempo, em segundos, entre as verificações de feeds a atualizar
+AGENDADOR_TICK = float(os.environ.get("AGENDADOR_TICK", 30))
+
+# diretório do cache em disco das imagens de capa e das suas miniaturas
+CAPAS_DIRETORIO = os.environ.get("CAPAS_DIRETORIO", "database/capas")
+
+# lados, em pixels, das miniaturas geradas para cada capa, separados por vírgula
+CAPAS_TAMANHOS = [
+    int(tamanho) for tamanho in os.environ.get("CAPAS_TAMANHOS", "100,300,600").split(",")
+]
+
+# espaço máximo, em bytes, ocupado pelo cache de capas em disco
+CAPAS_CACHE_MAX = int(os.environ.get("CAPAS_CACHE_MAX", 512 * 1024 * 1024))
+
+# tamanho máximo, em bytes, de uma imagem de capa original
+CAPAS_ORIGINAL_MAX = int(os.environ.get("CAPAS_ORIGINAL_MAX", 20 * 1024 * 1024))
+
+# tempo máximo, em segundos, para buscar uma imagem de capa
+CAPAS_TIMEOUT = float(os.environ.get("CAPAS_TIMEOUT", 15))
+
+# função que busca as capas, no formato "modulo:funcao"; vazio usa a busca http padrão
+CAPAS_BUSCADOR = os.environ.get("CAPAS_BUSCADOR", "")
+
+# quantidade máxima de respostas guardadas no cache dos endpoints de leitura
+CACHE_RESPOSTAS_MAX = int(os.environ.get("CACHE_RESPOSTAS_MAX", 256))
+
+# tempo, em segundos, que uma resposta fica no cache (0 sem limite). Só é
+# necessário com vários processos em bases sem os gatilhos da versão dos dados,
+# que hoje são criados apenas no sqlite
+CACHE_RESPOSTAS_TTL = float(os.environ.get("CACHE_RESPOSTAS_TTL", 0))
+
+# tamanho mínimo, em bytes, para uma resposta ser comprimida; abaixo disso o
+# ganho não compensa o custo da compressão
+COMPRESSAO_TAMANHO_MIN = int(os.environ.get("COMPRESSAO_TAMANHO_MIN", 1024))
+
+# url de acesso à base principal, que recebe as escritas
+DB_URL = os.environ.get("DB_URL", "sqlite:///database/db.sqlite3")
+
+# url de uma réplica usada pelos endpoints de leitura; vazio usa a base principal
+DB_URL_LEITURA = os.environ.get("DB_URL_LEITURA", "")
+
+# tempo, em segundos, após uma escrita em que as respostas lidas da réplica não
+# são guardadas no cache, por ela poder ainda não ter recebido a escrita
+DB_LEITURA_ATRASO_MAX = float(os.environ.get("DB_LEITURA_ATRASO_MAX", 5))
+
+# url da base de leitura no modo ASGI, com um driver assíncrono; vazio usa a de
+# DB_URL_LEITURA ou DB_URL, trocando o driver sqlite pelo aiosqlite
+DB_URL_ASYNC = os.environ.get("DB_URL_ASYNC", "")
+
+# tamanho do pool de conexões com a base
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+
+# conexões extras abertas quando o pool está todo em uso
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+
+# tempo máximo, em segundos, esperando uma conexão livre no pool
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+
+# tempo, em segundos, após o qual uma conexão é reaberta (-1 desativa)
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))
+
+# PRAGMAs aplicados a cada nova conexão sqlite
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+# valores negativos são em KiB: -64000 equivale a 64 MB de cache por conexão
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -64000))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 268435456))
+# tempo, em milissegundos, que uma escrita espera pelo lock da base
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+
+# tempo, em milissegundos, que a primeira inserção de episódio aguarda outras
+# para gravá-las na mesma transação (0 agrupa só as que chegam durante a gravação)
+AGRUPAMENTO_JANELA_MS = float(os.environ.get("AGRUPAMENTO_JANELA_MS", 2))
+# quantidade de inserções que encerra a espera antes do fim da janela
+AGRUPAMENTO_LOTE_MAX = int(os.environ.get("AGRUPAMENTO_LOTE_MAX", 200))
+
+# quantidade de episódios lidos da base por vez na exportação do catálogo
+EXPORTACAO_TAMANHO_LOTE = int(os.environ.get("EXPORTACAO_TAMANHO_LOTE", 1000))
+
+# nível mínimo dos logs: DEBUG, INFO, WARNING, ERROR
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+# formato dos logs: "texto" ou "json"
+LOG_FORMATO = os.environ.get("LOG_FORMATO", "texto")
+
+# tamanho, em bytes, a partir do qual o arquivo de log é rotacionado
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+
+# quantidade de arquivos de log rotacionados mantidos
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+
+# fração, entre 0 e 1, dos logs de debug mantidos nos endpoints mais acessados
+LOG_AMOSTRAGEM = float(os.environ.get("LOG_AMOSTRAGEM", 0.01))
@@ -1,71 +1,163 @@
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
 import logging
 import os
+import queue
+import random
 
+from config import (
+    LOG_AMOSTRAGEM,
+    LOG_BACKUP_COUNT,
+    LOG_FORMATO,
+    LOG_LEVEL,
+    LOG_MAX_BYTES,
+)
 
-log_path = "log/"
-# Verifica se o diretorio para armexanar os logs não existe
-if not os.path.exists(log_path):
-   # então cria o diretorio
-   os.makedirs(log_path)
 
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro de log como um objeto json em uma linha"""
 
-dictConfig({
-    "version": 1,
-    "disable_existing_loggers": True,
-    "formatters": {
-        "default": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
-        },
-        "detailed": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
+    def format(self, record):
+        registro = {
+            "data": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "funcao": record.funcName,
+            "linha": record.lineno,
+            "mensagem": record.getMessage(),
         }
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "stream": "ext://sys.stdout",
+        if record.exc_info:
+            registro["excecao"] = self.formatException(record.exc_info)
+
+        return json.dumps(registro, ensure_ascii=False)
+
+
+class AmostragemFilter(logging.Filter):
+    """Mantém só uma fração dos registros marcados com `extra={"amostragem": taxa}`.
+    Registros sem a marcação passam sempre.
+    """
+
+    def filter(self, record):
+        taxa = getattr(record, "amostragem", None)
+        return taxa is None or random.random() < taxa
+
+
+# usado nos logs de debug dos endpoints mais acessados, como list_episodios
+amostrado = {"amostragem": LOG_AMOSTRAGEM}
+
+_configurado = False
+
+
+def coloca_em_fila(nome=None):
+    """Troca os handlers do logger por um QueueHandler.
+
+    As threads das requisições só colocam os registros na fila; a escrita no
+    console e nos arquivos é feita por uma thread do QueueListener.
+    """
+    alvo = logging.getLogger(nome)
+    handlers = list(alvo.handlers)
+
+    fila = queue.SimpleQueue()
+    handler_fila = QueueHandler(fila)
+    # a amostragem é aplicada antes de enfileirar, para não gastar com o que será descartado
+    handler_fila.addFilter(AmostragemFilter())
+
+    for handler in handlers:
+        alvo.removeHandler(handler)
+    alvo.addHandler(handler_fila)
+
+    listener = QueueListener(fila, *handlers, respect_handler_level=True)
+    listener.start()
+    # garante a escrita dos registros que ainda estão na fila ao encerrar
+    atexit.register(listener.stop)
+
+    return listener
+
+
+def configura_logging():
+    """Configura os handlers do logging e move a escrita para a thread de um
+    QueueListener. Chamada por `create_app`, e não na importação, para que
+    importar o model e os serviços continue barato; chamadas repetidas não têm
+    efeito.
+    """
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+
+    log_path = "log/"
+    # Verifica se o diretorio para armexanar os logs não existe
+    if not os.path.exists(log_path):
+        # então cria o diretorio
+        os.makedirs(log_path)
+
+    formatter = "json" if LOG_FORMATO == "json" else "detailed"
+
+    dictConfig({
+        "version": 1,
+        # os loggers dos módulos são criados na importação, antes desta configuração
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {
+                "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
+            },
+            "detailed": {
+                "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
+            },
+            "json": {
+                "()": JsonFormatter,
+            },
         },
-        # "email": {
-        #     "class": "logging.handlers.SMTPHandler",
-        #     "formatter": "default",
-        #     "level": "ERROR",
-        #     "mailhost": ("smtp.example.com", 587),
-        #     "fromaddr": "devops@example.com",
-        #     "toaddrs": ["receiver@example.com", "receiver2@example.com"],
-        #     "subject": "Error Logs",
-        #     "credentials": ("username", "password"),
-        # },
-        "error_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.error.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "formatter": "json" if LOG_FORMATO == "json" else "default",
+                "stream": "ext://sys.stdout",
+            },
+            # "email": {
+            #     "class": "logging.handlers.SMTPHandler",
+            #     "formatter": "default",
+            #     "level": "ERROR",
+            #     "mailhost": ("smtp.example.com", 587),
+            #     "fromaddr": "devops@example.com",
+            #     "toaddrs": ["receiver@example.com", "receiver2@example.com"],
+            #     "subject": "Error Logs",
+            #     "credentials": ("username", "password"),
+            # },
+            "error_file": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "formatter": formatter,
+                "filename": "log/gunicorn.error.log",
+                "maxBytes": LOG_MAX_BYTES,
+                "backupCount": LOG_BACKUP_COUNT,
+                "delay": True,
+            },
+            "detailed_file": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "formatter": formatter,
+                "filename": "log/gunicorn.detailed.log",
+                "maxBytes": LOG_MAX_BYTES,
+                "backupCount": LOG_BACKUP_COUNT,
+                "delay": True,
+            }
         },
-        "detailed_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.detailed.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
-        }
-    },
-    "loggers": {
-        "gunicorn.error": {
-            "handlers": ["console", "error_file"],  #, email],
-            "level": "INFO",
-            "propagate": False,
+        "loggers": {
+            "gunicorn.error": {
+                "handlers": ["console", "error_file"],  #, email],
+                "level": "INFO",
+                "propagate": False,
+            }
+        },
+        "root": {
+            "handlers": ["console", "detailed_file"],
+            "level": LOG_LEVEL,
         }
-    },
-    "root": {
-        "handlers": ["console", "detailed_file"],
-        "level": "INFO",
-    }
-})
+    })
+
+    coloca_em_fila()
+    coloca_em_fila("gunicorn.error")
 
 
 logger = logging.getLogger(__name__)
@@ -1,31 +1,92 @@
-from sqlalchemy_utils import database_exists, create_database
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-import os
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import create_engine, event
+
+from config import (
+    DB_MAX_OVERFLOW,
+    DB_URL,
+    DB_URL_LEITURA,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
 
 # importando os elementos definidos no modelo
 from model.base import Base
-from model.episodio import Episodio
+from model.busca import episodio_fts, termos_busca
+from model.capa import Capa
+from model.episodio import Episodio, assinatura_episodio
+from model.feed import Feed
+from model.importacao import Importacao
 from model.profile import Profile
+from model.versao import VersaoDados
+from model.migracao import init_db
+
+
+def configura_sqlite(conexao, _):
+    """Configura cada nova conexão sqlite.
+
+    No modo WAL as leituras não bloqueiam e não são bloqueadas pela escrita, e o
+    busy_timeout faz a escrita aguardar o lock em vez de falhar de imediato.
+    """
+    cursor = conexao.cursor()
+    cursor.execute("PRAGMA journal_mode=%s" % SQLITE_JOURNAL_MODE)
+    cursor.execute("PRAGMA synchronous=%s" % SQLITE_SYNCHRONOUS)
+    cursor.execute("PRAGMA cache_size=%d" % SQLITE_CACHE_SIZE)
+    cursor.execute("PRAGMA mmap_size=%d" % SQLITE_MMAP_SIZE)
+    cursor.execute("PRAGMA busy_timeout=%d" % SQLITE_BUSY_TIMEOUT)
+    cursor.close()
+
+
+def cria_engine(url: str):
+    """Cria uma engine de conexão com a base, com um pool de conexões
+    compartilhado pelas threads da aplicação
+    """
+    opcoes = {}
+    if url.startswith("sqlite"):
+        # as conexões do pool são usadas por threads diferentes
+        opcoes["connect_args"] = {"check_same_thread": False}
+
+    nova = create_engine(
+        url,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        **opcoes,
+    )
+
+    if nova.dialect.name == "sqlite":
+        event.listen(nova, "connect", configura_sqlite)
+
+    return nova
+
+
+def _recusa_escrita(session, flush_context, instances):
+    raise RuntimeError("Escrita em uma sessão somente leitura")
 
-db_path = "database/"
-# Verifica se o diretorio não existe
-if not os.path.exists(db_path):
-    # então cria o diretorio
-    os.makedirs(db_path)
 
-# url de acesso ao banco (essa é uma url de acesso ao sqlite local)
-db_url = "sqlite:///%s/db.sqlite3" % db_path
+# base principal, que recebe todas as escritas
+engine = cria_engine(DB_URL)
 
-# cria a engine de conexão com o banco
-engine = create_engine(db_url, echo=False)
+# base usada pelos endpoints de leitura: uma réplica, se configurada
+engine_leitura = cria_engine(DB_URL_LEITURA) if DB_URL_LEITURA else engine
 
-# Instancia um criador de seção com o banco
-Session = sessionmaker(bind=engine)
+# Instancia um criador de seção com o banco. A sessão é única por thread e deve
+# ser encerrada com `Session.remove()` ao fim de cada requisição ou tarefa
+Session = scoped_session(sessionmaker(bind=engine))
 
-# cria o banco se ele não existir
-if not database_exists(engine.url):
-    create_database(engine.url)
+# sessão dos endpoints somente leitura, ligada à réplica; recusa qualquer escrita
+fabrica_leitura = sessionmaker(bind=engine_leitura)
+event.listen(fabrica_leitura, "before_flush", _recusa_escrita)
+SessionLeitura = scoped_session(fabrica_leitura)
 
-# cria as tabelas do banco, caso não existam
-Base.metadata.create_all(engine)
+# a criação da base e das tabelas não acontece na importação do módulo: é feita
+# explicitamente pelo comando `flask init-db`, que chama `init_db(engine)`
@@ -0,0 +1,58 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_URL,
+    DB_URL_ASYNC,
+    DB_URL_LEITURA,
+)
+from model import configura_sqlite
+
+# Engine e sessões assíncronas, usadas só pelos endpoints de leitura do modo ASGI
+# (asgi.py). Ficam fora de `model` para que o app WSGI não dependa do aiosqlite.
+
+
+def url_async(url: str) -> str:
+    """Troca o driver sqlite da url pelo aiosqlite. Outras bases devem informar
+    a url com um driver assíncrono em DB_URL_ASYNC.
+    """
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def cria_engine_async(url: str):
+    """Cria uma engine assíncrona com as mesmas opções de pool e, no sqlite, as
+    mesmas configurações de conexão da engine síncrona
+    """
+    nova = create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+    if nova.dialect.name == "sqlite":
+        event.listen(nova.sync_engine, "connect", configura_sqlite)
+
+    return nova
+
+
+# base de leitura: a réplica, se configurada, ou a base principal
+engine_leitura_async = cria_engine_async(
+    DB_URL_ASYNC or url_async(DB_URL_LEITURA or DB_URL)
+)
+
+# uma sessão por requisição, criada com `async with SessionLeituraAsync() as session`
+SessionLeituraAsync = sessionmaker(
+    bind=engine_leitura_async, class_=AsyncSession, expire_on_commit=False
+)
@@ -0,0 +1,68 @@
+from sqlalchemy import column, table, text
+
+# índice de busca textual (FTS5) sobre o título e a descrição dos episódios.
+# é uma tabela de conteúdo externo: guarda só o índice e lê o texto de episodio
+episodio_fts = table("episodio_fts", column("rowid"))
+
+DDL_INDICE_BUSCA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS episodio_fts USING fts5(
+        titulo,
+        descricao,
+        content='episodio',
+        content_rowid='pk_episodio',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # os gatilhos mantêm o índice sincronizado em qualquer escrita na tabela,
+    # inclusive nas inserções em massa da importação
+    """
+    CREATE TRIGGER IF NOT EXISTS episodio_fts_ai AFTER INSERT ON episodio BEGIN
+        INSERT INTO episodio_fts(rowid, titulo, descricao)
+        VALUES (new.pk_episodio, new.titulo, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS episodio_fts_ad AFTER DELETE ON episodio BEGIN
+        INSERT INTO episodio_fts(episodio_fts, rowid, titulo, descricao)
+        VALUES ('delete', old.pk_episodio, old.titulo, old.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS episodio_fts_au AFTER UPDATE OF titulo, descricao
+    ON episodio BEGIN
+        INSERT INTO episodio_fts(episodio_fts, rowid, titulo, descricao)
+        VALUES ('delete', old.pk_episodio, old.titulo, old.descricao);
+        INSERT INTO episodio_fts(rowid, titulo, descricao)
+        VALUES (new.pk_episodio, new.titulo, new.descricao);
+    END
+    """,
+]
+
+
+def cria_indice_busca(engine):
+    """Cria o índice FTS5 de episódios e seus gatilhos, caso não existam.
+    Quando o índice é criado numa base que já tem episódios, eles são indexados.
+    """
+    with engine.begin() as conexao:
+        existia = conexao.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'episodio_fts'")
+        ).first()
+
+        for ddl in DDL_INDICE_BUSCA:
+            conexao.execute(text(ddl))
+
+        if not existia:
+            conexao.execute(text("INSERT INTO episodio_fts(episodio_fts) VALUES ('rebuild')"))
+
+
+def termos_busca(texto: str) -> str:
+    """Converte o texto digitado em uma consulta FTS5 que exige todos os termos.
+
+    Cada termo vai entre aspas, para que caracteres da sintaxe do FTS5 não gerem
+    erro, e o último termo busca por prefixo.
+    """
+    termos = ['"%s"' % termo.replace('"', '""') for termo in texto.split()]
+    if termos:
+        termos[-1] += "*"
+    return " ".join(termos)
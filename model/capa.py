@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, DateTime, func
+
+from model import Base
+
+
+class Capa(Base):
+    __tablename__ = "capa"
+
+    id = Column("pk_capa", Integer, primary_key=True)
+    url = Column(String(500), unique=True)
+    # hash sha256 do conteúdo da imagem, que identifica os arquivos no cache em disco
+    hash_conteudo = Column(String(64), index=True)
+    mimetype = Column(String(50))
+    data_insercao = Column(DateTime, default=func.now())
+
+    def __init__(self, url: str, hash_conteudo: str, mimetype: str):
+        """
+        Registra a imagem de capa obtida de um endereço
+
+        Arguments:
+            url: endereço de origem da capa
+            hash_conteudo: hash sha256 do conteúdo da imagem original
+            mimetype: tipo da imagem original
+        """
+        self.url = url
+        self.hash_conteudo = hash_conteudo
+        self.mimetype = mimetype
@@ -1,18 +1,82 @@
-from sqlalchemy import Column, String, Integer, DateTime, func
-from typing import Union
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+from sqlalchemy import BigInteger, Column, String, Integer, DateTime, Index, func, text
+from sqlalchemy.orm import validates
+from typing import Optional, Union
 
 from model import Base
 
+logger = logging.getLogger(__name__)
+
+
+def normaliza_titulo(titulo: Optional[str]) -> str:
+    """Título sem diferenças de maiúsculas, de espaços e de forma unicode"""
+    return " ".join(unicodedata.normalize("NFKC", titulo or "").casefold().split())
+
+
+def normaliza_audio(audio: Optional[str]) -> str:
+    """Link do áudio sem espaços nas pontas, sem fragmento e com o esquema e o
+    host em minúsculas, que não diferenciam maiúsculas
+    """
+    audio = (audio or "").strip()
+    try:
+        partes = urlsplit(audio)
+    except ValueError:
+        return audio
+
+    return urlunsplit(
+        (partes.scheme.lower(), partes.netloc.lower(), partes.path, partes.query, "")
+    )
+
+
+def assinatura_episodio(titulo: Optional[str], audio: Optional[str]) -> int:
+    """Impressão digital do episódio: um hash de 64 bits, com sinal como os
+    inteiros do sqlite, do título e do link do áudio normalizados.
+    Episódios com a mesma assinatura são considerados duplicados.
+    """
+    conteudo = f"{normaliza_titulo(titulo)}\x1f{normaliza_audio(audio)}"
+    digest = hashlib.blake2b(conteudo.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
 
 class Episodio(Base):
     __tablename__ = "episodio"
 
     id = Column("pk_episodio", Integer, primary_key=True)
-    titulo = Column(String(255), unique=True)
+    # não é único: duplicados são identificados pela assinatura
+    titulo = Column(String(255))
     audio = Column(String(500))
     capa = Column(String(500))
     descricao = Column(String(500))
     data_insercao = Column(DateTime, default=func.now())
+    # identificador da entrada no feed de origem, vazio para episódios criados pela API
+    guid = Column(String(500))
+    # Feed de origem (pk_feed), vazio para episódios criados pela API e para os
+    # importados antes da coluna; o guid só é único dentro do mesmo feed
+    feed_id = Column(Integer)
+    # hash sha256 do conteúdo da entrada no feed, para detectar edições
+    hash_conteudo = Column(String(64))
+    # última alteração, inclusive pelas atualizações em massa; com microssegundos,
+    # identifica a versão do episódio no /feed.xml
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # assinatura_episodio(titulo, audio), mantida pelo modelo; nas escritas em
+    # massa deve ser informada junto com o título e o áudio
+    assinatura = Column(BigInteger)
+
+    __table_args__ = (
+        # índice usado pela paginação por cursor da listagem de episódios
+        Index("ix_episodio_data_insercao_id", data_insercao, id),
+        # como índice, e não constraint, para ser criado também em bases existentes
+        Index("ix_episodio_feed_guid", feed_id, guid, unique=True),
+        # impede episódios duplicados; a verificação é uma busca por um inteiro
+        Index("ix_episodio_assinatura", assinatura, unique=True),
+        # usado para saber se uma capa pedida em /capas é usada por algum episódio
+        Index("ix_episodio_capa", capa),
+    )
 
     def __init__(
         self,
@@ -21,6 +85,8 @@ class Episodio(Base):
         capa: str,
         descricao: str,
         data_insercao: Union[DateTime, None] = None,
+        guid: Union[str, None] = None,
+        hash_conteudo: Union[str, None] = None,
     ):
         """
         Cria um Episódio
@@ -31,12 +97,75 @@ class Episodio(Base):
             capa: link para o arquivo da capa daquele episódio
             descrição: descrição do episódio
             data_insercao: data de quando o Profile foi inserido à base
+            guid: identificador da entrada no feed de origem
+            hash_conteudo: hash sha256 do conteúdo da entrada no feed
         """
         self.audio = audio
         self.capa = capa
         self.descricao = descricao
         self.titulo = titulo
+        self.guid = guid
+        self.hash_conteudo = hash_conteudo
 
         # se não for informada, será o data exata da inserção no banco
         if data_insercao:
             self.data_insercao = data_insercao
+
+    @validates("titulo", "audio")
+    def _atualiza_assinatura(self, campo: str, valor: Optional[str]) -> Optional[str]:
+        titulo = valor if campo == "titulo" else self.titulo
+        audio = valor if campo == "audio" else self.audio
+        self.assinatura = assinatura_episodio(titulo, audio)
+        return valor
+
+
+def preenche_assinaturas(engine, tamanho_lote: int = 1000):
+    """Calcula a assinatura dos episódios gravados antes da coluna existir.
+
+    Episódios duplicados gravados antes da assinatura ficam sem ela, exceto o
+    mais antigo, para que o índice único possa ser criado; eles continuam
+    visíveis e podem ser removidos pela API.
+    """
+    # sem o ORM, para não alterar a data_atualizacao dos episódios
+    with engine.begin() as conexao:
+        conexao.execute(
+            text(
+                """
+                UPDATE episodio SET assinatura = NULL
+                WHERE assinatura IS NOT NULL AND pk_episodio NOT IN (
+                    SELECT MIN(pk_episodio) FROM episodio
+                    WHERE assinatura IS NOT NULL GROUP BY assinatura
+                )
+                """
+            )
+        )
+
+        pendentes = conexao.execute(
+            text("SELECT pk_episodio, titulo, audio FROM episodio WHERE assinatura IS NULL")
+        ).fetchall()
+
+        for inicio in range(0, len(pendentes), tamanho_lote):
+            conexao.execute(
+                text(
+                    """
+                    UPDATE episodio SET assinatura = :assinatura
+                    WHERE pk_episodio = :id AND NOT EXISTS (
+                        SELECT 1 FROM episodio WHERE assinatura = :assinatura
+                    )
+                    """
+                ),
+                [
+                    {"id": episodio_id, "assinatura": assinatura_episodio(titulo, audio)}
+                    for episodio_id, titulo, audio in pendentes[inicio:inicio + tamanho_lote]
+                ],
+            )
+
+        duplicados = conexao.execute(
+            text("SELECT COUNT(*) FROM episodio WHERE assinatura IS NULL")
+        ).scalar()
+
+    if duplicados:
+        logger.warning(
+            "%d episódios duplicados, com mesmo título e áudio de outro, ficaram sem assinatura",
+            duplicados,
+        )
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index, func
+from typing import Union
+
+from model import Base
+
+
+class Feed(Base):
+    __tablename__ = "feed"
+
+    id = Column("pk_feed", Integer, primary_key=True)
+    url = Column(String(500), unique=True)
+    etag = Column(String(255))
+    last_modified = Column(String(255))
+    hash_conteudo = Column(String(64))
+    data_verificacao = Column(DateTime, default=func.now(), onupdate=func.now())
+    # agendamento das atualizações periódicas, feito por `flask agendador`
+    # intervalo, em segundos, entre as atualizações, ajustado à frequência de publicação
+    intervalo = Column(Integer)
+    proxima_verificacao = Column(DateTime)
+    # falhas seguidas, usadas para espaçar as tentativas
+    falhas = Column(Integer, default=0)
+    # última atualização que encontrou episódios novos
+    data_novidade = Column(DateTime)
+
+    # índice usado pelo agendador para encontrar os feeds a atualizar
+    __table_args__ = (
+        Index("ix_feed_proxima_verificacao", proxima_verificacao),
+    )
+
+    def __init__(
+        self,
+        url: str,
+        etag: Union[str, None] = None,
+        last_modified: Union[str, None] = None,
+        hash_conteudo: Union[str, None] = None,
+    ):
+        """
+        Cria o estado de busca de um Feed
+
+        Arguments:
+            url: endereço do feed rss
+            etag: cabeçalho ETag retornado na última busca do feed
+            last_modified: cabeçalho Last-Modified retornado na última busca do feed
+            hash_conteudo: hash sha256 do conteúdo do feed na última importação
+        """
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.hash_conteudo = hash_conteudo
+        self.falhas = 0
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, func
+
+from model import Base
+
+
+class Importacao(Base):
+    __tablename__ = "importacao"
+
+    id = Column("pk_importacao", Integer, primary_key=True)
+    feed = Column(String(500))
+    status = Column(String(20), default="pendente")
+    total = Column(Integer)
+    processados = Column(Integer, default=0)
+    adicionados = Column(Integer, default=0)
+    # episódios já importados que foram editados no feed
+    atualizados = Column(Integer, default=0)
+    inalterado = Column(Boolean, default=False)
+    # lista de mensagens de erro, serializada em json
+    erros = Column(Text, default="[]")
+    data_insercao = Column(DateTime, default=func.now())
+    data_conclusao = Column(DateTime)
+
+    def __init__(self, feed: str):
+        """
+        Cria uma Importacao, executada em segundo plano
+
+        Arguments:
+            feed: endereço do feed rss a ser importado
+        """
+        self.feed = feed
+        self.status = "pendente"
+        self.processados = 0
+        self.adicionados = 0
+        self.atualizados = 0
+        self.inalterado = False
+        self.erros = "[]"
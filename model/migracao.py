@@ -0,0 +1,158 @@
+import logging
+import os
+
+from sqlalchemy import MetaData, UniqueConstraint, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from model.base import Base
+from model.busca import cria_indice_busca
+from model.episodio import preenche_assinaturas
+from model.versao import cria_gatilhos_versao
+
+logger = logging.getLogger(__name__)
+
+
+def _adiciona_colunas(engine):
+    """Adiciona às tabelas existentes as colunas novas dos modelos.
+    O create_all só cria tabelas inteiras; colunas novas precisam de ALTER TABLE.
+    """
+    inspetor = inspect(engine)
+
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            existentes = {coluna["name"] for coluna in inspetor.get_columns(tabela.name)}
+
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+
+                tipo = coluna.type.compile(dialect=engine.dialect)
+                conexao.execute(
+                    text(f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}")
+                )
+
+                logger.info("Adicionada coluna %s.%s", tabela.name, coluna.name)
+
+
+def _colunas_unicas(tabela) -> set:
+    """Conjuntos de colunas com restrição de unicidade no modelo"""
+    unicas = {frozenset([coluna.name]) for coluna in tabela.columns if coluna.unique}
+    unicas.update(
+        frozenset(coluna.name for coluna in restricao.columns)
+        for restricao in tabela.constraints
+        if isinstance(restricao, UniqueConstraint)
+    )
+    return unicas
+
+
+def _recria_tabela_sqlite(conexao, tabela):
+    """Recria a tabela a partir do modelo, mantendo os dados. O sqlite não
+    remove restrições com ALTER TABLE; os índices e gatilhos da tabela são
+    recriados em seguida pelo `init_db`.
+    """
+    temporaria = f"{tabela.name}_migracao"
+    colunas = ", ".join(coluna.name for coluna in tabela.columns)
+
+    conexao.execute(CreateTable(tabela.to_metadata(MetaData(), name=temporaria)))
+    conexao.execute(
+        text(f"INSERT INTO {temporaria} ({colunas}) SELECT {colunas} FROM {tabela.name}")
+    )
+    conexao.execute(text(f"DROP TABLE {tabela.name}"))
+    conexao.execute(text(f"ALTER TABLE {temporaria} RENAME TO {tabela.name}"))
+
+
+def _remove_restricoes_unicas(engine):
+    """Remove das tabelas existentes as restrições de unicidade que deixaram de
+    existir nos modelos, como a do título dos episódios
+    """
+    inspetor = inspect(engine)
+
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            unicas = _colunas_unicas(tabela)
+            removidas = [
+                restricao
+                for restricao in inspetor.get_unique_constraints(tabela.name)
+                if frozenset(restricao["column_names"]) not in unicas
+            ]
+            if not removidas:
+                continue
+
+            if engine.dialect.name == "sqlite":
+                _recria_tabela_sqlite(conexao, tabela)
+            else:
+                for restricao in removidas:
+                    conexao.execute(
+                        text(f"ALTER TABLE {tabela.name} DROP CONSTRAINT {restricao['name']}")
+                    )
+
+            logger.info(
+                "Removida a unicidade de %s em %s",
+                ", ".join(", ".join(restricao["column_names"]) for restricao in removidas),
+                tabela.name,
+            )
+
+
+# índices de versões anteriores dos modelos, removidos das bases existentes
+INDICES_REMOVIDOS = [
+    # o guid passou a ser único só dentro de cada feed (ix_episodio_feed_guid)
+    "ix_episodio_guid",
+]
+
+
+def _cria_indices(engine):
+    """Cria os índices dos modelos que ainda não existem em tabelas já criadas,
+    recria os que passaram a ser, ou deixaram de ser, únicos e remove os que
+    deixaram de existir
+    """
+    with engine.begin() as conexao:
+        for nome in INDICES_REMOVIDOS:
+            conexao.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+    inspetor = inspect(engine)
+    for tabela in Base.metadata.sorted_tables:
+        existentes = {indice["name"]: indice for indice in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            existente = existentes.get(indice.name)
+            if existente and bool(existente["unique"]) != bool(indice.unique):
+                indice.drop(engine)
+
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+
+
+def init_db(engine):
+    """Cria ou atualiza a base de dados: o arquivo, as tabelas, as colunas e os
+    índices que ainda não existem, as assinaturas dos episódios antigos, os
+    gatilhos da versão dos dados e o índice de busca textual.
+
+    Pode ser executada mais de uma vez; só cria o que falta.
+    """
+    # importado aqui por ser usado só na inicialização da base
+    from sqlalchemy_utils import create_database, database_exists
+
+    if engine.dialect.name == "sqlite" and engine.url.database:
+        diretorio = os.path.dirname(engine.url.database)
+        # Verifica se o diretorio não existe
+        if diretorio and not os.path.exists(diretorio):
+            # então cria o diretorio
+            os.makedirs(diretorio)
+
+    # cria o banco se ele não existir
+    if not database_exists(engine.url):
+        create_database(engine.url)
+
+    # cria as tabelas do banco, caso não existam
+    Base.metadata.create_all(engine)
+
+    _adiciona_colunas(engine)
+    _remove_restricoes_unicas(engine)
+    # antes dos índices, para que o índice único das assinaturas possa ser criado
+    preenche_assinaturas(engine)
+    _cria_indices(engine)
+    cria_gatilhos_versao(engine)
+
+    # cria o índice de busca textual dos episódios, caso não exista
+    if engine.dialect.name == "sqlite":
+        cria_indice_busca(engine)
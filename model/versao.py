@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, text
+
+from model import Base
+
+# tabelas cujos dados são servidos pelo cache de respostas
+TABELAS_VERSIONADAS = ("episodio", "profile")
+
+
+class VersaoDados(Base):
+    """Versão dos dados servidos pelo cache de respostas, em uma única linha.
+
+    No sqlite é incrementada por gatilhos em qualquer escrita nas
+    TABELAS_VERSIONADAS, na mesma transação da escrita, inclusive as feitas
+    por outros processos, como os workers do gunicorn e o agendador.
+    """
+
+    __tablename__ = "versao_dados"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
+
+def cria_gatilhos_versao(engine):
+    """Cria a linha da versão dos dados e, no sqlite, os gatilhos que a
+    incrementam, caso não existam
+    """
+    with engine.begin() as conexao:
+        if not conexao.execute(text("SELECT 1 FROM versao_dados WHERE id = 1")).first():
+            conexao.execute(text("INSERT INTO versao_dados (id, versao) VALUES (1, 0)"))
+
+        if engine.dialect.name != "sqlite":
+            return
+
+        for tabela in TABELAS_VERSIONADAS:
+            for operacao in ("INSERT", "UPDATE", "DELETE"):
+                conexao.execute(
+                    text(
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS versao_{tabela}_{operacao.lower()}
+                        AFTER {operacao} ON {tabela} BEGIN
+                            UPDATE versao_dados SET versao = versao + 1 WHERE id = 1;
+                        END
+                        """
+                    )
+                )
@@ -0,0 +1,33 @@
+from typing import Optional
+from pydantic import BaseModel, Field, validator
+
+from config import CAPAS_TAMANHOS
+
+
+class CapaQuery(BaseModel):
+    """Define a capa pedida pelo endereço de origem, usado em Episodio e Profile"""
+
+    url: str = Field(..., description="Endereço da capa de um episódio ou do profile")
+    tamanho: Optional[int] = Field(
+        None,
+        description="Lado da miniatura, em pixels: "
+        + ", ".join(str(tamanho) for tamanho in CAPAS_TAMANHOS)
+        + ". Sem tamanho, retorna a imagem original",
+    )
+
+    @validator("tamanho")
+    def valida_tamanho(cls, tamanho):
+        if tamanho is not None and tamanho not in CAPAS_TAMANHOS:
+            raise ValueError(f"Tamanhos disponíveis: {CAPAS_TAMANHOS}")
+        return tamanho
+
+
+class CapaPath(BaseModel):
+    """Define os parâmetros da rota de uma capa no cache local"""
+
+    hash_conteudo: str = Field(
+        ..., regex=r"^[0-9a-f]{64}$", description="Hash sha256 da imagem original"
+    )
+    tamanho: str = Field(
+        ..., description='Lado da miniatura, em pixels, ou "original"'
+    )
@@ -1,6 +1,7 @@
+import base64
 from datetime import datetime
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, root_validator, validator
+from typing import List, Literal, Optional, Tuple
 from model.episodio import Episodio
 
 
@@ -32,6 +33,75 @@ class EpisodioDelSchema(BaseModel):
     titulo: str
 
 
+class EpisodioParcialViewSchema(BaseModel):
+    """Define como um Episodio será retornado quando o parâmetro `fields` é usado.
+    Só os campos pedidos estão presentes.
+    """
+
+    id: Optional[int] = 1
+    titulo: Optional[str] = "NerdCast 961 - Qual é a pauta? O que você procura está aqui!"
+    capa: Optional[str] = "https://example.com/image.jpg"
+
+
+class EpisodioOperacaoSchema(BaseModel):
+    """Define uma operação do lote de Episodio.
+    `criar` exige `episodio`, `atualizar` exige `id` e `episodio`, `remover` exige `id`.
+    """
+
+    acao: Literal["criar", "atualizar", "remover"]
+    id: Optional[int] = None
+    episodio: Optional[EpisodioSchema] = None
+
+    @root_validator(skip_on_failure=True)
+    def valida_operacao(cls, valores):
+        acao = valores.get("acao")
+        if acao != "criar" and valores.get("id") is None:
+            raise ValueError(f"A operação '{acao}' exige o id do episódio")
+        if acao != "remover" and valores.get("episodio") is None:
+            raise ValueError(f"A operação '{acao}' exige os dados do episódio")
+        return valores
+
+
+class EpisodioLoteSchema(BaseModel):
+    """Define como um lote de operações de Episodio deve ser representado"""
+
+    operacoes: List[EpisodioOperacaoSchema] = Field(..., min_items=1, max_items=1000)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "operacoes": [
+                    {
+                        "acao": "criar",
+                        "episodio": {
+                            "titulo": "NerdCast 961 - Qual é a pauta?",
+                            "descricao": "Projeto Velho Gostoso, nostalgia e o que seu algoritmo diz sobre você",
+                            "capa": "https://example.com/image.jpg",
+                            "audio": "https://example.com/audio.mp3",
+                        },
+                    },
+                    {"acao": "remover", "id": 1},
+                ]
+            }
+        }
+
+
+class EpisodioOperacaoResultadoSchema(BaseModel):
+    """Define como o resultado de cada operação do lote será retornado"""
+
+    indice: int = 0
+    acao: str = "criar"
+    status: int = 200
+    id: Optional[int] = 1
+    message: str = "Episódio adicionado"
+
+
+class EpisodioLoteViewSchema(BaseModel):
+    """Define como o resultado de um lote de operações de Episodio será retornado"""
+
+    resultados: List[EpisodioOperacaoResultadoSchema]
+
+
 class EpisodioViewSchema(BaseModel):
     """Define como um Episodio será retornado"""
 
@@ -55,6 +125,102 @@ class EpisodioPath(BaseModel):
     episodio_id: int = Field(..., description="Episódio ID")
 
 
+# campos de um Episodio que podem ser pedidos no parâmetro `fields`
+CAMPOS_EPISODIO = ("id", "titulo", "descricao", "capa", "audio", "data_insercao")
+
+
+class EpisodioCamposQuery(BaseModel):
+    """Define o parâmetro que limita os campos retornados de cada Episodio"""
+
+    fields: Optional[str] = Field(
+        None,
+        description="Campos retornados, separados por vírgula. Ex.: id,titulo,capa",
+    )
+
+    @validator("fields")
+    def valida_campos(cls, fields):
+        if fields is None:
+            return None
+
+        campos = [campo.strip() for campo in fields.split(",") if campo.strip()]
+        invalidos = [campo for campo in campos if campo not in CAMPOS_EPISODIO]
+        if not campos or invalidos:
+            raise ValueError(
+                "Campos inválidos: %s. Permitidos: %s"
+                % (", ".join(invalidos) or fields, ", ".join(CAMPOS_EPISODIO))
+            )
+
+        # remove repetidos, mantendo a ordem pedida
+        return ",".join(dict.fromkeys(campos))
+
+    @property
+    def campos(self) -> Optional[List[str]]:
+        """Lista de campos pedidos, ou None para o Episodio completo"""
+        return self.fields.split(",") if self.fields else None
+
+
+class EpisodioListagemQuery(EpisodioCamposQuery):
+    """Define os parâmetros de paginação da listagem de Episodio"""
+
+    limit: int = Field(20, ge=1, le=100, description="Quantidade de episódios por página")
+    cursor: Optional[str] = Field(
+        None, description="Cursor retornado em `proximo_cursor` pela página anterior"
+    )
+
+
+class EpisodioListaViewSchema(BaseModel):
+    """Define como uma página da listagem de Episodio será retornada"""
+
+    episodios: List[EpisodioViewSchema]
+    proximo_cursor: Optional[str] = None
+
+
+class EpisodioBuscaQuery(EpisodioCamposQuery):
+    """Define os parâmetros da busca textual de Episodio"""
+
+    q: str = Field(..., min_length=1, description="Termos buscados no título e na descrição")
+    limit: int = Field(20, ge=1, le=100, description="Quantidade de episódios por página")
+    offset: int = Field(0, ge=0, description="Quantidade de resultados a pular")
+
+
+class EpisodioBuscaViewSchema(BaseModel):
+    """Define como uma página do resultado da busca de Episodio será retornada"""
+
+    episodios: List[EpisodioViewSchema]
+    proximo_offset: Optional[int] = None
+
+
+class EpisodioExportacaoQuery(BaseModel):
+    """Define os parâmetros da exportação do catálogo de Episodio"""
+
+    formato: Literal["ndjson", "json"] = Field(
+        "ndjson", description="ndjson, um episódio por linha, ou json"
+    )
+
+
+def codifica_cursor(data_insercao: str, episodio_id: int) -> str:
+    """Gera o cursor opaco que aponta para o último Episodio de uma página.
+
+    A `data_insercao` é mantida no formato em que está gravada na base para que
+    a comparação com a coluna seja feita sem conversões.
+    """
+    valor = f"{data_insercao}|{episodio_id}".encode()
+    return base64.urlsafe_b64encode(valor).decode().rstrip("=")
+
+
+def decodifica_cursor(cursor: str) -> Tuple[str, int]:
+    """Retorna a tupla (data_insercao, id) contida no cursor.
+    Lança ValueError se o cursor for inválido.
+    """
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valor = base64.urlsafe_b64decode(cursor + preenchimento).decode()
+        data_insercao, episodio_id = valor.rsplit("|", 1)
+        return data_insercao, int(episodio_id)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+
+
 def apresenta_episodio(episodio: Episodio):
     """Retorna uma representação do Episodio seguindo o schema definido em EpisodioSchema."""
     return {
@@ -85,3 +251,24 @@ def apresenta_episodios(episodios: List[Episodio]):
         )
 
     return {"episodios": result}
+
+
+def colunas_episodio(campos: List[str]) -> list:
+    """Retorna as colunas de Episodio correspondentes aos campos pedidos, para
+    consultas que buscam só essas colunas, sem criar objetos ORM
+    """
+    return [getattr(Episodio, campo).label(campo) for campo in campos]
+
+
+def apresenta_campos_episodio(linha, campos: List[str]):
+    """Retorna uma representação reduzida do Episodio, só com os campos pedidos,
+    seguindo o schema definido em EpisodioParcialViewSchema.
+    """
+    resultado = {}
+    for campo in campos:
+        valor = getattr(linha, campo)
+        if campo == "data_insercao":
+            valor = valor.isoformat() + "Z"
+        resultado[campo] = valor
+
+    return resultado
@@ -1,14 +1,38 @@
-from typing import List
-from pydantic import BaseModel, Field
+import json
+from datetime import datetime
+from typing import List, Optional
+from flask_openapi3 import FileStorage
+from pydantic import BaseModel, Field, validator
 
+from model.importacao import Importacao
 from schemas.episodio import EpisodioViewSchema
 from schemas.profile import ProfileViewSchema
+from services.feed import EnderecoFeedInvalidoError, url_feed_valida
+
+
+def _valida_url_feed(url: str) -> str:
+    # só urls http(s) são buscadas; caminhos e outros esquemas são recusados
+    if not url_feed_valida(url):
+        raise EnderecoFeedInvalidoError()
+    return url
 
 
 class ImportacaoFeedSchema(BaseModel):
     """Define como uma nova importação via rss feed deve ser representada"""
 
     feed: str
+    tamanho_lote: Optional[int] = Field(
+        None, ge=1, le=900, description="Quantidade de episódios gravados por lote"
+    )
+    forcar: bool = Field(
+        False, description="Importa o feed mesmo que não tenha mudado desde a última vez"
+    )
+    sincronizar: bool = Field(
+        False,
+        description="Lê o feed apenas até o primeiro episódio já importado e não editado",
+    )
+
+    _valida_feed = validator("feed", allow_reuse=True)(_valida_url_feed)
 
     class Config:
         schema_extra = {
@@ -22,3 +46,90 @@ class ImportacaoFeedViewSchema(BaseModel):
     perfil: ProfileViewSchema
     episodios: List[EpisodioViewSchema]
     erros: List[str]
+    atualizados: int = 0
+    inalterado: bool = False
+
+
+class ImportacaoFeedsSchema(BaseModel):
+    """Define como uma importação de vários feeds rss deve ser representada.
+    Os feeds podem ser informados em `feeds`, em um arquivo `opml` ou em ambos.
+    """
+
+    feeds: List[str] = Field([], description="Endereços dos feeds rss")
+    opml: Optional[FileStorage] = Field(None, description="Arquivo OPML com os feeds")
+    concorrencia: Optional[int] = Field(
+        None, ge=1, le=32, description="Quantidade de feeds buscados em paralelo"
+    )
+    timeout: Optional[float] = Field(
+        None, gt=0, le=300, description="Tempo máximo, em segundos, para buscar cada feed"
+    )
+    tamanho_lote: Optional[int] = Field(
+        None, ge=1, le=900, description="Quantidade de episódios gravados por lote"
+    )
+    forcar: bool = Field(
+        False, description="Importa os feeds mesmo que não tenham mudado desde a última vez"
+    )
+    sincronizar: bool = Field(
+        False,
+        description="Lê cada feed apenas até o primeiro episódio já importado e não editado",
+    )
+
+    _valida_feeds = validator("feeds", each_item=True, allow_reuse=True)(_valida_url_feed)
+
+
+class ImportacaoFeedRelatorioSchema(ImportacaoFeedViewSchema):
+    """Define como será o relatório de cada feed na importação de vários feeds"""
+
+    feed: str
+    message: Optional[str] = None
+
+
+class ImportacaoFeedsViewSchema(BaseModel):
+    """Define como será representação do retorno da importação de vários feeds"""
+
+    importacoes: List[ImportacaoFeedRelatorioSchema]
+
+
+class ImportacaoPath(BaseModel):
+    """Define o parâmetro das rotas de Importacao que exigem um ID"""
+
+    importacao_id: int = Field(..., description="Importação ID")
+
+
+class ImportacaoViewSchema(BaseModel):
+    """Define como o andamento de uma importação em segundo plano será retornado"""
+
+    id: int = 1
+    feed: str = "https://api.jovemnerd.com.br/feed-nerdcast/"
+    status: str = "concluida"
+    total: Optional[int] = 10
+    processados: int = 10
+    adicionados: int = 8
+    atualizados: int = 0
+    inalterado: bool = False
+    erros: List[str] = []
+    data_insercao: Optional[datetime] = None
+    data_conclusao: Optional[datetime] = None
+
+
+def apresenta_importacao(importacao: Importacao):
+    """Retorna uma representação da Importacao seguindo o schema definido em
+    ImportacaoViewSchema.
+    """
+    return {
+        "id": importacao.id,
+        "feed": importacao.feed,
+        "status": importacao.status,
+        "total": importacao.total,
+        "processados": importacao.processados,
+        "adicionados": importacao.adicionados,
+        "atualizados": importacao.atualizados or 0,
+        "inalterado": importacao.inalterado,
+        "erros": json.loads(importacao.erros or "[]"),
+        "data_insercao": importacao.data_insercao.isoformat() + "Z",
+        "data_conclusao": (
+            importacao.data_conclusao.isoformat() + "Z"
+            if importacao.data_conclusao
+            else None
+        ),
+    }
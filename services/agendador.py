@@ -0,0 +1,216 @@
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from config import (
+    AGENDADOR_BACKOFF_MAX,
+    AGENDADOR_CONCORRENCIA,
+    AGENDADOR_INTERVALO,
+    AGENDADOR_INTERVALO_MAX,
+    AGENDADOR_INTERVALO_MIN,
+    AGENDADOR_JITTER,
+    AGENDADOR_TICK,
+    IMPORTACAO_TAMANHO_LOTE,
+)
+from model import Feed, Session
+from logger import logger
+from services.importacao import importa_feed
+
+
+def _agora() -> datetime:
+    # mesmo fuso das datas gravadas pela base (func.now() do sqlite é UTC)
+    return datetime.utcnow()
+
+
+def com_jitter(segundos: float, jitter: float = AGENDADOR_JITTER) -> timedelta:
+    """Varia o intervalo aleatoriamente em até `jitter` para mais ou para menos,
+    para que feeds com o mesmo intervalo não sejam atualizados juntos
+    """
+    return timedelta(seconds=segundos * random.uniform(1 - jitter, 1 + jitter))
+
+
+def _limita(segundos: float) -> int:
+    return int(min(max(segundos, AGENDADOR_INTERVALO_MIN), AGENDADOR_INTERVALO_MAX))
+
+
+def ajusta_intervalo(estado: Feed, adicionados: int, agora: datetime) -> int:
+    """Calcula o intervalo até a próxima atualização de um feed atualizado com
+    sucesso, acompanhando a frequência com que ele publica.
+
+    Quando há episódios novos, o intervalo passa a ser metade do tempo desde a
+    novidade anterior; sem novidade, cresce 50%. Fica sempre entre
+    AGENDADOR_INTERVALO_MIN e AGENDADOR_INTERVALO_MAX.
+    """
+    intervalo = estado.intervalo or AGENDADOR_INTERVALO
+
+    if not adicionados:
+        return _limita(intervalo * 1.5)
+
+    if estado.data_novidade is None:
+        return _limita(intervalo)
+
+    return _limita((agora - estado.data_novidade).total_seconds() / 2)
+
+
+def espera_apos_falha(estado: Feed) -> float:
+    """Espera, em segundos, até a próxima tentativa de um feed que falhou,
+    dobrando a cada falha seguida até AGENDADOR_BACKOFF_MAX
+    """
+    intervalo = estado.intervalo or AGENDADOR_INTERVALO
+    return min(intervalo * 2 ** (estado.falhas or 0), AGENDADOR_BACKOFF_MAX)
+
+
+def agenda_novos(session):
+    """Agenda os feeds que ainda não têm próxima verificação, como os recém
+    importados, espalhando as atualizações ao longo do intervalo padrão
+    """
+    agora = _agora()
+
+    for estado in session.query(Feed).filter(Feed.proxima_verificacao.is_(None)):
+        estado.intervalo = estado.intervalo or AGENDADOR_INTERVALO
+        estado.proxima_verificacao = agora + timedelta(
+            seconds=random.uniform(0, estado.intervalo)
+        )
+
+    session.commit()
+
+
+def reserva_feeds(session, quantidade: int) -> List[str]:
+    """Reserva até `quantidade` feeds cuja verificação já venceu, os mais
+    atrasados primeiro, e retorna os seus endereços.
+
+    A reserva adia a próxima verificação para depois do intervalo máximo, o que
+    evita que o mesmo feed seja atualizado duas vezes, inclusive por outro
+    processo. A atualização grava a próxima verificação definitiva.
+    """
+    agora = _agora()
+    reservados = []
+
+    vencidos = (
+        session.query(Feed.id, Feed.url, Feed.proxima_verificacao)
+        .filter(Feed.proxima_verificacao <= agora)
+        .order_by(Feed.proxima_verificacao)
+        .limit(quantidade)
+        .all()
+    )
+
+    for feed_id, url, proxima_verificacao in vencidos:
+        # só reserva se nenhum outro processo reservou antes
+        reservado = (
+            session.query(Feed)
+            .filter(Feed.id == feed_id, Feed.proxima_verificacao == proxima_verificacao)
+            .update(
+                {"proxima_verificacao": agora + timedelta(seconds=AGENDADOR_BACKOFF_MAX)},
+                synchronize_session=False,
+            )
+        )
+        if reservado:
+            reservados.append(url)
+
+    session.commit()
+
+    return reservados
+
+
+def atualiza_feed(url: str, tamanho_lote: int = IMPORTACAO_TAMANHO_LOTE):
+    """Atualiza um feed, em modo de sincronização, e agenda a próxima verificação"""
+    session = Session()
+
+    try:
+        try:
+            resultado = importa_feed(session, url, tamanho_lote, sincronizar=True)
+            adicionados = len(resultado["episodios"])
+            erro = None
+
+        except Exception as e:
+            session.rollback()
+            adicionados, erro = 0, e
+
+        estado = session.query(Feed).filter(Feed.url == url).one()
+        agora = _agora()
+
+        if erro is None:
+            estado.intervalo = ajusta_intervalo(estado, adicionados, agora)
+            estado.falhas = 0
+            if adicionados:
+                estado.data_novidade = agora
+            espera = estado.intervalo
+
+            logger.debug(
+                "Feed %s atualizado: %d episódios novos, próxima em %ds",
+                url,
+                adicionados,
+                espera,
+            )
+        else:
+            estado.falhas = (estado.falhas or 0) + 1
+            espera = espera_apos_falha(estado)
+
+            logger.warning(
+                "Erro ao atualizar o feed %s (%d falhas seguidas), nova tentativa em %ds: %s",
+                url,
+                estado.falhas,
+                espera,
+                erro,
+            )
+
+        estado.proxima_verificacao = agora + com_jitter(espera)
+        session.commit()
+
+    except Exception:
+        logger.exception("Não foi possível agendar o feed %s", url)
+        session.rollback()
+
+    finally:
+        Session.remove()
+
+
+def executa_agendador(
+    concorrencia: int = AGENDADOR_CONCORRENCIA,
+    tamanho_lote: int = IMPORTACAO_TAMANHO_LOTE,
+    uma_vez: bool = False,
+    parar: Optional[threading.Event] = None,
+):
+    """Atualiza periodicamente os feeds já importados, até `parar` ser sinalizado.
+
+    No máximo `concorrencia` feeds são atualizados ao mesmo tempo. Com `uma_vez`,
+    termina quando não houver mais feeds com a verificação vencida.
+    """
+    parar = parar or threading.Event()
+    em_andamento = set()
+
+    with ThreadPoolExecutor(
+        max_workers=concorrencia, thread_name_prefix="agendador"
+    ) as executor:
+        while not parar.is_set():
+            session = Session()
+            try:
+                agenda_novos(session)
+                urls = reserva_feeds(session, concorrencia - len(em_andamento))
+
+            except Exception:
+                # um erro passageiro, como a base ocupada pelas escritas da API,
+                # não encerra o agendador: tenta de novo no próximo ciclo
+                logger.exception("Não foi possível reservar os feeds a atualizar")
+                session.rollback()
+                parar.wait(AGENDADOR_TICK)
+                continue
+
+            finally:
+                Session.remove()
+
+            for url in urls:
+                em_andamento.add(executor.submit(atualiza_feed, url, tamanho_lote))
+
+            if uma_vez and not em_andamento:
+                break
+
+            if em_andamento:
+                # volta assim que uma vaga abrir, para manter a concorrência ocupada
+                _, em_andamento = wait(
+                    em_andamento, timeout=AGENDADOR_TICK, return_when=FIRST_COMPLETED
+                )
+            else:
+                parar.wait(AGENDADOR_TICK)
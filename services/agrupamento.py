@@ -0,0 +1,182 @@
+import threading
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from config import AGRUPAMENTO_JANELA_MS, AGRUPAMENTO_LOTE_MAX
+from model import Episodio, Session
+from logger import logger
+from schemas.episodio import apresenta_episodio
+from services.cache import cache_respostas
+from services.consultas import consulta_duplicado
+
+DUPLICADO = "Episódio com mesmo título já salvo na base"
+
+
+@dataclass
+class _Pedido:
+    """Uma inserção aguardando a gravação do seu grupo"""
+
+    episodio: Episodio
+    concluido: threading.Event = field(default_factory=threading.Event)
+    # representação do episódio criado ou mensagem de erro, e o status http
+    resultado: Tuple[dict, int] = ({"message": "Não foi possível salvar o episódio"}, 400)
+
+
+class AgrupadorInsercoes:
+    """Grava na mesma transação as inserções de Episodio que chegam juntas.
+
+    Com o sqlite, cada commit espera o lock de escrita e sincroniza o arquivo;
+    com muitas inserções simultâneas, agrupá-las em um commit faz a vazão
+    crescer com a concorrência em vez de cair.
+
+    A primeira inserção de um grupo é a líder: aguarda até `janela` segundos
+    (ou até `lote_max` inserções) e a gravação do grupo anterior, e então grava
+    todas as pendentes em uma transação, com a sua própria sessão. As demais
+    aguardam e recebem o resultado da sua inserção, como 409 para um duplicado.
+    """
+
+    def __init__(
+        self,
+        janela: float = AGRUPAMENTO_JANELA_MS / 1000,
+        lote_max: int = AGRUPAMENTO_LOTE_MAX,
+    ):
+        self.janela = janela
+        self.lote_max = lote_max
+        self._pendentes: List[_Pedido] = []
+        self._chegada = threading.Condition()
+        # um grupo gravado por vez; os pedidos que chegam enquanto isso formam o próximo
+        self._gravacao = threading.Lock()
+
+    def insere(self, episodio: Episodio) -> Tuple[dict, int]:
+        """Insere o Episodio no próximo grupo e aguarda a sua gravação.
+        Retorna a representação do episódio criado, ou a mensagem de erro, e o
+        status http.
+        """
+        pedido = _Pedido(episodio)
+
+        with self._chegada:
+            self._pendentes.append(pedido)
+            lider = len(self._pendentes) == 1
+            if len(self._pendentes) >= self.lote_max:
+                self._chegada.notify()
+
+        if lider:
+            with self._chegada:
+                self._chegada.wait_for(
+                    lambda: len(self._pendentes) >= self.lote_max, timeout=self.janela
+                )
+
+            with self._gravacao:
+                with self._chegada:
+                    grupo, self._pendentes = self._pendentes, []
+                self._grava(grupo)
+
+        pedido.concluido.wait()
+        return pedido.resultado
+
+    def _grava(self, grupo: List[_Pedido]):
+        session = Session.session_factory()
+
+        try:
+            aceitos = self._planeja(session, grupo)
+            session.add_all(pedido.episodio for pedido in aceitos)
+
+            try:
+                session.commit()
+            except Exception as e:
+                # um conflito não previsto, como uma escrita de outro processo, ou
+                # um erro de um dos episódios; grava cada episódio em um
+                # savepoint para isolar os que falham
+                session.rollback()
+
+                logger.warning("Erro ao gravar grupo de episódios: %s", e)
+
+                aceitos = self._grava_individualmente(session, aceitos)
+                session.commit()
+
+            if aceitos:
+                cache_respostas.invalida()
+
+                # recarrega de uma vez os episódios gravados, com id e data
+                ids = [pedido.episodio.id for pedido in aceitos]
+                session.query(Episodio).filter(Episodio.id.in_(ids)).all()
+
+            for pedido in aceitos:
+                pedido.resultado = (apresenta_episodio(pedido.episodio), 200)
+
+            logger.debug(
+                "Gravado grupo de %d inserções, %d episódios adicionados",
+                len(grupo),
+                len(aceitos),
+            )
+
+        except Exception:
+            # as consultas do grupo falharam; todos os pedidos recebem o erro padrão
+            session.rollback()
+            logger.exception("Erro ao gravar grupo de %d episódios", len(grupo))
+
+        finally:
+            session.close()
+            for pedido in grupo:
+                pedido.concluido.set()
+
+    def _planeja(self, session, grupo: List[_Pedido]) -> List[_Pedido]:
+        """Recusa com 409 os episódios que já existem na base ou que repetem
+        um anterior do grupo, pela assinatura, com uma consulta para todo o
+        grupo. Retorna os pedidos aceitos.
+        """
+        assinaturas = {pedido.episodio.assinatura for pedido in grupo}
+
+        usadas = {
+            assinatura
+            for assinatura, in session.query(Episodio.assinatura).filter(
+                Episodio.assinatura.in_(assinaturas)
+            )
+        }
+
+        aceitos = []
+        for pedido in grupo:
+            assinatura = pedido.episodio.assinatura
+            if assinatura in usadas:
+                pedido.resultado = ({"message": DUPLICADO}, 409)
+                continue
+
+            usadas.add(assinatura)
+            aceitos.append(pedido)
+
+        return aceitos
+
+    def _grava_individualmente(self, session, aceitos: List[_Pedido]) -> List[_Pedido]:
+        """Grava cada episódio em um savepoint próprio, para que a falha de um
+        não desfaça os demais. Os que falham mantêm o resultado de erro.
+        Retorna os pedidos gravados.
+        """
+        gravados = []
+        for pedido in aceitos:
+            # descarta o id atribuído na tentativa desfeita
+            pedido.episodio.id = None
+
+            try:
+                if session.execute(consulta_duplicado(pedido.episodio.assinatura)).first():
+                    pedido.resultado = ({"message": DUPLICADO}, 409)
+                    continue
+
+                with session.begin_nested():
+                    session.add(pedido.episodio)
+                    session.flush()
+            except IntegrityError:
+                pedido.resultado = ({"message": DUPLICADO}, 409)
+                continue
+            except Exception:
+                logger.exception("Erro ao gravar o episódio %s", pedido.episodio.titulo)
+                continue
+
+            gravados.append(pedido)
+
+        return gravados
+
+
+# agrupador compartilhado pelas requisições deste processo
+agrupador_insercoes = AgrupadorInsercoes()
@@ -0,0 +1,238 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from flask import Flask, Response, g, request
+from werkzeug.http import parse_date
+
+from config import (
+    CACHE_RESPOSTAS_MAX,
+    CACHE_RESPOSTAS_TTL,
+    DB_LEITURA_ATRASO_MAX,
+    DB_URL_LEITURA,
+)
+from services.compressao import (
+    NIVEIS_CACHE,
+    Representacao,
+    comprime,
+    escolhe_representacao,
+)
+
+
+@dataclass
+class RespostaCacheada:
+    """Corpo e metadados de uma resposta guardada no cache"""
+
+    corpo: bytes
+    status: int
+    mimetype: str
+    etag: str
+    # data da última alteração do conteúdo, no formato http, quando conhecida
+    last_modified: Optional[str] = None
+    # corpo comprimido em cada codificação já pedida, gerado uma única vez
+    comprimidos: Dict[str, bytes] = field(default_factory=dict)
+
+    def comprimido(self, codificacao: str) -> bytes:
+        corpo = self.comprimidos.get(codificacao)
+        if corpo is None:
+            corpo = comprime(self.corpo, codificacao, NIVEIS_CACHE[codificacao])
+            self.comprimidos[codificacao] = corpo
+        return corpo
+
+    def representacao(self, accept_encoding: Optional[str]) -> Representacao:
+        """Corpo a ser enviado para o Accept-Encoding, comprimido a partir da
+        segunda vez sem custo
+        """
+        return escolhe_representacao(
+            self.corpo, self.mimetype, self.etag, accept_encoding, self.comprimido
+        )
+
+
+class CacheRespostas:
+    """Cache de respostas em memória, limitado a `tamanho_max` entradas e com
+    remoção da entrada usada há mais tempo (LRU).
+
+    Cada entrada é guardada com a versão dos dados em que foi montada, obtida
+    com `versao_atual` no início da requisição, e só é servida enquanto a versão
+    for a mesma. A versão combina a versão compartilhada, lida da base
+    (VersaoDados), que muda com as escritas de qualquer processo, e a deste
+    processo, incrementada por `invalida`, que toda escrita na base deve chamar.
+
+    Uma resposta montada antes de uma invalidação não é guardada, mesmo que
+    termine depois dela, nem as montadas até `atraso_leitura` segundos depois,
+    tempo que uma réplica de leitura pode levar para receber a escrita. Com
+    `ttl`, as entradas expiram após `ttl` segundos.
+    """
+
+    def __init__(self, tamanho_max: int, atraso_leitura: float = 0, ttl: float = 0):
+        self.tamanho_max = tamanho_max
+        self.atraso_leitura = atraso_leitura
+        self.ttl = ttl
+        self.versao = 0
+        # chave -> (versão dos dados, momento em que foi guardada, resposta)
+        self._entradas = OrderedDict()
+        self._invalidado_em = float("-inf")
+        self._lock = threading.Lock()
+
+    def versao_atual(self, versao_dados=None) -> tuple:
+        """Versão dos dados de uma resposta montada a partir de agora, com a
+        `versao_dados` lida da base
+        """
+        return versao_dados, self.versao
+
+    def obtem(self, chave: str, versao: tuple) -> Optional[RespostaCacheada]:
+        with self._lock:
+            item = self._entradas.get(chave)
+            if item is None:
+                return None
+
+            versao_entrada, guardada_em, entrada = item
+            if versao_entrada != versao or (
+                self.ttl and time.monotonic() - guardada_em > self.ttl
+            ):
+                # os dados mudaram, inclusive por outro processo, ou a entrada expirou
+                del self._entradas[chave]
+                return None
+
+            self._entradas.move_to_end(chave)
+            return entrada
+
+    def guarda(self, chave: str, entrada: RespostaCacheada, versao: tuple):
+        with self._lock:
+            # os dados mudaram enquanto a resposta era montada
+            if versao[1] != self.versao:
+                return
+
+            # a resposta pode ter sido lida de uma réplica ainda sem a última escrita
+            if time.monotonic() - self._invalidado_em < self.atraso_leitura:
+                return
+
+            self._entradas[chave] = (versao, time.monotonic(), entrada)
+            self._entradas.move_to_end(chave)
+
+            while len(self._entradas) > self.tamanho_max:
+                self._entradas.popitem(last=False)
+
+    def invalida(self):
+        with self._lock:
+            self.versao += 1
+            self._invalidado_em = time.monotonic()
+            self._entradas.clear()
+
+
+# cache compartilhado pelos endpoints de leitura deste processo
+cache_respostas = CacheRespostas(
+    CACHE_RESPOSTAS_MAX,
+    DB_LEITURA_ATRASO_MAX if DB_URL_LEITURA else 0,
+    CACHE_RESPOSTAS_TTL,
+)
+
+
+def calcula_etag(corpo: bytes) -> str:
+    """Gera um ETag forte a partir do conteúdo da resposta"""
+    return '"%s"' % hashlib.sha1(corpo).hexdigest()
+
+
+def confere_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica se o ETag é um dos informados no cabeçalho If-None-Match"""
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return etag in [valor.strip() for valor in if_none_match.split(",")]
+
+
+def confere_data(if_modified_since: Optional[str], last_modified: Optional[str]) -> bool:
+    """Verifica se o conteúdo não mudou desde a data do If-Modified-Since"""
+    desde, alterado = parse_date(if_modified_since), parse_date(last_modified)
+    return desde is not None and alterado is not None and alterado <= desde
+
+
+def cliente_atualizado(headers, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Verifica se o cliente já tem a versão atual da resposta. O If-None-Match,
+    quando enviado, tem precedência sobre o If-Modified-Since.
+    """
+    if headers.get("If-None-Match"):
+        return confere_etag(headers.get("If-None-Match"), etag)
+    return confere_data(headers.get("If-Modified-Since"), last_modified)
+
+
+def _aplica(resposta: Response, representacao: Representacao, entrada: RespostaCacheada):
+    representacao.aplica(resposta.headers, com_corpo=resposta.status_code != 304)
+    if entrada.last_modified:
+        resposta.headers["Last-Modified"] = entrada.last_modified
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
+
+
+def configura_cache(
+    app: Flask,
+    endpoints: Iterable[str],
+    versao_dados: Callable[[], Any] = lambda: None,
+    cache: CacheRespostas = cache_respostas,
+):
+    """Ativa o cache e os ETags nas respostas GET dos `endpoints` informados.
+    `versao_dados` lê da base a versão compartilhada dos dados a cada requisição.
+
+    Requisições com If-None-Match igual ao ETag atual, ou com If-Modified-Since
+    posterior ao Last-Modified informado pelo endpoint, recebem 304 sem corpo. As
+    respostas são comprimidas conforme o Accept-Encoding, e a versão comprimida
+    é guardada junto da original.
+    """
+    endpoints = set(endpoints)
+
+    def cacheavel() -> bool:
+        return request.method == "GET" and request.endpoint in endpoints
+
+    @app.before_request
+    def responde_do_cache():
+        if not cacheavel():
+            return None
+
+        g.cache_versao = cache.versao_atual(versao_dados())
+        entrada = cache.obtem(request.full_path, g.cache_versao)
+
+        if entrada is None:
+            return None
+
+        representacao = entrada.representacao(request.headers.get("Accept-Encoding"))
+
+        if cliente_atualizado(request.headers, representacao.etag, entrada.last_modified):
+            return _aplica(Response(status=304), representacao, entrada)
+
+        resposta = Response(
+            representacao.corpo, status=entrada.status, mimetype=entrada.mimetype
+        )
+        g.cache_hit = True
+        return _aplica(resposta, representacao, entrada)
+
+    @app.after_request
+    def guarda_no_cache(resposta: Response):
+        if not cacheavel() or g.get("cache_hit") or resposta.status_code != 200:
+            return resposta
+
+        corpo = resposta.get_data()
+        entrada = RespostaCacheada(
+            corpo=corpo,
+            status=resposta.status_code,
+            mimetype=resposta.mimetype,
+            etag=calcula_etag(corpo),
+            last_modified=resposta.headers.get("Last-Modified"),
+        )
+
+        cache.guarda(request.full_path, entrada, g.cache_versao)
+
+        # a versão comprimida fica guardada na entrada para as próximas requisições
+        representacao = entrada.representacao(request.headers.get("Accept-Encoding"))
+
+        if cliente_atualizado(request.headers, representacao.etag, entrada.last_modified):
+            return _aplica(Response(status=304), representacao, entrada)
+
+        if representacao.codificacao:
+            resposta.set_data(representacao.corpo)
+        return _aplica(resposta, representacao, entrada)
@@ -0,0 +1,305 @@
+import hashlib
+import importlib
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy.exc import IntegrityError
+
+from config import (
+    CAPAS_BUSCADOR,
+    CAPAS_CACHE_MAX,
+    CAPAS_DIRETORIO,
+    CAPAS_ORIGINAL_MAX,
+    CAPAS_TAMANHOS,
+    CAPAS_TIMEOUT,
+)
+from model import Capa
+from logger import logger
+
+# nome do arquivo da imagem original, na pasta de cada capa
+ORIGINAL = "original"
+
+
+class CapaInvalidaError(Exception):
+    """A capa não pôde ser obtida ou não é uma imagem"""
+
+
+def busca_http(url: str, timeout: float = CAPAS_TIMEOUT) -> bytes:
+    """Busca uma imagem de capa por http(s), recusando as maiores que
+    CAPAS_ORIGINAL_MAX
+    """
+    if urlparse(url).scheme not in ("http", "https"):
+        raise CapaInvalidaError(f"Endereço de capa não suportado: {url}")
+
+    requisicao = urllib.request.Request(url, headers={"User-Agent": "feedcast-api"})
+
+    with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+        conteudo = resposta.read(CAPAS_ORIGINAL_MAX + 1)
+
+    if len(conteudo) > CAPAS_ORIGINAL_MAX:
+        raise CapaInvalidaError(f"Capa maior que {CAPAS_ORIGINAL_MAX} bytes: {url}")
+
+    return conteudo
+
+
+def carrega_buscador(caminho: str) -> Callable[[str], bytes]:
+    """Carrega a função de busca de capas a partir de "modulo:funcao".
+    Sem caminho, retorna a busca http padrão.
+    """
+    if not caminho:
+        return busca_http
+
+    modulo, _, funcao = caminho.partition(":")
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+@dataclass
+class ArquivoCapa:
+    """Arquivo de uma capa, ou de uma miniatura, no cache em disco"""
+
+    caminho: str
+    mimetype: str
+
+
+class CacheCapas:
+    """Cache em disco das imagens de capa, endereçado pelo hash do conteúdo.
+
+    Cada capa é buscada uma única vez por `buscador`, que recebe o endereço e
+    retorna os bytes da imagem, e gravada com miniaturas de cada um dos
+    `tamanhos`, em pixels. Capas iguais em endereços diferentes ocupam o mesmo
+    espaço. Quando o espaço ocupado passa de `tamanho_max` bytes, as capas
+    acessadas há mais tempo são removidas do disco (LRU); o registro em Capa é
+    mantido e a capa é buscada de novo se voltar a ser pedida.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        tamanho_max: int,
+        tamanhos: Iterable[int],
+        buscador: Optional[Callable[[str], bytes]] = None,
+    ):
+        self.diretorio = diretorio
+        self.tamanho_max = tamanho_max
+        self.tamanhos = sorted(tamanhos, reverse=True)
+        self._buscador = buscador
+        # bytes ocupados em disco, calculados na primeira gravação
+        self._ocupado = None
+        self._lock = threading.Lock()
+        # buscas do mesmo endereço são feitas uma de cada vez
+        self._travas = [threading.Lock() for _ in range(64)]
+
+    @property
+    def buscador(self) -> Callable[[str], bytes]:
+        if self._buscador is None:
+            self._buscador = carrega_buscador(CAPAS_BUSCADOR)
+        return self._buscador
+
+    def _pasta(self, hash_conteudo: str) -> str:
+        return os.path.join(self.diretorio, hash_conteudo[:2], hash_conteudo)
+
+    def _trava(self, url: str) -> threading.Lock:
+        return self._travas[zlib.crc32(url.encode()) % len(self._travas)]
+
+    def obtem(self, session, url: str) -> Capa:
+        """Retorna a Capa do endereço, buscando e gravando a imagem se ela ainda
+        não estiver no cache em disco.
+
+        Lança CapaInvalidaError se a imagem não puder ser obtida.
+        """
+        capa = session.query(Capa).filter(Capa.url == url).one_or_none()
+        if capa and os.path.isdir(self._pasta(capa.hash_conteudo)):
+            return capa
+
+        with self._trava(url):
+            # a capa pode ter sido gravada enquanto esperava
+            session.expire_all()
+            capa = session.query(Capa).filter(Capa.url == url).one_or_none()
+            if capa and os.path.isdir(self._pasta(capa.hash_conteudo)):
+                return capa
+
+            try:
+                conteudo = self.buscador(url)
+            except CapaInvalidaError:
+                raise
+            except Exception as e:
+                raise CapaInvalidaError(f"Não foi possível obter a capa {url}: {e}") from e
+
+            hash_conteudo, mimetype = self._grava(conteudo, url)
+
+            if capa:
+                capa.hash_conteudo, capa.mimetype = hash_conteudo, mimetype
+            else:
+                capa = Capa(url=url, hash_conteudo=hash_conteudo, mimetype=mimetype)
+                session.add(capa)
+
+            try:
+                session.commit()
+            except IntegrityError:
+                # gravada ao mesmo tempo por outro processo
+                session.rollback()
+                capa = session.query(Capa).filter(Capa.url == url).one()
+
+            logger.debug("Capa %s gravada no cache como %s", url, hash_conteudo)
+
+            return capa
+
+    def arquivo(self, session, hash_conteudo: str, tamanho: str) -> Optional[ArquivoCapa]:
+        """Retorna o arquivo da capa no `tamanho` pedido, "original" ou o lado de
+        uma miniatura, buscando de novo a capa que tenha sido removida do disco.
+        Retorna None se a capa não for conhecida.
+
+        Lança CapaInvalidaError se a imagem não puder ser obtida de novo.
+        """
+        capa = session.query(Capa).filter(Capa.hash_conteudo == hash_conteudo).first()
+        if not capa:
+            return None
+
+        pasta = self._pasta(hash_conteudo)
+        if not os.path.isdir(pasta):
+            capa = self.obtem(session, capa.url)
+            pasta = self._pasta(capa.hash_conteudo)
+
+        if tamanho != ORIGINAL and os.path.exists(os.path.join(pasta, f"{tamanho}.jpg")):
+            caminho, mimetype = os.path.join(pasta, f"{tamanho}.jpg"), "image/jpeg"
+        else:
+            # sem a miniatura, como quando o Pillow não está instalado
+            caminho, mimetype = os.path.join(pasta, ORIGINAL), capa.mimetype
+
+        try:
+            # marca a capa como usada recentemente, para a remoção LRU
+            os.utime(pasta)
+        except OSError:
+            pass
+
+        # relativo ao diretório atual, como a base de dados
+        return ArquivoCapa(caminho=os.path.abspath(caminho), mimetype=mimetype)
+
+    def _grava(self, conteudo: bytes, url: str) -> Tuple[str, str]:
+        """Grava a imagem original e as miniaturas, retornando o hash do conteúdo
+        e o tipo da imagem
+        """
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        pasta = self._pasta(hash_conteudo)
+        os.makedirs(os.path.dirname(pasta), exist_ok=True)
+
+        # monta a pasta completa ao lado e só então a coloca no lugar
+        temporaria = tempfile.mkdtemp(dir=os.path.dirname(pasta))
+        try:
+            with open(os.path.join(temporaria, ORIGINAL), "wb") as arquivo:
+                arquivo.write(conteudo)
+
+            mimetype = self._gera_miniaturas(conteudo, temporaria, url)
+
+            try:
+                os.rename(temporaria, pasta)
+            except OSError:
+                # a mesma imagem já foi gravada, a partir de outro endereço
+                shutil.rmtree(temporaria, ignore_errors=True)
+
+        except Exception:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            raise
+
+        self._libera_espaco(self._tamanho_pasta(pasta), manter=pasta)
+
+        return hash_conteudo, mimetype
+
+    def _gera_miniaturas(self, conteudo: bytes, pasta: str, url: str) -> str:
+        """Gera as miniaturas em jpeg, da maior para a menor, e retorna o tipo da
+        imagem original
+        """
+        try:
+            # importado aqui para não pesar na inicialização dos workers
+            from PIL import Image
+        except ImportError:
+            logger.warning("Pillow não instalado, capas servidas sem miniaturas")
+            return mimetypes.guess_type(url)[0] or "application/octet-stream"
+
+        try:
+            with Image.open(io.BytesIO(conteudo)) as imagem:
+                mimetype = Image.MIME.get(imagem.format, "application/octet-stream")
+
+                # jpegs grandes já são decodificados reduzidos, bem mais rápido
+                imagem.draft("RGB", (self.tamanhos[0], self.tamanhos[0]))
+                imagem = imagem.convert("RGB")
+
+                # cada miniatura é reduzida a partir da anterior, maior
+                for tamanho in self.tamanhos:
+                    imagem.thumbnail((tamanho, tamanho))
+                    imagem.save(
+                        os.path.join(pasta, f"{tamanho}.jpg"),
+                        "JPEG",
+                        quality=85,
+                        optimize=True,
+                        progressive=True,
+                    )
+
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise CapaInvalidaError(f"A capa {url} não é uma imagem válida: {e}") from e
+
+        return mimetype
+
+    @staticmethod
+    def _tamanho_pasta(pasta: str) -> int:
+        try:
+            return sum(entrada.stat().st_size for entrada in os.scandir(pasta))
+        except OSError:
+            return 0
+
+    def _pastas(self):
+        """Retorna as pastas das capas em disco, com o último acesso e o tamanho"""
+        if not os.path.isdir(self.diretorio):
+            return []
+
+        pastas = []
+        for prefixo in os.scandir(self.diretorio):
+            if not prefixo.is_dir():
+                continue
+            for pasta in os.scandir(prefixo.path):
+                if pasta.is_dir():
+                    pastas.append(
+                        (pasta.stat().st_mtime, self._tamanho_pasta(pasta.path), pasta.path)
+                    )
+        return pastas
+
+    def _libera_espaco(self, adicionado: int, manter: str):
+        """Soma os bytes gravados e, passando de `tamanho_max`, remove as capas
+        acessadas há mais tempo até ocupar 90% do limite
+        """
+        with self._lock:
+            if self._ocupado is None:
+                self._ocupado = sum(tamanho for _, tamanho, _ in self._pastas())
+            else:
+                self._ocupado += adicionado
+
+            if self._ocupado <= self.tamanho_max:
+                return
+
+            # recalcula a partir do disco, que pode ter sido alterado por outro processo
+            pastas = sorted(self._pastas())
+            self._ocupado = sum(tamanho for _, tamanho, _ in pastas)
+
+            for _, tamanho, pasta in pastas:
+                if self._ocupado <= self.tamanho_max * 0.9:
+                    break
+                if pasta == manter:
+                    continue
+
+                shutil.rmtree(pasta, ignore_errors=True)
+                self._ocupado -= tamanho
+
+                logger.debug("Capa %s removida do cache", os.path.basename(pasta))
+
+
+# cache compartilhado pelos endpoints de capa deste processo
+cache_capas = CacheCapas(CAPAS_DIRETORIO, CAPAS_CACHE_MAX, CAPAS_TAMANHOS)
@@ -0,0 +1,206 @@
+import gzip
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+from config import COMPRESSAO_TAMANHO_MIN
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# tipos de conteúdo comprimidos; imagens e áudio já chegam comprimidos
+_COMPRIMIVEIS = (
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/rss+xml",
+    "text/",
+)
+
+# níveis da compressão feita a cada resposta, que priorizam a velocidade
+NIVEIS = {"br": 4, "gzip": 6}
+
+# níveis das respostas guardadas no cache, comprimidas uma vez por versão dos dados
+NIVEIS_CACHE = {"br": 9, "gzip": 9}
+
+
+def codificacoes() -> tuple:
+    """Codificações suportadas, da preferida para a menos preferida"""
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def comprimivel(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(_COMPRIMIVEIS)
+
+
+def escolhe_codificacao(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe a codificação aceita pelo cliente no Accept-Encoding, respeitando
+    os pesos `q`, com preferência pelo brotli no empate. Retorna None para enviar
+    o conteúdo sem compressão.
+    """
+    if not accept_encoding:
+        return None
+
+    pesos = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametro = item.partition(";")
+        parametro = parametro.strip()
+
+        peso = 1.0
+        if parametro.startswith("q="):
+            try:
+                peso = float(parametro[2:])
+            except ValueError:
+                peso = 0.0
+
+        pesos[nome.strip().lower()] = peso
+
+    escolhida, maior = None, 0.0
+    for codificacao in codificacoes():
+        peso = pesos.get(codificacao, pesos.get("*", 0.0))
+        if peso > maior:
+            escolhida, maior = codificacao, peso
+
+    return escolhida
+
+
+def comprime(corpo: bytes, codificacao: str, nivel: Optional[int] = None) -> bytes:
+    nivel = nivel or NIVEIS[codificacao]
+
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=nivel)
+
+    # sem a data no cabeçalho, o mesmo conteúdo gera sempre os mesmos bytes
+    return gzip.compress(corpo, compresslevel=nivel, mtime=0)
+
+
+def comprime_fluxo(partes: Iterable[bytes], codificacao: str) -> Iterator[bytes]:
+    """Comprime uma resposta enviada aos poucos, liberando cada parte comprimida
+    assim que a parte original é recebida
+    """
+    try:
+        if codificacao == "br":
+            compressor = brotli.Compressor(quality=NIVEIS["br"])
+            for parte in partes:
+                saida = compressor.process(parte) + compressor.flush()
+                if saida:
+                    yield saida
+            yield compressor.finish()
+            return
+
+        # wbits 31: formato gzip, com cabeçalho e verificação
+        compressor = zlib.compressobj(NIVEIS["gzip"], zlib.DEFLATED, 31)
+        for parte in partes:
+            saida = compressor.compress(parte) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if saida:
+                yield saida
+        yield compressor.flush()
+
+    finally:
+        # libera os recursos da resposta original, como a sessão da exportação
+        if hasattr(partes, "close"):
+            partes.close()
+
+
+def etag_variante(etag: str, codificacao: str) -> str:
+    """ETag da versão comprimida, diferente da original como exige o HTTP"""
+    return f'{etag[:-1]}-{codificacao}"' if etag.endswith('"') else etag
+
+
+@dataclass
+class Representacao:
+    """Corpo a ser enviado ao cliente, comprimido ou não, e o seu ETag"""
+
+    corpo: bytes
+    etag: Optional[str] = None
+    codificacao: Optional[str] = None
+    # o corpo depende do Accept-Encoding da requisição
+    varia: bool = False
+
+    def aplica(self, headers, com_corpo: bool = True):
+        """Preenche os cabeçalhos da resposta, do flask ou do starlette"""
+        vary = headers.get("Vary")
+        if self.varia and "accept-encoding" not in (vary or "").lower():
+            headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.codificacao and com_corpo:
+            headers["Content-Encoding"] = self.codificacao
+
+
+def escolhe_representacao(
+    corpo: bytes,
+    mimetype: Optional[str],
+    etag: Optional[str],
+    accept_encoding: Optional[str],
+    comprimido: Optional[Callable[[str], bytes]] = None,
+    tamanho_min: int = COMPRESSAO_TAMANHO_MIN,
+) -> Representacao:
+    """Comprime o corpo se o cliente aceitar e ele tiver ao menos `tamanho_min`
+    bytes. `comprimido` retorna o corpo já comprimido, como o guardado no cache.
+    """
+    if len(corpo) < tamanho_min or not comprimivel(mimetype):
+        return Representacao(corpo=corpo, etag=etag)
+
+    codificacao = escolhe_codificacao(accept_encoding)
+    if codificacao is None:
+        return Representacao(corpo=corpo, etag=etag, varia=True)
+
+    comprimido = comprimido or (lambda codificacao: comprime(corpo, codificacao))
+
+    return Representacao(
+        corpo=comprimido(codificacao),
+        etag=etag_variante(etag, codificacao) if etag else None,
+        codificacao=codificacao,
+        varia=True,
+    )
+
+
+def configura_compressao(app: Flask, tamanho_min: int = COMPRESSAO_TAMANHO_MIN):
+    """Comprime com brotli ou gzip, conforme o Accept-Encoding, as respostas de
+    texto com ao menos `tamanho_min` bytes e as enviadas aos poucos, como a
+    exportação.
+
+    Deve ser chamada antes de `configura_cache`, para que o cache guarde as
+    respostas originais; as servidas pelo cache já saem comprimidas.
+    """
+
+    @app.after_request
+    def comprime_resposta(resposta: Response):
+        if (
+            "Content-Encoding" in resposta.headers
+            # já negociada, como nas respostas do cache
+            or "Accept-Encoding" in resposta.vary
+            or resposta.direct_passthrough
+            or resposta.status_code in (204, 304)
+            or not comprimivel(resposta.mimetype)
+        ):
+            return resposta
+
+        accept_encoding = request.headers.get("Accept-Encoding")
+
+        if resposta.is_streamed:
+            codificacao = escolhe_codificacao(accept_encoding)
+            resposta.vary.add("Accept-Encoding")
+            if codificacao:
+                resposta.response = comprime_fluxo(resposta.response, codificacao)
+                resposta.headers["Content-Encoding"] = codificacao
+            return resposta
+
+        representacao = escolhe_representacao(
+            resposta.get_data(),
+            resposta.mimetype,
+            resposta.headers.get("ETag"),
+            accept_encoding,
+            tamanho_min=tamanho_min,
+        )
+
+        if representacao.codificacao:
+            resposta.set_data(representacao.corpo)
+        representacao.aplica(resposta.headers)
+
+        return resposta
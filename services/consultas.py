@@ -0,0 +1,133 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import String, and_, literal_column, or_, select, text, type_coerce
+
+from model import Episodio, Profile, VersaoDados, episodio_fts
+from schemas.episodio import (
+    apresenta_campos_episodio,
+    apresenta_episodios,
+    codifica_cursor,
+    colunas_episodio,
+)
+
+# As consultas dos endpoints de leitura são montadas aqui, sem sessão, para serem
+# executadas tanto pela sessão síncrona do app WSGI quanto pela AsyncSession do
+# modo ASGI, com `session.execute(consulta)`.
+
+# a data é comparada no formato gravado na base, sem conversão, para usar o índice
+_data_insercao = type_coerce(Episodio.data_insercao, String)
+
+
+def consulta_episodio(episodio_id: int, campos: Optional[List[str]] = None):
+    """Consulta um Episodio pelo id; com `campos`, só as colunas pedidas"""
+    selecao = colunas_episodio(campos) if campos else [Episodio]
+    return select(*selecao).where(Episodio.id == episodio_id)
+
+
+def consulta_pagina_episodios(
+    limit: int,
+    campos: Optional[List[str]] = None,
+    cursor: Optional[Tuple[str, int]] = None,
+):
+    """Consulta uma página de Episodio, dos mais novos aos mais antigos, a partir
+    do `cursor` decodificado. Busca um item a mais para saber se existe próxima
+    página.
+    """
+    # com `fields` busca só as colunas pedidas, sem criar objetos ORM
+    selecao = colunas_episodio(campos) if campos else [Episodio]
+
+    consulta = select(
+        *selecao, Episodio.id.label("cursor_id"), _data_insercao.label("cursor_data")
+    ).order_by(Episodio.data_insercao.desc(), Episodio.id.desc())
+
+    if cursor:
+        cursor_data, cursor_id = cursor
+        # continua a partir do último episódio da página anterior
+        consulta = consulta.where(
+            or_(
+                _data_insercao < cursor_data,
+                and_(_data_insercao == cursor_data, Episodio.id < cursor_id),
+            )
+        )
+
+    return consulta.limit(limit + 1)
+
+
+def apresenta_pagina_episodios(
+    resultado: list, limit: int, campos: Optional[List[str]] = None
+) -> dict:
+    """Retorna a representação de uma página de `consulta_pagina_episodios`,
+    seguindo EpisodioListaViewSchema
+    """
+    pagina = resultado[:limit]
+
+    proximo_cursor = None
+    if len(resultado) > limit:
+        ultima = pagina[-1]
+        proximo_cursor = codifica_cursor(ultima.cursor_data, ultima.cursor_id)
+
+    if campos:
+        episodios = [apresenta_campos_episodio(linha, campos) for linha in pagina]
+    else:
+        episodios = apresenta_episodios([linha[0] for linha in pagina])["episodios"]
+
+    return {"episodios": episodios, "proximo_cursor": proximo_cursor}
+
+
+def consulta_busca_episodios(
+    termos: str, limit: int, offset: int = 0, campos: Optional[List[str]] = None
+):
+    """Consulta os Episodio que contêm os `termos`, dos mais relevantes aos menos
+    relevantes. Busca um item a mais para saber se existe próxima página.
+    """
+    # relevância bm25, com o título pesando mais que a descrição
+    relevancia = literal_column("bm25(episodio_fts, 10.0, 1.0)")
+
+    selecao = colunas_episodio(campos) if campos else [Episodio]
+
+    return (
+        select(*selecao)
+        .select_from(Episodio)
+        .join(episodio_fts, episodio_fts.c.rowid == Episodio.id)
+        .where(text("episodio_fts MATCH :termos").bindparams(termos=termos))
+        .order_by(relevancia, Episodio.id.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    )
+
+
+def apresenta_busca_episodios(
+    resultado: list, limit: int, offset: int = 0, campos: Optional[List[str]] = None
+) -> dict:
+    """Retorna a representação de uma página de `consulta_busca_episodios`,
+    seguindo EpisodioBuscaViewSchema
+    """
+    episodios = resultado[:limit]
+    proximo_offset = offset + limit if len(resultado) > limit else None
+
+    if campos:
+        episodios = [apresenta_campos_episodio(linha, campos) for linha in episodios]
+    else:
+        episodios = apresenta_episodios([linha[0] for linha in episodios])["episodios"]
+
+    return {"episodios": episodios, "proximo_offset": proximo_offset}
+
+
+def consulta_profile():
+    """Consulta o Profile único permitido"""
+    return select(Profile).limit(1)
+
+
+def consulta_duplicado(assinatura: int, episodio_id: Optional[int] = None):
+    """Consulta, pelo índice da assinatura, o id de outro episódio além de
+    `episodio_id` com o mesmo título e áudio normalizados
+    """
+    consulta = select(Episodio.id).where(Episodio.assinatura == assinatura)
+    if episodio_id is not None:
+        consulta = consulta.where(Episodio.id != episodio_id)
+    return consulta.limit(1)
+
+
+def consulta_versao_dados():
+    """Consulta a versão compartilhada dos dados, usada pelo cache de respostas"""
+    return select(VersaoDados.versao).where(VersaoDados.id == 1)
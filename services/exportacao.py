@@ -0,0 +1,64 @@
+import json
+from typing import Iterator
+
+from sqlalchemy import select
+
+from model import Episodio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# colunas exportadas, na ordem da representação de um Episodio
+COLUNAS_EXPORTACAO = (
+    Episodio.id,
+    Episodio.titulo,
+    Episodio.descricao,
+    Episodio.capa,
+    Episodio.audio,
+    Episodio.data_insercao,
+)
+
+
+def serializa_episodio(linha) -> bytes:
+    """Serializa uma linha de COLUNAS_EXPORTACAO no mesmo formato de apresenta_episodio"""
+    dados = linha._asdict()
+
+    if orjson:
+        # datas sem fuso são tratadas como UTC e terminam em "Z"
+        return orjson.dumps(dados, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+
+    dados["data_insercao"] = dados["data_insercao"].isoformat() + "Z"
+    return json.dumps(dados, ensure_ascii=False).encode()
+
+
+def _linhas_em_lotes(session, tamanho_lote: int) -> Iterator[list]:
+    """Percorre os episódios em lotes de `tamanho_lote` linhas, sem carregar a tabela
+    inteira na memória nem criar objetos ORM
+    """
+    consulta = (
+        select(*COLUNAS_EXPORTACAO)
+        .order_by(Episodio.id)
+        .execution_options(yield_per=tamanho_lote)
+    )
+
+    yield from session.execute(consulta).partitions()
+
+
+def exporta_ndjson(session, tamanho_lote: int) -> Iterator[bytes]:
+    """Gera o catálogo de episódios em NDJSON, um episódio por linha"""
+    for lote in _linhas_em_lotes(session, tamanho_lote):
+        yield b"".join(serializa_episodio(linha) + b"\n" for linha in lote)
+
+
+def exporta_json(session, tamanho_lote: int) -> Iterator[bytes]:
+    """Gera o catálogo de episódios em JSON, no formato {"episodios": [...]}"""
+    yield b'{"episodios":['
+
+    separador = b""
+    for lote in _linhas_em_lotes(session, tamanho_lote):
+        yield separador + b",".join(serializa_episodio(linha) for linha in lote)
+        separador = b","
+
+    yield b"]}"
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import IO, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import FEED_MEMORIA_MAX, FEED_TIMEOUT
+
+
+# tamanho dos blocos lidos do feed ao copiá-lo para o arquivo temporário
+TAMANHO_BLOCO = 64 * 1024
+
+
+class EnderecoFeedInvalidoError(ValueError):
+    """O endereço do feed não é uma url http(s)"""
+
+    def __init__(self):
+        super().__init__("O endereço do feed deve ser uma url http ou https")
+
+
+def url_feed_valida(url: str) -> bool:
+    """Verifica se o endereço é uma url http(s), o único tipo de feed buscado"""
+    partes = urlparse(url)
+    return partes.scheme in ("http", "https") and bool(partes.netloc)
+
+
+@dataclass
+class RespostaFeed:
+    """Resultado da busca de um feed rss.
+
+    O conteúdo fica em `arquivo`, posicionado no início, que mantém em memória
+    apenas os primeiros FEED_MEMORIA_MAX bytes. Deve ser fechado com `fecha`.
+    """
+
+    arquivo: Optional[IO[bytes]] = None
+    # hash sha256 do conteúdo, usado para saber se o feed mudou
+    hash_conteudo: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    nao_modificado: bool = False
+
+    def fecha(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+
+
+class _Copia:
+    """Arquivo temporário que recebe o conteúdo do feed em blocos, calculando o
+    hash durante a cópia, sem carregar o conteúdo inteiro em memória
+    """
+
+    def __init__(self):
+        self.arquivo = tempfile.SpooledTemporaryFile(max_size=FEED_MEMORIA_MAX)
+        self._hash = hashlib.sha256()
+
+    def escreve(self, bloco: bytes):
+        self._hash.update(bloco)
+        self.arquivo.write(bloco)
+
+    def conclui(self) -> Tuple[IO[bytes], str]:
+        """Retorna o arquivo, posicionado no início, e o hash do conteúdo"""
+        self.arquivo.seek(0)
+        return self.arquivo, self._hash.hexdigest()
+
+
+def _copia(origem: IO[bytes]) -> Tuple[IO[bytes], str]:
+    """Copia o conteúdo para um arquivo temporário, retornando-o com o hash"""
+    copia = _Copia()
+
+    for bloco in iter(lambda: origem.read(TAMANHO_BLOCO), b""):
+        copia.escreve(bloco)
+
+    return copia.conclui()
+
+
+def _cabecalhos(etag: Optional[str], last_modified: Optional[str]) -> dict:
+    headers = {"User-Agent": "feedcast-api", "Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def busca_feed(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    timeout: float = FEED_TIMEOUT,
+    arquivo_local: bool = False,
+) -> RespostaFeed:
+    """Busca o conteúdo de um feed rss.
+
+    Quando `etag` ou `last_modified` são informados a requisição é condicional e
+    um 304 do servidor é retornado com `nao_modificado` verdadeiro, sem conteúdo.
+    Com `arquivo_local`, `url` é o caminho de um arquivo lido do disco; é usado
+    só pelos benchmarks e nunca com endereços recebidos pela API.
+    Lança EnderecoFeedInvalidoError se, sem `arquivo_local`, a url não for http(s).
+    """
+    if arquivo_local:
+        with open(os.path.expanduser(url), "rb") as origem:
+            arquivo, hash_conteudo = _copia(origem)
+            return RespostaFeed(arquivo=arquivo, hash_conteudo=hash_conteudo)
+
+    if not url_feed_valida(url):
+        raise EnderecoFeedInvalidoError()
+
+    requisicao = urllib.request.Request(url, headers=_cabecalhos(etag, last_modified))
+
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            origem = resposta
+            if resposta.headers.get("Content-Encoding") == "gzip":
+                # descompacta à medida que lê
+                origem = gzip.GzipFile(fileobj=resposta)
+
+            arquivo, hash_conteudo = _copia(origem)
+
+            return RespostaFeed(
+                arquivo=arquivo,
+                hash_conteudo=hash_conteudo,
+                etag=resposta.headers.get("ETag"),
+                last_modified=resposta.headers.get("Last-Modified"),
+            )
+
+    except urllib.error.HTTPError as e:
+        # o feed não mudou desde a última busca
+        if e.code == 304:
+            return RespostaFeed(etag=etag, last_modified=last_modified, nao_modificado=True)
+        raise
+
+
+async def busca_feed_async(
+    cliente,
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    timeout: float = FEED_TIMEOUT,
+) -> RespostaFeed:
+    """Versão de `busca_feed` que não bloqueia a thread durante a requisição,
+    usada pelo modo ASGI. `cliente` é um httpx.AsyncClient, que descompacta o
+    conteúdo à medida que lê.
+    """
+    if not url_feed_valida(url):
+        raise EnderecoFeedInvalidoError()
+
+    async with cliente.stream(
+        "GET", url, headers=_cabecalhos(etag, last_modified), timeout=timeout
+    ) as resposta:
+        # o feed não mudou desde a última busca
+        if resposta.status_code == 304:
+            return RespostaFeed(etag=etag, last_modified=last_modified, nao_modificado=True)
+
+        resposta.raise_for_status()
+
+        copia = _Copia()
+        try:
+            async for bloco in resposta.aiter_bytes(TAMANHO_BLOCO):
+                copia.escreve(bloco)
+        except Exception:
+            copia.arquivo.close()
+            raise
+
+        arquivo, hash_conteudo = copia.conclui()
+
+        return RespostaFeed(
+            arquivo=arquivo,
+            hash_conteudo=hash_conteudo,
+            etag=resposta.headers.get("ETag"),
+            last_modified=resposta.headers.get("Last-Modified"),
+        )
+
+
+def le_opml(conteudo: bytes) -> List[str]:
+    """Retorna os endereços dos feeds listados em um arquivo OPML"""
+    raiz = ET.fromstring(conteudo)
+
+    return [
+        outline.get("xmlUrl")
+        for outline in raiz.iter("outline")
+        if outline.get("xmlUrl")
+    ]
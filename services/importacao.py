@@ -0,0 +1,661 @@
+import hashlib
+import queue
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from config import FEED_TIMEOUT
+from model import Episodio, Feed, Profile, assinatura_episodio
+from logger import logger
+from schemas.episodio import apresenta_episodios
+from schemas.profile import apresenta_profile
+from services.cache import cache_respostas
+from services.feed import EnderecoFeedInvalidoError, RespostaFeed, busca_feed
+from services.metricas import etapa_importacao
+from services.rss import FormatoNaoSuportadoError, LeitorRss
+
+
+class FeedInvalidoError(Exception):
+    """O conteúdo obtido não é um feed rss compatível"""
+
+
+def em_lotes(itens: Iterable, tamanho_lote: int) -> Iterator[list]:
+    """Agrupa os itens em listas de no máximo `tamanho_lote` elementos"""
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+
+    if lote:
+        yield lote
+
+
+def entrada_para_episodio(entry) -> dict:
+    """Converte uma entrada do feedparser no dicionário de colunas de um Episodio"""
+    return {
+        "titulo": entry.title,
+        "descricao": entry.summary,
+        # se não tiver uma capa, fica vazio
+        "capa": getattr(entry, "image", {}).get("href", ""),
+        "audio": entry.links[1].href if len(entry.links) > 1 else "",
+        "guid": entry.get("id") or None,
+    }
+
+
+def hash_episodio(episodio: dict) -> str:
+    """Hash sha256 do conteúdo de uma entrada do feed, para detectar edições"""
+    conteudo = "\x1f".join(
+        episodio[campo] or "" for campo in ("titulo", "descricao", "capa", "audio")
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def importa_episodios(
+    session,
+    episodios: Iterable[dict],
+    tamanho_lote: int,
+    sincronizar: bool = False,
+    progresso: Optional[Callable[..., None]] = None,
+    feed_id: Optional[int] = None,
+) -> Tuple[List[Episodio], int, List[dict]]:
+    """Grava os episódios do feed `feed_id` que ainda não existem na base e
+    atualiza os que foram editados no feed.
+
+    Os `episodios`, no formato das colunas de Episodio, são consumidos um lote
+    por vez, então cada lote é gravado assim que lido do feed. Os episódios já
+    importados são reconhecidos pelo guid, que só é único dentro do feed, e sem
+    ele pela assinatura (título e áudio normalizados); uma edição é detectada
+    pelo hash do conteúdo da entrada. As verificações são feitas com uma
+    consulta por lote, e as escritas em massa com um commit por lote.
+
+    Com `sincronizar`, a leitura para no primeiro episódio já importado e não
+    editado, já que os feeds listam os episódios mais novos primeiro.
+
+    Ao fim de cada lote `progresso`, se informado, recebe as contagens de
+    entradas `processados` e de episódios `adicionados`, e ao fim da leitura o
+    `total`.
+
+    Retorna os Episodio adicionados, a quantidade de atualizados e a lista de
+    erros encontrados.
+    """
+    adicionados = []
+    atualizados = 0
+    erros = []
+    # assinaturas e guids já vistos neste feed, para não repetir episódios dentro
+    # do próprio feed
+    guids_vistos = set()
+    assinaturas_vistas = set()
+    processados = 0
+    encerrado = False
+    lotes = em_lotes(episodios, tamanho_lote)
+
+    while not encerrado:
+        # a leitura do feed acontece aos poucos, a cada lote
+        with etapa_importacao("analise"):
+            dados = next(lotes, None)
+
+        if dados is None:
+            break
+
+        with etapa_importacao("deduplicacao"):
+            for episodio in dados:
+                episodio["feed_id"] = feed_id
+                episodio["assinatura"] = assinatura_episodio(
+                    episodio["titulo"], episodio["audio"]
+                )
+
+            guids = [episodio["guid"] for episodio in dados if episodio["guid"]]
+            assinaturas = [episodio["assinatura"] for episodio in dados]
+
+            # busca de uma vez os guids deste feed e as assinaturas do lote que
+            # já existem na base
+            por_guid = {
+                guid: (episodio_id, hash_conteudo)
+                for episodio_id, guid, hash_conteudo in session.query(
+                    Episodio.id, Episodio.guid, Episodio.hash_conteudo
+                ).filter(Episodio.feed_id == feed_id, Episodio.guid.in_(guids))
+            }
+            por_assinatura = {
+                assinatura: (episodio_id, origem)
+                for episodio_id, assinatura, origem in session.query(
+                    Episodio.id, Episodio.assinatura, Episodio.feed_id
+                ).filter(Episodio.assinatura.in_(assinaturas))
+            }
+
+            novos = []
+            edicoes = []
+            for episodio in dados:
+                processados += 1
+                titulo, guid = episodio["titulo"], episodio["guid"]
+                assinatura = episodio["assinatura"]
+                episodio["hash_conteudo"] = hash_episodio(episodio)
+
+                if guid and guid in guids_vistos:
+                    erros.append({"message": f"Episódio com título '{titulo}' já existe"})
+                    continue
+
+                if guid in por_guid:
+                    guids_vistos.add(guid)
+                    episodio_id, hash_atual = por_guid[guid]
+
+                    if hash_atual == episodio["hash_conteudo"]:
+                        if sincronizar:
+                            # o restante do feed já foi importado
+                            encerrado = True
+                            break
+
+                        erros.append({"message": f"Episódio com título '{titulo}' já existe"})
+                        continue
+
+                    if (
+                        por_assinatura.get(assinatura, (episodio_id,))[0] != episodio_id
+                        or assinatura in assinaturas_vistas
+                    ):
+                        erros.append({"message": f"Episódio com título '{titulo}' já existe"})
+                        continue
+
+                    # editado no feed desde a última importação
+                    assinaturas_vistas.add(assinatura)
+                    edicoes.append({"id": episodio_id, **episodio})
+                    continue
+
+                if assinatura in por_assinatura or assinatura in assinaturas_vistas:
+                    # se ja existir um episódio com titulo, mesmo com outras
+                    # maiúsculas ou espaços, não adiciona na lista e também joga
+                    # o erro para a lista específica
+                    erros.append({"message": f"Episódio com título '{titulo}' já existe"})
+
+                    # episódio sem feed de origem, criado pela API ou importado
+                    # antes da coluna: passa a ser reconhecido pelo guid deste feed
+                    existente = por_assinatura.get(assinatura)
+                    if guid and existente and existente[1] is None:
+                        guids_vistos.add(guid)
+                        edicoes.append(
+                            {
+                                "id": existente[0],
+                                "feed_id": feed_id,
+                                "guid": guid,
+                                "hash_conteudo": episodio["hash_conteudo"],
+                            }
+                        )
+                    continue
+
+                assinaturas_vistas.add(assinatura)
+                if guid:
+                    guids_vistos.add(guid)
+                novos.append(episodio)
+
+        if novos or edicoes:
+            with etapa_importacao("gravacao"):
+                # adiciona todos os episodios do lote que já não existiam
+                # e atualiza os editados
+                session.bulk_insert_mappings(Episodio, novos)
+                session.bulk_update_mappings(Episodio, edicoes)
+                session.commit()
+            cache_respostas.invalida()
+
+            atualizados += sum(1 for edicao in edicoes if "titulo" in edicao)
+
+            logger.debug(
+                "Adicionados %d e atualizados %d episódios do feed", len(novos), len(edicoes)
+            )
+
+        if novos:
+            # recupera os episódios inseridos para a representação com id e data
+            adicionados.extend(
+                session.query(Episodio)
+                .filter(Episodio.assinatura.in_([episodio["assinatura"] for episodio in novos]))
+                .order_by(Episodio.id)
+                .all()
+            )
+
+        if progresso:
+            progresso(processados=processados, adicionados=len(adicionados))
+
+    if progresso:
+        progresso(total=processados)
+
+    return adicionados, atualizados, erros
+
+
+def importa_profile(session, canal: dict, erros: List[dict]) -> Profile:
+    """Cria o Profile a partir do canal do feed, caso ainda não exista um"""
+    # cria perfil com o padrão do rss_feed
+    profile = Profile(**canal)
+
+    # adiciona Profile caso ainda não exista um
+    if session.query(Profile).count() == 0:
+        try:
+            # adidiconando profile
+            session.add(profile)
+            # efetivando o comando de adição de novo item na tabela
+            session.commit()
+            cache_respostas.invalida()
+
+            logger.debug("Adicionado profile de nome: %s", profile.nome)
+
+        except Exception:
+            # caso um erro fora do previsto
+            session.rollback()
+            error_msg = "Não foi possível salvar o profile"
+
+            logger.warning("Erro ao adicionar profile %s, %s", profile.nome, error_msg)
+
+            erros.append({"message": error_msg})
+
+    return profile
+
+
+@dataclass
+class FeedObtido:
+    """Feed buscado, com a leitura das entradas iniciada, pronto para ser
+    gravado na base. Os campos do feed ficam vazios quando ele não mudou desde
+    a última importação.
+    """
+
+    url: str
+    resposta: RespostaFeed
+    # dados do canal, no formato das colunas de Profile
+    canal: Optional[dict] = None
+    # episódios, no formato das colunas de Episodio, lidos sob demanda
+    episodios: Optional[Iterable[dict]] = None
+
+    @property
+    def inalterado(self) -> bool:
+        return self.episodios is None
+
+
+def analisa_feed(arquivo: IO[bytes]) -> Tuple[dict, Iterator[dict]]:
+    """Inicia a leitura de um feed, retornando os dados do canal e os episódios.
+
+    Feeds rss 2.0 são lidos de forma incremental, um item por vez. Outros
+    formatos, como Atom, e documentos malformados, mesmo que o erro esteja depois
+    dos primeiros itens, são lidos pelo feedparser, mais tolerante, que carrega
+    o feed inteiro em memória.
+
+    Lança FeedInvalidoError se o conteúdo não for um feed compatível.
+    """
+    try:
+        leitor = LeitorRss(arquivo).inicia()
+        canal, episodios = leitor.canal, leitor.entradas()
+
+    except (FormatoNaoSuportadoError, ET.ParseError):
+        # importado aqui para não pesar na inicialização dos workers
+        import feedparser
+
+        arquivo.seek(0)
+        feed = feedparser.parse(arquivo)
+
+        # se não encontrou um título, o feed não é compatível
+        if not feed or "title" not in feed.feed:
+            raise FeedInvalidoError("Feed RSS inválido ou inacessível")
+
+        canal = {
+            "nome": feed.feed.title,
+            "autor": feed.feed.get("author", ""),
+            "descricao": feed.feed.get("summary", ""),
+            "capa": feed.feed.get("image", {}).get("href", ""),
+        }
+        episodios = (entrada_para_episodio(entry) for entry in feed.entries)
+
+    if not canal["nome"]:
+        raise FeedInvalidoError("Feed RSS inválido ou inacessível")
+
+    return canal, episodios
+
+
+def condicoes_busca(estado: Optional[Feed], forcar: bool = False) -> dict:
+    """Retorna o estado da última busca do feed usado para a busca condicional"""
+    if not estado or forcar:
+        return {}
+
+    return {
+        "etag": estado.etag,
+        "last_modified": estado.last_modified,
+        "hash_anterior": estado.hash_conteudo,
+    }
+
+
+def obtem_feed(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    hash_anterior: Optional[str] = None,
+    timeout: float = FEED_TIMEOUT,
+    arquivo_local: bool = False,
+) -> FeedObtido:
+    """Busca um feed rss e inicia a sua leitura, sem acessar a base.
+
+    A busca é condicional quando `etag` ou `last_modified` são informados. Se o
+    servidor responder 304, ou se o hash do conteúdo for igual a `hash_anterior`,
+    o feed não é analisado. `arquivo_local` é repassado a `busca_feed`.
+
+    Lança FeedInvalidoError se o conteúdo não for um feed compatível.
+    """
+    with etapa_importacao("busca"):
+        resposta = busca_feed(
+            url,
+            etag=etag,
+            last_modified=last_modified,
+            timeout=timeout,
+            arquivo_local=arquivo_local,
+        )
+
+    return analisa_resposta(url, resposta, hash_anterior)
+
+
+def analisa_resposta(
+    url: str, resposta: RespostaFeed, hash_anterior: Optional[str] = None
+) -> FeedObtido:
+    """Inicia a leitura do feed buscado, a menos que ele não tenha mudado desde a
+    última importação. Lança FeedInvalidoError se o conteúdo não for um feed
+    compatível.
+    """
+    if resposta.nao_modificado or (
+        hash_anterior and resposta.hash_conteudo == hash_anterior
+    ):
+        logger.debug("Feed %s não mudou desde a última importação", url)
+        resposta.fecha()
+        return FeedObtido(url=url, resposta=resposta)
+
+    # lê o canal do rss_feed; os episódios são lidos durante a gravação
+    try:
+        with etapa_importacao("analise"):
+            canal, episodios = analisa_feed(resposta.arquivo)
+    except Exception:
+        resposta.fecha()
+        raise
+
+    return FeedObtido(url=url, resposta=resposta, canal=canal, episodios=episodios)
+
+
+def grava_feed(
+    session,
+    obtido: FeedObtido,
+    tamanho_lote: int,
+    sincronizar: bool = False,
+    progresso: Optional[Callable[..., None]] = None,
+) -> dict:
+    """Grava o profile e os episódios de um feed obtido, e o estado da sua busca.
+    `sincronizar` é repassado a `importa_episodios`.
+
+    Retorna a representação da importação, seguindo ImportacaoFeedViewSchema.
+    """
+    estado = session.query(Feed).filter(Feed.url == obtido.url).one_or_none()
+
+    if obtido.inalterado:
+        if estado:
+            estado.data_verificacao = func.now()
+            session.commit()
+
+        return {
+            "perfil": {},
+            "episodios": [],
+            "erros": [],
+            "atualizados": 0,
+            "inalterado": True,
+        }
+
+    # cria uma lista para mandar todo os erros encontrados durante a importação
+    erros_encontrados = []
+
+    # o estado da busca identifica o feed de origem dos episódios; é gravado
+    # antes deles, para que o id não se perca em um rollback durante a importação
+    if not estado:
+        estado = Feed(url=obtido.url)
+        session.add(estado)
+        session.commit()
+
+    try:
+        profile = importa_profile(session, obtido.canal, erros_encontrados)
+
+        # grava os episódios do feed em lotes, à medida que são lidos,
+        # ignorando os que já existem
+        episodios_no_feed, atualizados, erros_episodios = importa_episodios(
+            session,
+            obtido.episodios,
+            tamanho_lote,
+            sincronizar=sincronizar,
+            progresso=progresso,
+            feed_id=estado.id,
+        )
+    finally:
+        obtido.resposta.fecha()
+
+    erros_encontrados.extend(erros_episodios)
+
+    # guarda o estado da busca para as próximas importações serem condicionais
+    estado.etag = obtido.resposta.etag
+    estado.last_modified = obtido.resposta.last_modified
+    estado.hash_conteudo = obtido.resposta.hash_conteudo
+    estado.data_verificacao = func.now()
+    session.commit()
+
+    # cria representacao
+    return {
+        "perfil": apresenta_profile(profile) if profile.data_insercao else {},
+        "episodios": (
+            apresenta_episodios(episodios_no_feed).get("episodios", [])
+            if episodios_no_feed
+            else []
+        ),
+        "erros": erros_encontrados,
+        "atualizados": atualizados,
+        "inalterado": False,
+    }
+
+
+def importa_feed(
+    session,
+    url: str,
+    tamanho_lote: int,
+    forcar: bool = False,
+    sincronizar: bool = False,
+    progresso: Optional[Callable[..., None]] = None,
+    arquivo_local: bool = False,
+) -> dict:
+    """Importa o profile e os episódios de um feed rss.
+
+    O estado da última busca do feed (ETag, Last-Modified e hash do conteúdo) é
+    guardado em Feed, e as próximas importações fazem uma requisição condicional.
+    Se o servidor responder 304, ou se o conteúdo for idêntico ao da última
+    importação, o feed não é analisado e nada é gravado. `forcar` ignora o estado.
+    Com `sincronizar`, o feed é lido só até o primeiro episódio já importado e
+    não editado.
+    `progresso` recebe o andamento da gravação e, ao fim, o `total` de entradas.
+    `arquivo_local` é repassado a `busca_feed`.
+
+    Retorna a representação da importação, seguindo ImportacaoFeedViewSchema.
+    Lança FeedInvalidoError se o conteúdo não for um feed compatível.
+    """
+    estado = session.query(Feed).filter(Feed.url == url).one_or_none()
+
+    obtido = obtem_feed(url, arquivo_local=arquivo_local, **condicoes_busca(estado, forcar))
+
+    return grava_feed(
+        session, obtido, tamanho_lote, sincronizar=sincronizar, progresso=progresso
+    )
+
+
+def mensagem_falha(erro: Exception) -> str:
+    """Mensagem, para o cliente, do erro que impediu a importação de um feed.
+    Erros da busca, como os de rede, podem conter endereços e caminhos internos
+    e ficam apenas no log.
+    """
+    if isinstance(erro, (FeedInvalidoError, EnderecoFeedInvalidoError)):
+        return str(erro)
+    return "Não foi possível buscar o feed"
+
+
+def relatorio_falha(erro: Exception) -> dict:
+    """Relatório de um feed que não pôde ser importado, no formato de
+    ImportacaoFeedRelatorioSchema
+    """
+    return {
+        "perfil": {},
+        "episodios": [],
+        "erros": [],
+        "atualizados": 0,
+        "inalterado": False,
+        "message": mensagem_falha(erro),
+    }
+
+
+_FIM = object()
+
+
+class LeituraAntecipada:
+    """Episódios de um feed analisados em outra thread, à frente da gravação.
+
+    A thread da análise executa `produz`, que guarda no máximo `lotes_max` lotes
+    de `tamanho_lote` episódios à espera da gravação; a thread da gravação
+    consome os episódios iterando sobre o objeto e, ao terminar, mesmo sem ler
+    todos, chama `cancela` para liberar a thread da análise.
+    """
+
+    def __init__(self, episodios: Iterator[dict], tamanho_lote: int, lotes_max: int = 2):
+        self._episodios = episodios
+        self._tamanho_lote = tamanho_lote
+        self._fila = queue.Queue(maxsize=lotes_max)
+        self._cancelada = threading.Event()
+
+    def produz(self):
+        try:
+            for lote in em_lotes(self._episodios, self._tamanho_lote):
+                if not self._entrega(lote):
+                    return
+            self._entrega(_FIM)
+
+        except Exception as e:
+            # repassado à gravação, como aconteceria com a leitura na mesma thread
+            self._entrega(e)
+
+    def _entrega(self, item) -> bool:
+        """Aguarda espaço na fila; retorna False se a leitura foi cancelada"""
+        while not self._cancelada.is_set():
+            try:
+                self._fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def cancela(self):
+        self._cancelada.set()
+
+        # descarta os lotes não lidos, liberando a análise que aguarda espaço
+        while True:
+            try:
+                self._fila.get_nowait()
+            except queue.Empty:
+                return
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            item = self._fila.get()
+            if item is _FIM:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+
+def _obtem_antecipado(
+    prontos: queue.Queue, url: str, tamanho_lote: int, timeout: float, **condicoes
+):
+    """Busca e analisa um feed em uma thread do pool. O feed é entregue em
+    `prontos` assim que o canal é lido, e os episódios continuam a ser analisados
+    nesta thread enquanto a gravação os consome.
+    """
+    try:
+        obtido = obtem_feed(url, timeout=timeout, **condicoes)
+    except Exception as e:
+        prontos.put((url, None, e))
+        return
+
+    if obtido.inalterado:
+        prontos.put((url, obtido, None))
+        return
+
+    leitura = LeituraAntecipada(obtido.episodios, tamanho_lote)
+    obtido.episodios = leitura
+    prontos.put((url, obtido, None))
+    leitura.produz()
+
+
+def importa_feeds(
+    session,
+    urls: List[str],
+    tamanho_lote: int,
+    concorrencia: int,
+    timeout: float = FEED_TIMEOUT,
+    forcar: bool = False,
+    sincronizar: bool = False,
+) -> List[dict]:
+    """Importa vários feeds rss.
+
+    Os feeds são buscados e analisados em paralelo, até `concorrencia` por vez e
+    com `timeout` segundos por feed. A gravação na base é feita na thread atual,
+    um feed por vez e em lotes, à medida que cada feed fica pronto; enquanto um
+    feed é gravado, os seus episódios continuam a ser analisados na thread que o
+    buscou, no máximo alguns lotes à frente, para que a memória usada continue
+    limitada (LeituraAntecipada).
+
+    Retorna um relatório por feed, na ordem recebida, seguindo
+    ImportacaoFeedRelatorioSchema.
+    """
+    # remove endereços repetidos, mantendo a ordem
+    urls = list(dict.fromkeys(urls))
+
+    estados = {
+        estado.url: condicoes_busca(estado, forcar)
+        for estado in session.query(Feed).filter(Feed.url.in_(urls))
+    }
+
+    relatorios = {}
+    # (url, feed obtido, erro) de cada feed, na ordem em que ficam prontos
+    prontos = queue.Queue()
+
+    with ThreadPoolExecutor(
+        max_workers=concorrencia, thread_name_prefix="feed"
+    ) as executor:
+        for url in urls:
+            executor.submit(
+                _obtem_antecipado,
+                prontos,
+                url,
+                tamanho_lote,
+                timeout,
+                **estados.get(url, {}),
+            )
+
+        for _ in urls:
+            url, obtido, erro = prontos.get()
+
+            try:
+                if erro is not None:
+                    raise erro
+
+                relatorio = grava_feed(session, obtido, tamanho_lote, sincronizar=sincronizar)
+
+            except Exception as e:
+                session.rollback()
+
+                logger.warning("Erro ao importar o feed %s: %s", url, e)
+
+                relatorio = relatorio_falha(e)
+
+            finally:
+                # libera a thread da análise, mesmo que a gravação pare antes do fim
+                if obtido is not None and isinstance(obtido.episodios, LeituraAntecipada):
+                    obtido.episodios.cancela()
+
+            relatorios[url] = {"feed": url, **relatorio}
+
+    return [relatorios[url] for url in urls]
@@ -0,0 +1,164 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from config import FEED_TIMEOUT, IMPORTACAO_ASYNC_MAX
+from model import Feed, Session
+from logger import logger
+from services.feed import busca_feed_async
+from services.importacao import (
+    FeedObtido,
+    analisa_resposta,
+    condicoes_busca,
+    grava_feed,
+    relatorio_falha,
+)
+from services.metricas import etapa_importacao
+from services.tarefas import FilaCheiaError, conclui_importacao, inicia_importacao
+
+# Importação de feeds do modo ASGI (asgi.py). A busca dos feeds é feita no loop de
+# eventos, sem ocupar uma thread enquanto espera o servidor; a análise e a
+# gravação, que usam a cpu e a Session síncrona, rodam em threads, com a mesma
+# lógica da importação do app WSGI.
+
+# as gravações são feitas uma de cada vez, como na importação de vários feeds
+_gravacao = asyncio.Lock()
+
+# importações agendadas e em andamento; a referência impede que sejam descartadas
+_em_andamento = set()
+
+
+async def obtem_feed_async(
+    cliente,
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    hash_anterior: Optional[str] = None,
+    timeout: float = FEED_TIMEOUT,
+) -> FeedObtido:
+    """Versão de `obtem_feed` que busca o feed com o httpx.AsyncClient `cliente`"""
+    with etapa_importacao("busca"):
+        resposta = await busca_feed_async(
+            cliente, url, etag=etag, last_modified=last_modified, timeout=timeout
+        )
+
+    return await asyncio.to_thread(analisa_resposta, url, resposta, hash_anterior)
+
+
+def _condicoes(urls: List[str], forcar: bool) -> Dict[str, dict]:
+    session = Session()
+    try:
+        return {
+            estado.url: condicoes_busca(estado, forcar)
+            for estado in session.query(Feed).filter(Feed.url.in_(urls))
+        }
+    finally:
+        Session.remove()
+
+
+def _grava(obtido: FeedObtido, tamanho_lote: int, sincronizar: bool) -> dict:
+    session = Session()
+    try:
+        return grava_feed(session, obtido, tamanho_lote, sincronizar=sincronizar)
+
+    except Exception as e:
+        session.rollback()
+
+        logger.warning("Erro ao importar o feed %s: %s", obtido.url, e)
+
+        return relatorio_falha(e)
+
+    finally:
+        Session.remove()
+
+
+async def importa_feeds_async(
+    cliente,
+    urls: List[str],
+    tamanho_lote: int,
+    concorrencia: int,
+    timeout: float = FEED_TIMEOUT,
+    forcar: bool = False,
+    sincronizar: bool = False,
+) -> List[dict]:
+    """Versão de `importa_feeds` para o modo ASGI: até `concorrencia` feeds são
+    buscados ao mesmo tempo e cada um é gravado assim que fica pronto.
+
+    Retorna um relatório por feed, na ordem recebida, seguindo
+    ImportacaoFeedRelatorioSchema.
+    """
+    # remove endereços repetidos, mantendo a ordem
+    urls = list(dict.fromkeys(urls))
+
+    estados = await asyncio.to_thread(_condicoes, urls, forcar)
+    vagas = asyncio.Semaphore(concorrencia)
+
+    async def importa(url: str) -> dict:
+        try:
+            async with vagas:
+                obtido = await obtem_feed_async(
+                    cliente, url, timeout=timeout, **estados.get(url, {})
+                )
+
+        except Exception as e:
+            logger.warning("Erro ao importar o feed %s: %s", url, e)
+            return relatorio_falha(e)
+
+        async with _gravacao:
+            return await asyncio.to_thread(_grava, obtido, tamanho_lote, sincronizar)
+
+    relatorios = await asyncio.gather(*(importa(url) for url in urls))
+
+    return [{"feed": url, **relatorio} for url, relatorio in zip(urls, relatorios)]
+
+
+async def executa_importacao_async(
+    cliente,
+    importacao_id: int,
+    tamanho_lote: int,
+    forcar: bool = False,
+    sincronizar: bool = False,
+):
+    """Versão de `executa_importacao` que busca o feed com o httpx.AsyncClient
+    `cliente`
+    """
+    try:
+        url, condicoes = await asyncio.to_thread(inicia_importacao, importacao_id, forcar)
+    except Exception:
+        logger.exception("Não foi possível registrar a importação %s", importacao_id)
+        return
+
+    try:
+        obtido, erro = await obtem_feed_async(cliente, url, **condicoes), None
+    except Exception as e:
+        obtido, erro = None, e
+
+    async with _gravacao:
+        await asyncio.to_thread(
+            conclui_importacao, importacao_id, tamanho_lote, sincronizar, obtido, erro
+        )
+
+
+def enfileira_importacao_async(
+    cliente,
+    importacao_id: int,
+    tamanho_lote: int,
+    forcar: bool = False,
+    sincronizar: bool = False,
+):
+    """Agenda a execução da Importacao no loop de eventos atual.
+    Lança FilaCheiaError se já houver IMPORTACAO_ASYNC_MAX em andamento.
+    """
+    if len(_em_andamento) >= IMPORTACAO_ASYNC_MAX:
+        raise FilaCheiaError("Fila de importações cheia, tente novamente mais tarde")
+
+    tarefa = asyncio.create_task(
+        executa_importacao_async(cliente, importacao_id, tamanho_lote, forcar, sincronizar)
+    )
+    _em_andamento.add(tarefa)
+    tarefa.add_done_callback(_em_andamento.discard)
+
+
+async def aguarda_importacoes():
+    """Aguarda o fim das importações em andamento, no encerramento do servidor"""
+    if _em_andamento:
+        await asyncio.gather(*_em_andamento, return_exceptions=True)
@@ -0,0 +1,276 @@
+from typing import List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from model import Episodio, assinatura_episodio
+from logger import logger
+from services.cache import cache_respostas
+from services.consultas import consulta_duplicado
+from services.importacao import em_lotes
+
+# limite de parâmetros por consulta IN, abaixo do limite do sqlite
+TAMANHO_CONSULTA = 900
+
+DUPLICADO = "Episódio com mesmo título já salvo na base"
+
+
+def _resultado(indice: int, operacao, status: int, message: str, episodio_id=None) -> dict:
+    return {
+        "indice": indice,
+        "acao": operacao.acao,
+        "status": status,
+        "id": episodio_id,
+        "message": message,
+    }
+
+
+def _dados_episodio(operacao) -> dict:
+    return {
+        "titulo": operacao.episodio.titulo,
+        "audio": operacao.episodio.audio,
+        "capa": operacao.episodio.capa,
+        "descricao": operacao.episodio.descricao,
+    }
+
+
+def _planeja(session, operacoes) -> tuple:
+    """Valida as operações em ordem contra o estado atual da base.
+
+    O estado dos ids e das assinaturas (título e áudio normalizados) envolvidos
+    é lido com poucas consultas e atualizado em memória a cada operação, para
+    que operações do mesmo lote enxerguem as anteriores (ex.: remover um
+    episódio e criar outro com o mesmo título).
+
+    Retorna os resultados por operação e as escritas válidas a aplicar.
+    """
+    ids = {operacao.id for operacao in operacoes if operacao.acao != "criar"}
+    assinaturas = {
+        indice: assinatura_episodio(operacao.episodio.titulo, operacao.episodio.audio)
+        for indice, operacao in enumerate(operacoes)
+        if operacao.episodio
+    }
+
+    # id -> assinatura dos episódios referenciados e assinatura -> id das usadas
+    assinatura_por_id = {}
+    for lote in em_lotes(ids, TAMANHO_CONSULTA):
+        assinatura_por_id.update(
+            session.query(Episodio.id, Episodio.assinatura).filter(Episodio.id.in_(lote))
+        )
+
+    id_por_assinatura = {}
+    for lote in em_lotes(set(assinaturas.values()), TAMANHO_CONSULTA):
+        id_por_assinatura.update(
+            session.query(Episodio.assinatura, Episodio.id).filter(
+                Episodio.assinatura.in_(lote)
+            )
+        )
+
+    resultados = []
+    insercoes, atualizacoes, remocoes = [], [], []
+
+    for indice, operacao in enumerate(operacoes):
+        if operacao.acao == "criar":
+            assinatura = assinaturas[indice]
+            if assinatura in id_por_assinatura:
+                resultados.append(_resultado(indice, operacao, 409, DUPLICADO))
+                continue
+
+            # reserva a assinatura; o id só é conhecido após a inserção
+            id_por_assinatura[assinatura] = None
+            insercoes.append(
+                (indice, {**_dados_episodio(operacao), "assinatura": assinatura})
+            )
+            resultados.append(_resultado(indice, operacao, 200, "Episódio adicionado"))
+            continue
+
+        episodio_id = operacao.id
+        if episodio_id not in assinatura_por_id:
+            resultados.append(
+                _resultado(
+                    indice,
+                    operacao,
+                    404,
+                    f"Episódio com ID {episodio_id} não encontrado",
+                    episodio_id,
+                )
+            )
+            continue
+
+        assinatura_atual = assinatura_por_id[episodio_id]
+
+        if operacao.acao == "remover":
+            del assinatura_por_id[episodio_id]
+            id_por_assinatura.pop(assinatura_atual, None)
+            remocoes.append(episodio_id)
+            # as remoções são aplicadas antes das atualizações; uma atualização
+            # anterior do mesmo episódio não tem mais efeito
+            atualizacoes = [
+                (anterior, dados) for anterior, dados in atualizacoes
+                if dados["id"] != episodio_id
+            ]
+            resultados.append(
+                _resultado(indice, operacao, 200, "Episódio removido", episodio_id)
+            )
+            continue
+
+        # atualizar
+        assinatura = assinaturas[indice]
+        if id_por_assinatura.get(assinatura, episodio_id) != episodio_id:
+            resultados.append(_resultado(indice, operacao, 409, DUPLICADO, episodio_id))
+            continue
+
+        id_por_assinatura.pop(assinatura_atual, None)
+        id_por_assinatura[assinatura] = episodio_id
+        assinatura_por_id[episodio_id] = assinatura
+        atualizacoes.append(
+            (
+                indice,
+                {"id": episodio_id, **_dados_episodio(operacao), "assinatura": assinatura},
+            )
+        )
+        resultados.append(
+            _resultado(indice, operacao, 200, "Episódio atualizado", episodio_id)
+        )
+
+    return resultados, insercoes, atualizacoes, remocoes
+
+
+def _aplica_em_massa(session, insercoes, atualizacoes, remocoes) -> dict:
+    """Aplica as escritas planejadas em massa, sem commit.
+    Retorna o id de cada episódio inserido, pela assinatura.
+    """
+    for lote in em_lotes(remocoes, TAMANHO_CONSULTA):
+        session.query(Episodio).filter(Episodio.id.in_(lote)).delete(
+            synchronize_session=False
+        )
+
+    if atualizacoes:
+        session.bulk_update_mappings(Episodio, [dados for _, dados in atualizacoes])
+
+    if insercoes:
+        session.bulk_insert_mappings(Episodio, [dados for _, dados in insercoes])
+
+    ids = {}
+    assinaturas = [dados["assinatura"] for _, dados in insercoes]
+    for lote in em_lotes(assinaturas, TAMANHO_CONSULTA):
+        ids.update(
+            session.query(Episodio.assinatura, Episodio.id).filter(
+                Episodio.assinatura.in_(lote)
+            )
+        )
+
+    return ids
+
+
+def _aplica_individualmente(session, operacoes) -> List[dict]:
+    """Aplica cada operação em um savepoint próprio, para que a falha de uma não
+    desfaça as demais. Usado quando a aplicação em massa falha.
+    """
+    resultados = []
+
+    for indice, operacao in enumerate(operacoes):
+        try:
+            with session.begin_nested():
+                if operacao.acao == "criar":
+                    episodio = Episodio(**_dados_episodio(operacao))
+
+                    if session.execute(consulta_duplicado(episodio.assinatura)).first():
+                        resultados.append(_resultado(indice, operacao, 409, DUPLICADO))
+                        continue
+
+                    session.add(episodio)
+                    session.flush()
+                    resultados.append(
+                        _resultado(indice, operacao, 200, "Episódio adicionado", episodio.id)
+                    )
+                    continue
+
+                episodio = session.query(Episodio).filter(
+                    Episodio.id == operacao.id
+                ).one_or_none()
+
+                if not episodio:
+                    resultados.append(
+                        _resultado(
+                            indice,
+                            operacao,
+                            404,
+                            f"Episódio com ID {operacao.id} não encontrado",
+                            operacao.id,
+                        )
+                    )
+                    continue
+
+                if operacao.acao == "remover":
+                    session.delete(episodio)
+                    message = "Episódio removido"
+                else:
+                    assinatura = assinatura_episodio(
+                        operacao.episodio.titulo, operacao.episodio.audio
+                    )
+                    if session.execute(consulta_duplicado(assinatura, episodio.id)).first():
+                        resultados.append(
+                            _resultado(indice, operacao, 409, DUPLICADO, operacao.id)
+                        )
+                        continue
+
+                    for campo, valor in _dados_episodio(operacao).items():
+                        setattr(episodio, campo, valor)
+                    message = "Episódio atualizado"
+
+                session.flush()
+                resultados.append(_resultado(indice, operacao, 200, message, operacao.id))
+
+        except IntegrityError:
+            resultados.append(_resultado(indice, operacao, 409, DUPLICADO, operacao.id))
+
+        except StaleDataError:
+            # removido por outra escrita depois da consulta
+            resultados.append(
+                _resultado(
+                    indice,
+                    operacao,
+                    404,
+                    f"Episódio com ID {operacao.id} não encontrado",
+                    operacao.id,
+                )
+            )
+
+    return resultados
+
+
+def aplica_operacoes(session, operacoes) -> List[dict]:
+    """Aplica um lote de operações de criação, atualização e remoção de Episodio
+    em uma única transação.
+
+    As operações são validadas antes, com poucas consultas, e as válidas são
+    gravadas em massa. Operações com conflito (404, 409) são recusadas sem
+    impedir as demais.
+
+    Retorna o resultado de cada operação, na ordem recebida, seguindo
+    EpisodioOperacaoResultadoSchema.
+    """
+    resultados, insercoes, atualizacoes, remocoes = _planeja(session, operacoes)
+
+    try:
+        ids = _aplica_em_massa(session, insercoes, atualizacoes, remocoes)
+        session.commit()
+
+        for indice, dados in insercoes:
+            resultados[indice]["id"] = ids.get(dados["assinatura"])
+
+    except (IntegrityError, StaleDataError) as e:
+        # um conflito não previsto, como uma escrita concorrente que grava um
+        # duplicado ou remove um episódio atualizado; reaplica as operações uma
+        # a uma para isolar as que falham
+        session.rollback()
+
+        logger.warning("Erro ao aplicar lote de episódios em massa: %s", e)
+
+        resultados = _aplica_individualmente(session, operacoes)
+        session.commit()
+
+    cache_respostas.invalida()
+
+    return resultados
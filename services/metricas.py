@@ -0,0 +1,158 @@
+import os
+import time
+from typing import Iterable
+
+from flask import Flask, Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+REQUISICAO_DURACAO = Histogram(
+    "feedcast_http_request_duration_seconds",
+    "Duração das requisições HTTP",
+    ["metodo", "endpoint", "status"],
+)
+
+REQUISICOES_EM_ANDAMENTO = Gauge(
+    "feedcast_http_requests_in_progress",
+    "Requisições HTTP em andamento",
+    ["metodo", "endpoint"],
+    multiprocess_mode="livesum",
+)
+
+RESPOSTA_BYTES = Counter(
+    "feedcast_http_response_bytes",
+    "Bytes enviados no corpo das respostas HTTP",
+    ["metodo", "endpoint"],
+)
+
+SQL_CONSULTAS_REQUISICAO = Histogram(
+    "feedcast_sql_queries_per_request",
+    "Quantidade de comandos SQL executados por requisição",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+
+SQL_DURACAO_REQUISICAO = Histogram(
+    "feedcast_sql_duration_per_request_seconds",
+    "Tempo gasto em comandos SQL por requisição",
+    ["endpoint"],
+)
+
+SQL_CONSULTAS = Counter(
+    "feedcast_sql_queries",
+    "Comandos SQL executados, inclusive fora de requisições",
+)
+
+SQL_DURACAO = Counter(
+    "feedcast_sql_duration_seconds",
+    "Tempo total gasto em comandos SQL, inclusive fora de requisições",
+)
+
+IMPORTACAO_ETAPA_DURACAO = Histogram(
+    "feedcast_import_stage_duration_seconds",
+    "Duração das etapas da importação de feeds: busca, analise, deduplicacao e gravacao",
+    ["etapa"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+def etapa_importacao(etapa: str):
+    """Mede a duração de uma etapa da importação. Uso: `with etapa_importacao("busca"):`"""
+    return IMPORTACAO_ETAPA_DURACAO.labels(etapa).time()
+
+
+def _endpoint() -> str:
+    return request.endpoint or "nao_encontrado"
+
+
+def _inicia_comando(conexao, cursor, comando, parametros, contexto, executemany):
+    # no contexto da execução, descartado mesmo quando o comando falha
+    contexto._metricas_inicio = time.perf_counter()
+
+
+def _finaliza_comando(conexao, cursor, comando, parametros, contexto, executemany):
+    duracao = time.perf_counter() - contexto._metricas_inicio
+
+    SQL_CONSULTAS.inc()
+    SQL_DURACAO.inc(duracao)
+
+    if has_request_context() and "sql_consultas" in g:
+        g.sql_consultas += 1
+        g.sql_duracao += duracao
+
+
+def instrumenta_engine(engine):
+    """Conta os comandos SQL e o tempo gasto neles, por requisição e no total"""
+    # a engine é compartilhada: vários apps criados não devem contar em dobro
+    if event.contains(engine, "before_cursor_execute", _inicia_comando):
+        return
+
+    event.listen(engine, "before_cursor_execute", _inicia_comando)
+    event.listen(engine, "after_cursor_execute", _finaliza_comando)
+
+
+def _registro():
+    """Com vários processos (gunicorn), agrega as métricas de todos os workers"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return registro
+
+    return REGISTRY
+
+
+def configura_metricas(app: Flask, engines: Iterable):
+    """Instrumenta todas as rotas do app e os comandos SQL das `engines`, e
+    expõe as métricas em /metrics.
+
+    Deve ser chamada antes de outros `before_request` que possam responder
+    diretamente, como o cache, para que essas respostas também sejam medidas.
+    """
+    for engine in engines:
+        instrumenta_engine(engine)
+
+    @app.before_request
+    def inicia_requisicao():
+        g.metricas_inicio = time.perf_counter()
+        g.sql_consultas = 0
+        g.sql_duracao = 0.0
+        REQUISICOES_EM_ANDAMENTO.labels(request.method, _endpoint()).inc()
+
+    @app.after_request
+    def registra_resposta(resposta: Response):
+        g.metricas_status = resposta.status_code
+
+        # respostas enviadas aos poucos não têm tamanho conhecido
+        if resposta.content_length is not None:
+            RESPOSTA_BYTES.labels(request.method, _endpoint()).inc(resposta.content_length)
+
+        return resposta
+
+    @app.teardown_request
+    def finaliza_requisicao(exception=None):
+        if "metricas_inicio" not in g:
+            return
+
+        metodo, endpoint = request.method, _endpoint()
+        status = g.get("metricas_status", 500)
+
+        REQUISICAO_DURACAO.labels(metodo, endpoint, str(status)).observe(
+            time.perf_counter() - g.metricas_inicio
+        )
+        REQUISICOES_EM_ANDAMENTO.labels(metodo, endpoint).dec()
+        SQL_CONSULTAS_REQUISICAO.labels(endpoint).observe(g.sql_consultas)
+        SQL_DURACAO_REQUISICAO.labels(endpoint).observe(g.sql_duracao)
+
+    @app.get("/metrics", doc_ui=False)
+    def metrics():
+        """Expõe as métricas da aplicação no formato texto do Prometheus"""
+        return Response(generate_latest(_registro()), content_type=CONTENT_TYPE_LATEST)
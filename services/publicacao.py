@@ -0,0 +1,140 @@
+import mimetypes
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy import func
+
+from config import PUBLICACAO_TAMANHO_LOTE
+from model import Episodio, Profile
+from services.importacao import em_lotes
+
+ITUNES = "http://www.itunes.com/dtds/podcast-1.0.dtd"
+
+# momento da última alteração de cada episódio; os anteriores à coluna usam a inserção
+_versao = func.coalesce(Episodio.data_atualizacao, Episodio.data_insercao)
+
+
+def _data_rss(data: datetime) -> str:
+    """Data no formato RFC 822 usado pelo rss; as datas da base estão em UTC"""
+    return format_datetime(data.replace(tzinfo=timezone.utc, microsecond=0))
+
+
+def _texto(nome: str, valor: Optional[str]) -> str:
+    return f"<{nome}>{escape(valor or '')}</{nome}>"
+
+
+def renderiza_episodio(episodio: Episodio) -> bytes:
+    """Gera o <item> de um episódio, com os mesmos campos lidos na importação"""
+    tipo = mimetypes.guess_type(episodio.audio or "")[0] or "audio/mpeg"
+    guid = episodio.guid or f"episodio-{episodio.id}"
+
+    partes = [
+        "<item>",
+        _texto("title", episodio.titulo),
+        _texto("description", episodio.descricao),
+        f'<guid isPermaLink="false">{escape(guid)}</guid>',
+        f"<enclosure url={quoteattr(episodio.audio or '')} type={quoteattr(tipo)} length=\"0\"/>",
+        _texto("pubDate", _data_rss(episodio.data_insercao)),
+    ]
+    if episodio.capa:
+        partes.append(f"<itunes:image href={quoteattr(episodio.capa)}/>")
+    partes.append("</item>\n")
+
+    return "".join(partes).encode()
+
+
+def _cabecalho(profile: Optional[Profile], link: str, atualizado_em: datetime) -> bytes:
+    partes = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<rss version="2.0" xmlns:itunes="{ITUNES}">\n<channel>\n',
+        _texto("title", profile.nome if profile else ""),
+        _texto("link", link),
+        _texto("description", profile.descricao if profile else ""),
+        _texto("lastBuildDate", _data_rss(atualizado_em)),
+    ]
+    if profile and profile.autor:
+        partes.append(_texto("itunes:author", profile.autor))
+    if profile and profile.capa:
+        partes.append(f"<itunes:image href={quoteattr(profile.capa)}/>")
+    partes.append("\n")
+
+    return "".join(partes).encode()
+
+
+_RODAPE = b"</channel>\n</rss>\n"
+
+
+class FeedPublicado:
+    """Gera o feed rss do catálogo, a partir do Profile e dos Episodio.
+
+    O <item> de cada episódio é guardado em memória com o momento da sua última
+    alteração; a cada geração só os episódios novos ou alterados são lidos por
+    completo da base e renderizados. A resposta inteira fica no cache de
+    respostas até a próxima escrita.
+    """
+
+    def __init__(self, tamanho_lote: int = PUBLICACAO_TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        # id do episódio -> (momento da última alteração, <item> renderizado)
+        self._fragmentos: Dict[int, Tuple[datetime, bytes]] = {}
+        # momento em que este processo percebeu a última remoção de episódios
+        self._removido_em: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def gera(self, session, link: str) -> Tuple[bytes, datetime]:
+        """Retorna o xml do feed e o momento da sua última alteração"""
+        with self._lock:
+            profile = session.query(Profile).first()
+
+            # dos mais novos aos mais antigos, como na listagem
+            versoes = (
+                session.query(Episodio.id, _versao)
+                .order_by(Episodio.data_insercao.desc(), Episodio.id.desc())
+                .all()
+            )
+
+            alterados = [
+                episodio_id
+                for episodio_id, versao in versoes
+                if self._fragmentos.get(episodio_id, (None,))[0] != versao
+            ]
+
+            for lote in em_lotes(alterados, self.tamanho_lote):
+                episodios = session.query(Episodio).filter(Episodio.id.in_(lote))
+                for episodio in episodios:
+                    versao = episodio.data_atualizacao or episodio.data_insercao
+                    self._fragmentos[episodio.id] = (versao, renderiza_episodio(episodio))
+
+            atuais = {episodio_id for episodio_id, _ in versoes}
+            if len(self._fragmentos) > len(atuais):
+                # descarta os episódios removidos desde a última geração
+                self._fragmentos = {
+                    episodio_id: fragmento
+                    for episodio_id, fragmento in self._fragmentos.items()
+                    if episodio_id in atuais
+                }
+                self._removido_em = datetime.utcnow()
+
+            datas = [versao for _, versao in versoes]
+            if profile:
+                datas.append(profile.data_insercao)
+            if self._removido_em:
+                datas.append(self._removido_em)
+            atualizado_em = max(datas, default=datetime(1970, 1, 1))
+
+            corpo = b"".join(
+                [
+                    _cabecalho(profile, link, atualizado_em),
+                    *(self._fragmentos[episodio_id][1] for episodio_id, _ in versoes),
+                    _RODAPE,
+                ]
+            )
+
+        return corpo, atualizado_em
+
+
+# feed compartilhado pelas requisições deste processo
+feed_publicado = FeedPublicado()
@@ -0,0 +1,118 @@
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, Optional
+
+ITUNES = "{http://www.itunes.com/dtds/podcast-1.0.dtd}"
+
+
+class FormatoNaoSuportadoError(Exception):
+    """O documento não é um rss 2.0, como um feed Atom ou RDF"""
+
+
+def _texto(elemento: Optional[ET.Element]) -> str:
+    if elemento is None or elemento.text is None:
+        return ""
+    return elemento.text.strip()
+
+
+def _item_para_episodio(item: ET.Element) -> dict:
+    """Converte um <item> no dicionário de colunas de um Episodio, com os mesmos
+    campos lidos pelo feedparser: title, summary, image href, enclosure e guid
+    """
+    descricao = _texto(item.find("description")) or _texto(item.find(ITUNES + "summary"))
+    imagem = item.find(ITUNES + "image")
+    enclosure = item.find("enclosure")
+    audio = enclosure.get("url", "") if enclosure is not None else ""
+
+    return {
+        "titulo": _texto(item.find("title")),
+        "descricao": descricao,
+        # se não tiver uma capa, fica vazio
+        "capa": imagem.get("href", "") if imagem is not None else "",
+        "audio": audio,
+        # sem <guid>, o endereço do áudio identifica a entrada
+        "guid": _texto(item.find("guid")) or audio or None,
+    }
+
+
+class LeitorRss:
+    """Lê um feed rss 2.0 de forma incremental, uma entrada por vez.
+
+    Cada <item> é descartado assim que convertido, então a memória usada não
+    depende do tamanho do feed. O documento é lido duas vezes: `inicia` o
+    percorre inteiro, validando o xml e preenchendo em `canal` os dados do canal,
+    no formato das colunas de Profile, mesmo que apareçam depois dos itens;
+    `entradas` volta ao início e lê os itens. Assim um documento malformado é
+    recusado antes de qualquer episódio ser gravado. O arquivo deve permitir seek.
+
+    Uso:
+        leitor = LeitorRss(arquivo).inicia()
+        for episodio in leitor.entradas():
+            ...
+    """
+
+    def __init__(self, arquivo: IO[bytes]):
+        self.canal = {"nome": "", "autor": "", "descricao": "", "capa": ""}
+        self._arquivo = arquivo
+        self._inicio = arquivo.tell()
+
+    def inicia(self) -> "LeitorRss":
+        """Lê o documento inteiro, sem guardar os itens, e os dados do canal.
+
+        Lança FormatoNaoSuportadoError se o documento não for um rss 2.0 e
+        xml.etree.ElementTree.ParseError se o xml for inválido.
+        """
+        for elemento in self._filhos_do_canal():
+            if elemento.tag != "item":
+                self._le_canal(elemento)
+
+        return self
+
+    def entradas(self) -> Iterator[dict]:
+        """Retorna os episódios do feed, à medida que são lidos"""
+        self._arquivo.seek(self._inicio)
+
+        for elemento in self._filhos_do_canal():
+            if elemento.tag == "item":
+                yield _item_para_episodio(elemento)
+
+    def _filhos_do_canal(self) -> Iterator[ET.Element]:
+        eventos = ET.iterparse(self._arquivo, events=("start", "end"))
+        _, raiz = next(eventos)
+        if raiz.tag != "rss":
+            raise FormatoNaoSuportadoError(f"Formato de feed não suportado: {raiz.tag}")
+
+        # elementos abertos, da raiz até o atual
+        pilha = [raiz]
+        canal = None
+
+        for evento, elemento in eventos:
+            if evento == "start":
+                pilha.append(elemento)
+                if elemento.tag == "channel" and len(pilha) == 2:
+                    canal = elemento
+                continue
+
+            pilha.pop()
+
+            # apenas os filhos diretos do canal; os demais são lidos pelo pai
+            if canal is None or not pilha or pilha[-1] is not canal:
+                continue
+
+            yield elemento
+
+            # descarta o elemento já lido, mantendo o canal sem filhos
+            canal.remove(elemento)
+
+    def _le_canal(self, elemento: ET.Element):
+        if elemento.tag == "title":
+            self.canal["nome"] = _texto(elemento)
+        elif elemento.tag == ITUNES + "author":
+            self.canal["autor"] = _texto(elemento)
+        elif elemento.tag == "description":
+            self.canal["descricao"] = _texto(elemento)
+        elif elemento.tag == ITUNES + "summary" and not self.canal["descricao"]:
+            self.canal["descricao"] = _texto(elemento)
+        elif elemento.tag == ITUNES + "image":
+            self.canal["capa"] = elemento.get("href", "")
+        elif elemento.tag == "image" and not self.canal["capa"]:
+            self.canal["capa"] = _texto(elemento.find("url"))
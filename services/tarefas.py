@@ -0,0 +1,148 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from sqlalchemy import func
+
+from config import IMPORTACAO_FILA, IMPORTACAO_WORKERS
+from model import Feed, Importacao, Session
+from logger import logger
+from services.importacao import (
+    FeedObtido,
+    condicoes_busca,
+    grava_feed,
+    mensagem_falha,
+    obtem_feed,
+)
+
+# pool limitado de threads que executam as importações fora das requisições
+executor = ThreadPoolExecutor(
+    max_workers=IMPORTACAO_WORKERS, thread_name_prefix="importacao"
+)
+
+# limita quantas importações podem estar em execução ou aguardando na fila
+_vagas = threading.BoundedSemaphore(IMPORTACAO_WORKERS + IMPORTACAO_FILA)
+
+
+class FilaCheiaError(Exception):
+    """Não há vaga na fila de importações"""
+
+
+def enfileira_importacao(
+    importacao_id: int, tamanho_lote: int, forcar: bool = False, sincronizar: bool = False
+):
+    """Agenda a execução da Importacao no pool de workers.
+    Lança FilaCheiaError se a fila estiver cheia.
+    """
+    if not _vagas.acquire(blocking=False):
+        raise FilaCheiaError("Fila de importações cheia, tente novamente mais tarde")
+
+    future = executor.submit(
+        executa_importacao, importacao_id, tamanho_lote, forcar, sincronizar
+    )
+    future.add_done_callback(lambda _: _vagas.release())
+
+
+def inicia_importacao(importacao_id: int, forcar: bool = False) -> Tuple[str, dict]:
+    """Marca a Importacao como em execução e retorna o endereço do feed e as
+    condições da busca
+    """
+    session = Session()
+
+    try:
+        importacao = session.query(Importacao).filter(
+            Importacao.id == importacao_id
+        ).one()
+        importacao.status = "executando"
+
+        estado = session.query(Feed).filter(Feed.url == importacao.feed).one_or_none()
+        url, condicoes = importacao.feed, condicoes_busca(estado, forcar)
+        session.commit()
+
+        logger.debug("Executando importação %s do feed %s", importacao_id, url)
+
+        return url, condicoes
+
+    finally:
+        Session.remove()
+
+
+def conclui_importacao(
+    importacao_id: int,
+    tamanho_lote: int,
+    sincronizar: bool = False,
+    obtido: Optional[FeedObtido] = None,
+    erro: Optional[Exception] = None,
+):
+    """Grava o feed obtido e registra na Importacao o andamento, as contagens e
+    os erros, ou o `erro` da busca do feed
+    """
+    session = Session()
+
+    try:
+        importacao = session.query(Importacao).filter(
+            Importacao.id == importacao_id
+        ).one()
+
+        def progresso(**contagens):
+            # grava o andamento para ser consultado em GET /importacoes/<id>
+            for campo, valor in contagens.items():
+                setattr(importacao, campo, valor)
+            session.commit()
+
+        try:
+            if erro is not None:
+                raise erro
+
+            resultado = grava_feed(
+                session,
+                obtido,
+                tamanho_lote,
+                sincronizar=sincronizar,
+                progresso=progresso,
+            )
+
+            importacao.status = "concluida"
+            importacao.adicionados = len(resultado["episodios"])
+            importacao.atualizados = resultado["atualizados"]
+            importacao.inalterado = resultado["inalterado"]
+            importacao.erros = json.dumps(
+                [falha["message"] for falha in resultado["erros"]]
+            )
+
+        except Exception as e:
+            session.rollback()
+
+            logger.warning("Erro na importação %s: %s", importacao_id, e)
+
+            importacao.status = "erro"
+            importacao.erros = json.dumps([mensagem_falha(e)])
+
+        importacao.data_conclusao = func.now()
+        session.commit()
+
+    except Exception:
+        logger.exception("Não foi possível registrar a importação %s", importacao_id)
+        session.rollback()
+
+    finally:
+        Session.remove()
+
+
+def executa_importacao(
+    importacao_id: int, tamanho_lote: int, forcar: bool = False, sincronizar: bool = False
+):
+    """Executa a Importacao, gravando o andamento, as contagens e os erros"""
+    try:
+        url, condicoes = inicia_importacao(importacao_id, forcar)
+    except Exception:
+        logger.exception("Não foi possível registrar a importação %s", importacao_id)
+        return
+
+    try:
+        obtido, erro = obtem_feed(url, **condicoes), None
+    except Exception as e:
+        obtido, erro = None, e
+
+    conclui_importacao(importacao_id, tamanho_lote, sincronizar, obtido, erro)
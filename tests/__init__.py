@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from xml.sax.saxutils import escape
+
+# a base dos testes é um sqlite temporário, e as capas ficam ao lado; precisam
+# ser definidos antes de importar o config e o model, que criam a engine na importação
+diretorio_base = tempfile.mkdtemp(prefix="testes-")
+os.environ["DB_URL"] = "sqlite:///%s" % os.path.join(diretorio_base, "db.sqlite3")
+os.environ["CAPAS_DIRETORIO"] = os.path.join(diretorio_base, "capas")
+
+from model import (  # noqa: E402
+    Capa,
+    Episodio,
+    Feed,
+    Importacao,
+    Profile,
+    Session,
+    SessionLeitura,
+    engine,
+    init_db,
+)
+from services.cache import cache_respostas  # noqa: E402
+
+init_db(engine)
+
+
+class TesteBase(unittest.TestCase):
+    """Teste com a base vazia a cada caso"""
+
+    def setUp(self):
+        session = Session()
+        for modelo in (Capa, Episodio, Feed, Importacao, Profile):
+            session.query(modelo).delete()
+        session.commit()
+        cache_respostas.invalida()
+
+    def tearDown(self):
+        Session.remove()
+        SessionLeitura.remove()
+
+    def cria_episodio(self, titulo: str, audio: str = None, **campos) -> int:
+        """Grava um episódio com o `titulo` e retorna o seu id"""
+        session = Session()
+        episodio = Episodio(
+            titulo=titulo,
+            audio=audio or "https://example.com/%s.mp3" % titulo,
+            capa="https://example.com/capa.jpg",
+            descricao="Descrição de %s" % titulo,
+            **campos,
+        )
+        session.add(episodio)
+        session.commit()
+        return episodio.id
+
+
+def rss(titulo: str, itens: List[str]) -> bytes:
+    """Feed rss 2.0 com o canal `titulo` e os episódios `itens`, pelo título"""
+    entradas = "".join(
+        """<item>
+<title>{titulo}</title>
+<guid isPermaLink="false">{guid}</guid>
+<description>Descrição de {titulo}</description>
+<enclosure url="https://example.com/{guid}.mp3" length="1000" type="audio/mpeg"/>
+</item>
+""".format(titulo=escape(item), guid=hashlib.sha1(item.encode()).hexdigest())
+        for item in itens
+    )
+    return (
+        """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+<title>{titulo}</title>
+<description>Feed de {titulo}</description>
+{entradas}</channel></rss>
+""".format(titulo=escape(titulo), entradas=entradas)
+    ).encode("utf-8")
+
+
+class ServidorFeeds:
+    """Servidor http local que serve feeds aos testes de importação.
+
+    `feeds` associa o caminho ao conteúdo. As respostas levam o ETag do
+    conteúdo, exceto com `sem_etag`, e respondem 304 a um If-None-Match igual.
+    `requisicoes` guarda o caminho e os cabeçalhos de cada requisição.
+    """
+
+    def __init__(self):
+        self.feeds = {}
+        self.sem_etag = False
+        self.requisicoes = []
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.requisicoes.append((self.path, dict(self.headers)))
+
+                conteudo = servidor.feeds.get(self.path)
+                if conteudo is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                etag = '"%s"' % hashlib.sha1(conteudo).hexdigest()
+                if not servidor.sem_etag and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(conteudo)))
+                if not servidor.sem_etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Tratador)
+        threading.Thread(
+            target=self._http.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        ).start()
+
+    def url(self, caminho: str) -> str:
+        return "http://127.0.0.1:%d%s" % (self._http.server_port, caminho)
+
+    def encerra(self):
+        self._http.shutdown()
+        self._http.server_close()
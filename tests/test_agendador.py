@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from config import (
+    AGENDADOR_BACKOFF_MAX,
+    AGENDADOR_INTERVALO_MAX,
+    AGENDADOR_INTERVALO_MIN,
+)
+from model import Episodio, Feed, Session
+from services.agendador import (
+    ajusta_intervalo,
+    atualiza_feed,
+    com_jitter,
+    espera_apos_falha,
+    reserva_feeds,
+)
+from tests import ServidorFeeds, TesteBase, rss
+
+
+def feed(intervalo: int = None, falhas: int = 0, data_novidade: datetime = None) -> Feed:
+    estado = Feed(url="https://example.com/feed")
+    estado.intervalo, estado.falhas, estado.data_novidade = intervalo, falhas, data_novidade
+    return estado
+
+
+class TesteIntervalos(TesteBase):
+    """Cálculo do intervalo entre as atualizações de um feed"""
+
+    agora = datetime(2024, 1, 1, 12)
+
+    def test_sem_novidade_o_intervalo_cresce(self):
+        self.assertEqual(ajusta_intervalo(feed(4000), 0, self.agora), 6000)
+        self.assertEqual(ajusta_intervalo(feed(80000), 0, self.agora), AGENDADOR_INTERVALO_MAX)
+
+    def test_com_novidade_segue_a_frequencia_de_publicacao(self):
+        anterior = self.agora - timedelta(hours=4)
+
+        self.assertEqual(ajusta_intervalo(feed(86400, data_novidade=anterior), 3, self.agora), 7200)
+        # a primeira novidade mantém o intervalo
+        self.assertEqual(ajusta_intervalo(feed(5000), 1, self.agora), 5000)
+
+        recente = self.agora - timedelta(minutes=10)
+        self.assertEqual(
+            ajusta_intervalo(feed(5000, data_novidade=recente), 1, self.agora),
+            AGENDADOR_INTERVALO_MIN,
+        )
+
+    def test_espera_dobra_a_cada_falha(self):
+        esperas = [espera_apos_falha(feed(1000, falhas)) for falhas in range(4)]
+
+        self.assertEqual(esperas, [1000, 2000, 4000, 8000])
+        self.assertEqual(espera_apos_falha(feed(1000, 20)), AGENDADOR_BACKOFF_MAX)
+
+    def test_jitter_limitado(self):
+        for _ in range(100):
+            segundos = com_jitter(1000, 0.1).total_seconds()
+            self.assertTrue(900 <= segundos <= 1100)
+
+
+class TesteAgendador(TesteBase):
+    """Reserva e atualização dos feeds com a verificação vencida"""
+
+    def cria_feed(self, url: str, proxima_verificacao: datetime, intervalo: int = 3600):
+        session = Session()
+        estado = Feed(url=url)
+        estado.intervalo = intervalo
+        estado.proxima_verificacao = proxima_verificacao
+        session.add(estado)
+        session.commit()
+
+    def test_reserva_os_mais_atrasados_uma_vez(self):
+        agora = datetime.utcnow()
+        self.cria_feed("https://example.com/recente", agora - timedelta(minutes=1))
+        self.cria_feed("https://example.com/atrasado", agora - timedelta(hours=1))
+        self.cria_feed("https://example.com/futuro", agora + timedelta(hours=1))
+
+        self.assertEqual(
+            reserva_feeds(Session(), 5),
+            ["https://example.com/atrasado", "https://example.com/recente"],
+        )
+        # reservados, não são entregues de novo
+        self.assertEqual(reserva_feeds(Session(), 5), [])
+
+    def test_atualizacao_com_falha_e_com_sucesso(self):
+        servidor = ServidorFeeds()
+        url = servidor.url("/feed")
+        self.cria_feed(url, datetime.utcnow(), intervalo=1000)
+        try:
+            # o feed ainda não existe no servidor
+            atualiza_feed(url)
+            estado = Session().query(Feed).one()
+            espera = (estado.proxima_verificacao - datetime.utcnow()).total_seconds()
+            self.assertEqual(estado.falhas, 1)
+            self.assertTrue(1700 < espera <= 2200)
+            Session.remove()
+
+            servidor.feeds["/feed"] = rss("Podcast", ["Episódio"])
+            atualiza_feed(url)
+        finally:
+            servidor.encerra()
+
+        estado = Session().query(Feed).one()
+        self.assertEqual(estado.falhas, 0)
+        self.assertIsNotNone(estado.data_novidade)
+        self.assertEqual(Session().query(Episodio).count(), 1)
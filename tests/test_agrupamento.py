@@ -0,0 +1,81 @@
+import threading
+from unittest import mock
+
+from sqlalchemy import event
+
+from model import Episodio, Session
+from services.agrupamento import AgrupadorInsercoes
+from tests import TesteBase
+
+
+def novo_episodio(titulo: str, audio: str = None) -> Episodio:
+    return Episodio(
+        titulo=titulo,
+        audio=audio or "https://example.com/%s.mp3" % titulo,
+        capa="https://example.com/capa.jpg",
+        descricao="Descrição de %s" % titulo,
+    )
+
+
+class TesteAgrupamento(TesteBase):
+    """Inserções simultâneas gravadas em grupo"""
+
+    def setUp(self):
+        super().setUp()
+        # janela longa o bastante para todas as inserções caírem no mesmo grupo
+        self.agrupador = AgrupadorInsercoes(janela=1, lote_max=4)
+
+    def insere_juntos(self, *episodios) -> dict:
+        """Insere os episódios em threads simultâneas; retorna o status por título"""
+        status = {}
+
+        def insere(episodio):
+            titulo = episodio.titulo
+            status[titulo] = self.agrupador.insere(episodio)[1]
+
+        threads = [threading.Thread(target=insere, args=(episodio,)) for episodio in episodios]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return status
+
+    def test_duplicados_recebem_409(self):
+        self.cria_episodio("Existente")
+
+        status = self.insere_juntos(
+            novo_episodio("Novo"),
+            novo_episodio("existente", "https://example.com/Existente.mp3"),
+            novo_episodio("Outro"),
+            novo_episodio("OUTRO ", "https://example.com/Outro.mp3"),
+        )
+
+        self.assertEqual(status, {"Novo": 200, "existente": 409, "Outro": 200, "OUTRO ": 409})
+        self.assertEqual(Session().query(Episodio).count(), 3)
+
+    def test_conflito_ao_gravar_isola_o_episodio(self):
+        def planeja_com_escrita_concorrente(session, grupo):
+            # outro processo grava o mesmo episódio entre a verificação e o commit
+            self.cria_episodio("Concorrente")
+            return list(grupo)
+
+        with mock.patch.object(
+            self.agrupador, "_planeja", side_effect=planeja_com_escrita_concorrente
+        ):
+            status = self.insere_juntos(novo_episodio("Concorrente"), novo_episodio("Novo"))
+
+        self.assertEqual(status, {"Concorrente": 409, "Novo": 200})
+
+    def test_erro_inesperado_nao_falha_o_grupo(self):
+        def falha(mapper, conexao, episodio):
+            if episodio.titulo == "Inválido":
+                raise ValueError("erro ao gravar")
+
+        event.listen(Episodio, "before_insert", falha)
+        try:
+            status = self.insere_juntos(novo_episodio("Inválido"), novo_episodio("Válido"))
+        finally:
+            event.remove(Episodio, "before_insert", falha)
+
+        self.assertEqual(status, {"Inválido": 400, "Válido": 200})
+        self.assertEqual([titulo for titulo, in Session().query(Episodio.titulo)], ["Válido"])
@@ -0,0 +1,63 @@
+from starlette.testclient import TestClient
+
+from asgi import create_asgi_app
+from model import Episodio, Session
+from tests import ServidorFeeds, TesteBase, rss
+
+
+class TesteAsgi(TesteBase):
+    """Endpoints do modo ASGI e o repasse das demais rotas ao app WSGI"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.contexto = TestClient(create_asgi_app())
+        cls.cliente = cls.contexto.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.contexto.__exit__(None, None, None)
+
+    def test_leituras_assincronas(self):
+        episodio_id = self.cria_episodio("Episódio")
+
+        lista = self.cliente.get("/episodios", params={"fields": "id,titulo"})
+        episodio = self.cliente.get("/episodios/%d" % episodio_id)
+        inexistente = self.cliente.get("/episodios/999999")
+
+        self.assertEqual(lista.json()["episodios"], [{"id": episodio_id, "titulo": "Episódio"}])
+        self.assertEqual(episodio.json()["titulo"], "Episódio")
+        self.assertEqual(inexistente.status_code, 404)
+        self.assertEqual(self.cliente.get("/episodios", params={"limit": 0}).status_code, 422)
+
+    def test_demais_rotas_vao_para_o_app_wsgi(self):
+        # o mesmo caminho da listagem, com outro método
+        resposta = self.cliente.post(
+            "/episodios",
+            data={
+                "titulo": "Pela API",
+                "audio": "https://example.com/api.mp3",
+                "capa": "https://example.com/capa.jpg",
+                "descricao": "Criado pelo app WSGI",
+            },
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(Session().query(Episodio.titulo).scalar(), "Pela API")
+
+    def test_importa_feeds(self):
+        servidor = ServidorFeeds()
+        servidor.feeds["/feed"] = rss("Podcast", ["Episódio 1", "Episódio 2"])
+        try:
+            resposta = self.cliente.post(
+                "/importacoes/feeds", data={"feeds": [servidor.url("/feed")]}
+            )
+        finally:
+            servidor.encerra()
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.json()["importacoes"][0]["episodios"]), 2)
+
+        recusado = self.cliente.post(
+            "/importacoes/feeds", data={"feeds": ["ftp://example.com/feed"]}
+        )
+        self.assertEqual(recusado.status_code, 422)
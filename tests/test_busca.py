@@ -0,0 +1,65 @@
+import unittest
+
+from app import create_app
+from model import termos_busca
+from tests import TesteBase
+
+
+class TesteTermosBusca(unittest.TestCase):
+    """Conversão do texto digitado em uma consulta FTS5"""
+
+    def test_termos_entre_aspas_e_ultimo_por_prefixo(self):
+        self.assertEqual(termos_busca("nerd  cast"), '"nerd" "cast"*')
+
+    def test_sintaxe_do_fts5_e_tratada_como_texto(self):
+        self.assertEqual(termos_busca('a"b OR c*'), '"a""b" "OR" "c*"*')
+
+    def test_texto_vazio(self):
+        self.assertEqual(termos_busca("   "), "")
+
+
+class TesteBuscaEpisodios(TesteBase):
+    """Busca textual em GET /episodios/busca"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def busca(self, q: str, **query):
+        return self.cliente.get("/episodios/busca", query_string={"q": q, **query})
+
+    def titulos(self, resposta) -> list:
+        return [episodio["titulo"] for episodio in resposta.json["episodios"]]
+
+    def test_busca_por_prefixo_e_sem_acentos(self):
+        self.cria_episodio("Dragões e masmorras")
+        self.cria_episodio("Ciência do espaço")
+
+        self.assertEqual(self.titulos(self.busca("drago")), ["Dragões e masmorras"])
+        self.assertEqual(self.titulos(self.busca("ciencia espa")), ["Ciência do espaço"])
+
+    def test_operadores_e_caracteres_especiais_nao_geram_erro(self):
+        self.cria_episodio("Episódio OR especial")
+
+        for q in ('"', "OR", "NOT", "a AND", "(x", "-", "*", "titulo:x", "^"):
+            resposta = self.busca(q)
+            self.assertEqual(resposta.status_code, 200, q)
+
+        self.assertEqual(self.titulos(self.busca("or espec")), ["Episódio OR especial"])
+
+    def test_paginacao(self):
+        for numero in range(3):
+            self.cria_episodio("Podcast %d" % numero)
+
+        primeira = self.busca("podcast", limit=2)
+        segunda = self.busca("podcast", limit=2, offset=2)
+
+        self.assertEqual(len(primeira.json["episodios"]), 2)
+        self.assertEqual(len(segunda.json["episodios"]), 1)
+        self.assertEqual(
+            set(self.titulos(primeira) + self.titulos(segunda)),
+            {"Podcast 0", "Podcast 1", "Podcast 2"},
+        )
+
+    def test_sem_termos(self):
+        self.assertEqual(self.busca(" ").status_code, 400)
@@ -0,0 +1,67 @@
+from sqlalchemy import text
+
+from app import create_app
+from model import engine
+from tests import TesteBase
+
+
+class TesteCacheRespostas(TesteBase):
+    """Cache de respostas e ETags dos GETs de episódios"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def titulos(self, resposta) -> list:
+        return [episodio["titulo"] for episodio in resposta.json["episodios"]]
+
+    def test_etag_igual_responde_304(self):
+        self.cria_episodio("Episódio")
+
+        resposta = self.cliente.get("/episodios")
+        etag = resposta.headers["ETag"]
+
+        repetida = self.cliente.get("/episodios", headers={"If-None-Match": etag})
+
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(repetida.headers["ETag"], etag)
+        self.assertEqual(repetida.get_data(), b"")
+
+    def test_escrita_pela_api_invalida(self):
+        self.cliente.post("/episodios", data=episodio_form("Primeiro"))
+        etag = self.cliente.get("/episodios").headers["ETag"]
+
+        self.cliente.post("/episodios", data=episodio_form("Segundo"))
+        resposta = self.cliente.get("/episodios", headers={"If-None-Match": etag})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self.titulos(resposta), ["Segundo", "Primeiro"])
+
+    def test_escrita_de_outro_processo_invalida(self):
+        self.cria_episodio("Primeiro")
+        resposta = self.cliente.get("/episodios")
+        etag = resposta.headers["ETag"]
+
+        # escrita direta na base, sem passar pelo cache deste processo, como a
+        # de outro worker ou do agendador
+        with engine.begin() as conexao:
+            conexao.execute(
+                text(
+                    "INSERT INTO episodio (titulo, audio, data_insercao) "
+                    "VALUES ('Externo', 'https://example.com/externo.mp3', '2999-01-01 00:00:00')"
+                )
+            )
+
+        resposta = self.cliente.get("/episodios", headers={"If-None-Match": etag})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self.titulos(resposta), ["Externo", "Primeiro"])
+
+
+def episodio_form(titulo: str) -> dict:
+    return {
+        "titulo": titulo,
+        "audio": "https://example.com/%s.mp3" % titulo,
+        "capa": "https://example.com/capa.jpg",
+        "descricao": "Descrição de %s" % titulo,
+    }
@@ -0,0 +1,55 @@
+from sqlalchemy import event
+
+from app import create_app
+from model import engine
+from tests import TesteBase
+
+
+class TesteCamposEpisodio(TesteBase):
+    """Parâmetro fields= dos endpoints de leitura de episódios"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        self.episodio_id = self.cria_episodio("Episódio")
+
+    def test_retorna_so_os_campos_pedidos(self):
+        for url, query in (("/episodios", {}), ("/episodios/busca", {"q": "episodio"})):
+            query["fields"] = "titulo, id,titulo"
+            resposta = self.cliente.get(url, query_string=query)
+            self.assertEqual(
+                resposta.json["episodios"], [{"titulo": "Episódio", "id": self.episodio_id}]
+            )
+
+        resposta = self.cliente.get(
+            "/episodios/%d" % self.episodio_id, query_string={"fields": "capa"}
+        )
+        self.assertEqual(resposta.json, {"capa": "https://example.com/capa.jpg"})
+
+    def test_consulta_so_as_colunas_pedidas(self):
+        comandos = []
+
+        def guarda(conexao, cursor, comando, *args):
+            comandos.append(comando)
+
+        event.listen(engine, "before_cursor_execute", guarda)
+        try:
+            self.cliente.get("/episodios", query_string={"fields": "id,titulo"})
+        finally:
+            event.remove(engine, "before_cursor_execute", guarda)
+
+        consulta = next(comando for comando in comandos if "FROM episodio" in comando)
+        self.assertNotIn("descricao", consulta)
+
+    def test_campos_invalidos(self):
+        for fields in ("senha", "id,nao_existe", ",", ""):
+            resposta = self.cliente.get("/episodios", query_string={"fields": fields})
+            self.assertEqual(resposta.status_code, 422, fields)
+
+        resposta = self.cliente.get(
+            "/episodios/%d" % self.episodio_id, query_string={"fields": "guid"}
+        )
+        self.assertEqual(resposta.status_code, 422)
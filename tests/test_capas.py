@@ -0,0 +1,101 @@
+import io
+import tempfile
+from unittest import mock
+
+from PIL import Image
+
+from app import create_app
+from model import Capa, Session
+from services.capas import CacheCapas, CapaInvalidaError, cache_capas
+from tests import TesteBase, diretorio_base
+
+URL_CAPA = "https://example.com/capa.jpg"
+
+
+def imagem(cor: str = "red", lado: int = 800) -> bytes:
+    conteudo = io.BytesIO()
+    Image.new("RGB", (lado, lado), cor).save(conteudo, "PNG")
+    return conteudo.getvalue()
+
+
+class TesteCapas(TesteBase):
+    """Capas servidas a partir do cache local"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        self.buscas = []
+
+        def busca(url):
+            self.buscas.append(url)
+            return imagem()
+
+        patch = mock.patch.object(cache_capas, "_buscador", busca)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_capa_desconhecida_nao_e_buscada(self):
+        resposta = self.cliente.get("/capas", query_string={"url": "https://example.com/outra.jpg"})
+
+        self.assertEqual(resposta.status_code, 404)
+        self.assertEqual(self.buscas, [])
+
+    def test_redireciona_para_a_capa_no_cache(self):
+        # cria_episodio usa URL_CAPA como capa
+        self.cria_episodio("Episódio")
+
+        primeira = self.cliente.get("/capas", query_string={"url": URL_CAPA})
+        segunda = self.cliente.get("/capas", query_string={"url": URL_CAPA, "tamanho": 100})
+
+        hash_conteudo = Session().query(Capa.hash_conteudo).scalar()
+        self.assertEqual(primeira.status_code, 302)
+        self.assertTrue(primeira.location.endswith("/capas/%s/original" % hash_conteudo))
+        self.assertTrue(segunda.location.endswith("/capas/%s/100" % hash_conteudo))
+        # a capa é buscada na origem uma única vez
+        self.assertEqual(self.buscas, [URL_CAPA])
+
+        resposta = self.cliente.get("/capas/%s/100" % hash_conteudo)
+        self.assertEqual(resposta.mimetype, "image/jpeg")
+        with Image.open(io.BytesIO(resposta.data)) as miniatura:
+            self.assertEqual(miniatura.size, (100, 100))
+        resposta.close()
+
+        resposta = self.cliente.get("/capas/%s/150" % hash_conteudo)
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_falha_na_busca(self):
+        self.cria_episodio("Episódio")
+
+        with mock.patch.object(cache_capas, "_buscador", side_effect=CapaInvalidaError("erro")):
+            resposta = self.cliente.get("/capas", query_string={"url": URL_CAPA})
+
+        self.assertEqual(resposta.status_code, 502)
+        self.assertEqual(Session().query(Capa).count(), 0)
+
+
+class TesteCacheCapas(TesteBase):
+    """Limite de espaço do cache de capas em disco"""
+
+    def test_remove_as_menos_usadas_e_busca_de_novo(self):
+        cores = {"https://example.com/%d.png" % i: cor for i, cor in enumerate(["red", "blue"])}
+        buscas = []
+
+        def busca(url):
+            buscas.append(url)
+            return imagem(cores[url], lado=200)
+
+        diretorio = tempfile.mkdtemp(dir=diretorio_base)
+        # cabe só uma capa
+        cache = CacheCapas(diretorio, len(imagem(lado=200)) * 1.5, [100], busca)
+        session = Session()
+
+        primeira, segunda = (cache.obtem(session, url) for url in cores)
+        arquivo = cache.arquivo(session, primeira.hash_conteudo, "original")
+
+        self.assertNotEqual(primeira.hash_conteudo, segunda.hash_conteudo)
+        self.assertEqual(buscas, list(cores) + ["https://example.com/0.png"])
+        with open(arquivo.caminho, "rb") as original:
+            self.assertEqual(original.read(), imagem("red", lado=200))
@@ -0,0 +1,92 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+import brotli
+
+from app import create_app
+from services.compressao import escolhe_codificacao
+from tests import TesteBase
+
+
+class TesteNegociacao(unittest.TestCase):
+    """Escolha da codificação pelo Accept-Encoding"""
+
+    def test_pesos_e_preferencia(self):
+        casos = {
+            None: None,
+            "": None,
+            "identity": None,
+            "gzip": "gzip",
+            "gzip, deflate, br": "br",
+            "br;q=0.5, gzip": "gzip",
+            "br;q=0, gzip;q=0": None,
+            "*": "br",
+            "*;q=0.1, gzip;q=0": "br",
+            "GZIP;q=invalido, br": "br",
+        }
+
+        for accept_encoding, esperada in casos.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(escolhe_codificacao(accept_encoding), esperada)
+
+    def test_sem_brotli_usa_gzip(self):
+        with mock.patch("services.compressao.brotli", None):
+            self.assertEqual(escolhe_codificacao("br, gzip;q=0.5"), "gzip")
+            self.assertIsNone(escolhe_codificacao("br"))
+
+
+class TesteCompressao(TesteBase):
+    """Respostas comprimidas conforme o cliente aceitar"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        # a listagem passa do tamanho mínimo comprimido
+        for numero in range(20):
+            self.cria_episodio("Episódio %d" % numero)
+        self.original = self.cliente.get("/episodios", query_string={"limit": 20})
+
+    def test_sem_accept_encoding_vai_sem_compressao(self):
+        self.assertNotIn("Content-Encoding", self.original.headers)
+        self.assertIn("Accept-Encoding", self.original.headers["Vary"])
+        self.assertEqual(len(self.original.json["episodios"]), 20)
+
+    def test_comprime_com_a_codificacao_aceita(self):
+        for codificacao, descomprime in (("gzip", gzip.decompress), ("br", brotli.decompress)):
+            with self.subTest(codificacao=codificacao):
+                resposta = self.cliente.get(
+                    "/episodios",
+                    query_string={"limit": 20},
+                    headers={"Accept-Encoding": codificacao},
+                )
+
+                self.assertEqual(resposta.headers["Content-Encoding"], codificacao)
+                self.assertEqual(descomprime(resposta.data), self.original.data)
+                # cada variante tem o seu ETag
+                etag = resposta.headers["ETag"]
+                self.assertNotEqual(etag, self.original.headers["ETag"])
+
+                condicional = self.cliente.get(
+                    "/episodios",
+                    query_string={"limit": 20},
+                    headers={"Accept-Encoding": codificacao, "If-None-Match": etag},
+                )
+                self.assertEqual(condicional.status_code, 304)
+
+    def test_respostas_pequenas_nao_sao_comprimidas(self):
+        resposta = self.cliente.get("/profile", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn("Content-Encoding", resposta.headers)
+
+    def test_exportacao_comprimida_aos_poucos(self):
+        resposta = self.cliente.get("/episodios/exportacao", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(resposta.headers["Content-Encoding"], "gzip")
+        linhas = gzip.decompress(resposta.get_data()).splitlines()
+        self.assertEqual(len([json.loads(linha) for linha in linhas]), 20)
@@ -0,0 +1,58 @@
+from app import create_app
+from model import Episodio, Session, assinatura_episodio
+from tests import TesteBase
+
+
+class TesteAssinatura(TesteBase):
+    """Episódios duplicados identificados pelo título e pelo áudio normalizados"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def adiciona(self, titulo: str, audio: str):
+        return self.cliente.post(
+            "/episodios",
+            data={"titulo": titulo, "audio": audio, "descricao": "Descrição de %s" % titulo},
+        )
+
+    def test_normalizacao(self):
+        assinatura = assinatura_episodio("Episódio 1", "https://example.com/1.mp3")
+        iguais = [("  EPISÓDIO   1 ", "HTTPS://Example.com/1.mp3#inicio")]
+        # o caminho do áudio diferencia maiúsculas
+        diferentes = [
+            ("Episódio 1", "https://example.com/2.mp3"),
+            ("Episódio 1", "https://example.com/1.MP3"),
+        ]
+
+        for titulo, audio in iguais:
+            self.assertEqual(assinatura_episodio(titulo, audio), assinatura)
+        for titulo, audio in diferentes:
+            self.assertNotEqual(assinatura_episodio(titulo, audio), assinatura)
+
+    def test_duplicado_pela_api(self):
+        self.assertEqual(self.adiciona("Episódio", "https://example.com/1.mp3").status_code, 200)
+
+        duplicado = self.adiciona(" episódio", "https://EXAMPLE.com/1.mp3")
+        outro_audio = self.adiciona("Episódio", "https://example.com/2.mp3")
+
+        self.assertEqual(duplicado.status_code, 409)
+        self.assertEqual(outro_audio.status_code, 200)
+        self.assertEqual(Session().query(Episodio).count(), 2)
+
+    def test_atualizacao_para_um_duplicado(self):
+        self.cria_episodio("Primeiro", "https://example.com/1.mp3")
+        segundo_id = self.cria_episodio("Segundo", "https://example.com/2.mp3")
+
+        resposta = self.cliente.put(
+            "/episodios/%d" % segundo_id,
+            data={"titulo": "PRIMEIRO", "audio": "https://example.com/1.mp3", "descricao": "-"},
+        )
+        # manter o próprio título e áudio não é duplicado
+        mesmo = self.cliente.put(
+            "/episodios/%d" % segundo_id,
+            data={"titulo": "Segundo", "audio": "https://example.com/2.mp3", "descricao": "-"},
+        )
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(mesmo.status_code, 200)
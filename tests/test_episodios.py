@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from app import create_app
+from tests import TesteBase
+
+
+class TestePaginacao(TesteBase):
+    """Listagem de episódios paginada por cursor"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def lista_todos(self, limit: int) -> list:
+        """Percorre todas as páginas e retorna os ids na ordem recebida"""
+        ids, cursor = [], None
+        while True:
+            query = {"limit": limit}
+            if cursor:
+                query["cursor"] = cursor
+            resposta = self.cliente.get("/episodios", query_string=query)
+            self.assertEqual(resposta.status_code, 200)
+
+            ids.extend(episodio["id"] for episodio in resposta.json["episodios"])
+            cursor = resposta.json["proximo_cursor"]
+            if not cursor:
+                return ids
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        # episódios com a mesma data de inserção são desempatados pelo id
+        data = datetime(2024, 1, 1)
+        criados = [self.cria_episodio("Episódio %d" % i, data_insercao=data) for i in range(5)]
+        criados.append(self.cria_episodio("Mais novo", data_insercao=datetime(2024, 2, 1)))
+
+        ids = self.lista_todos(limit=2)
+
+        self.assertEqual(ids, [criados[-1]] + sorted(criados[:-1], reverse=True))
+
+    def test_cursor_invalido(self):
+        resposta = self.cliente.get("/episodios", query_string={"cursor": "invalido"})
+
+        self.assertEqual(resposta.status_code, 400)
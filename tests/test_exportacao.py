@@ -0,0 +1,51 @@
+import json
+
+from app import create_app
+from model import Session
+from services.exportacao import exporta_json, exporta_ndjson
+from tests import TesteBase
+
+
+class TesteExportacao(TesteBase):
+    """Exportação do catálogo em GET /episodios/exportacao"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def test_ndjson_no_formato_da_api(self):
+        ids = [self.cria_episodio("Episódio %d" % numero) for numero in range(3)]
+
+        resposta = self.cliente.get("/episodios/exportacao")
+
+        self.assertEqual(resposta.mimetype, "application/x-ndjson")
+        self.assertTrue(resposta.is_streamed)
+        linhas = [json.loads(linha) for linha in resposta.get_data().splitlines()]
+        self.assertEqual(
+            linhas, [self.cliente.get("/episodios/%d" % id_).json for id_ in ids]
+        )
+
+    def test_json(self):
+        for numero in range(3):
+            self.cria_episodio("Episódio %d" % numero)
+
+        resposta = self.cliente.get("/episodios/exportacao", query_string={"formato": "json"})
+
+        self.assertEqual(resposta.mimetype, "application/json")
+        titulos = [episodio["titulo"] for episodio in resposta.json["episodios"]]
+        self.assertEqual(titulos, ["Episódio 0", "Episódio 1", "Episódio 2"])
+
+    def test_catalogo_vazio(self):
+        resposta = self.cliente.get("/episodios/exportacao", query_string={"formato": "json"})
+
+        self.assertEqual(resposta.json, {"episodios": []})
+
+    def test_gerado_em_lotes(self):
+        for numero in range(5):
+            self.cria_episodio("Episódio %d" % numero)
+
+        partes = list(exporta_ndjson(Session(), tamanho_lote=2))
+        self.assertEqual([parte.count(b"\n") for parte in partes], [2, 2, 1])
+
+        corpo = b"".join(exporta_json(Session(), tamanho_lote=2))
+        self.assertEqual(len(json.loads(corpo)["episodios"]), 5)
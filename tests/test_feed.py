@@ -0,0 +1,120 @@
+import io
+import os
+
+from app import create_app
+from model import Episodio, Feed, Session
+from services.feed import EnderecoFeedInvalidoError, busca_feed
+from services.importacao import importa_feed
+from tests import ServidorFeeds, TesteBase, diretorio_base, rss
+
+
+class TesteBuscaCondicional(TesteBase):
+    """Feeds não modificados desde a última importação não são gravados de novo"""
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorFeeds()
+        self.servidor.feeds["/feed"] = rss("Podcast", ["Episódio 2", "Episódio 1"])
+        self.url = self.servidor.url("/feed")
+
+    def tearDown(self):
+        self.servidor.encerra()
+        super().tearDown()
+
+    def importa(self, **opcoes) -> dict:
+        return importa_feed(Session(), self.url, 10, **opcoes)
+
+    def test_etag_igual_responde_inalterado(self):
+        primeira = self.importa()
+        segunda = self.importa()
+
+        self.assertEqual((len(primeira["episodios"]), primeira["inalterado"]), (2, False))
+        self.assertEqual((segunda["episodios"], segunda["inalterado"]), ([], True))
+
+        _, cabecalhos = self.servidor.requisicoes[-1]
+        self.assertEqual(cabecalhos["If-None-Match"], Session().query(Feed.etag).scalar())
+
+    def test_conteudo_igual_sem_etag_responde_inalterado(self):
+        self.servidor.sem_etag = True
+
+        self.importa()
+        segunda = self.importa()
+
+        self.assertTrue(segunda["inalterado"])
+
+    def test_feed_modificado_e_importado(self):
+        self.importa()
+        self.servidor.feeds["/feed"] = rss("Podcast", ["Episódio 3", "Episódio 2", "Episódio 1"])
+
+        resultado = self.importa()
+
+        self.assertFalse(resultado["inalterado"])
+        self.assertEqual([e["titulo"] for e in resultado["episodios"]], ["Episódio 3"])
+
+    def test_forcar_ignora_o_estado(self):
+        self.importa()
+
+        resultado = self.importa(forcar=True)
+
+        self.assertFalse(resultado["inalterado"])
+        self.assertNotIn("If-None-Match", self.servidor.requisicoes[-1][1])
+        self.assertEqual(len(resultado["erros"]), 2)
+        self.assertEqual(Session().query(Episodio).count(), 2)
+
+
+class TesteEnderecoFeed(TesteBase):
+    """Só urls http(s) são buscadas a partir da API"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        self.caminho = os.path.join(diretorio_base, "feed.xml")
+        with open(self.caminho, "wb") as arquivo:
+            arquivo.write(rss("Local", ["Episódio"]))
+
+    def test_busca_recusa_caminhos_locais(self):
+        for url in (self.caminho, "file://" + self.caminho, "ftp://example.com/feed"):
+            with self.assertRaises(EnderecoFeedInvalidoError):
+                busca_feed(url)
+
+    def test_arquivo_local_so_com_a_opcao_explicita(self):
+        resposta = busca_feed(self.caminho, arquivo_local=True)
+        try:
+            self.assertIn(b"<title>Local</title>", resposta.arquivo.read())
+        finally:
+            resposta.fecha()
+
+    def test_endpoints_recusam_caminhos_locais(self):
+        resposta = self.cliente.post("/importacoes/feeds", data={"feeds": [self.caminho]})
+        self.assertEqual(resposta.status_code, 422)
+
+        resposta = self.cliente.post("/importacoes/feed-rss", data={"feed": self.caminho})
+        self.assertEqual(resposta.status_code, 422)
+
+    def test_caminho_no_opml_nao_e_lido(self):
+        opml = (
+            '<opml version="2.0"><body><outline xmlUrl="%s"/></body></opml>' % self.caminho
+        ).encode()
+
+        resposta = self.cliente.post(
+            "/importacoes/feeds", data={"opml": (io.BytesIO(opml), "feeds.opml")}
+        )
+
+        relatorio = resposta.json["importacoes"][0]
+        self.assertEqual(relatorio["message"], str(EnderecoFeedInvalidoError()))
+        self.assertEqual(Session().query(Episodio).count(), 0)
+
+    def test_erro_da_busca_nao_expoe_detalhes(self):
+        servidor = ServidorFeeds()
+        try:
+            url = servidor.url("/nao-existe")
+            resposta = self.cliente.post("/importacoes/feeds", data={"feeds": [url]})
+        finally:
+            servidor.encerra()
+
+        self.assertEqual(
+            resposta.json["importacoes"][0]["message"], "Não foi possível buscar o feed"
+        )
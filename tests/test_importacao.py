@@ -0,0 +1,140 @@
+from sqlalchemy import event
+
+from model import Episodio, Session, engine
+from services.importacao import importa_episodios
+from tests import TesteBase
+
+
+def entrada(titulo: str, guid: str = None, audio: str = None) -> dict:
+    """Entrada de feed no formato de entrada_para_episodio"""
+    return {
+        "titulo": titulo,
+        "descricao": "Descrição de %s" % titulo,
+        "capa": "https://example.com/capa.jpg",
+        "audio": audio or "https://example.com/%s.mp3" % titulo,
+        "guid": guid,
+    }
+
+
+class Consumo:
+    """Iterável de entradas que conta quantas foram lidas"""
+
+    def __init__(self, entradas: list):
+        self.entradas = entradas
+        self.lidas = 0
+
+    def __iter__(self):
+        for item in self.entradas:
+            self.lidas += 1
+            yield dict(item)
+
+
+class TesteImportacao(TesteBase):
+    """Importação dos episódios de um feed"""
+
+    def importa(self, entradas, tamanho_lote: int = 2, **opcoes):
+        return importa_episodios(Session(), entradas, tamanho_lote, **opcoes)
+
+    def test_importa_todos_os_episodios_em_lotes(self):
+        entradas = [entrada("Episódio %d" % i) for i in range(25)]
+        consultas = []
+
+        def conta(conexao, cursor, comando, *args):
+            if comando.lstrip().upper().startswith("SELECT"):
+                consultas.append(comando)
+
+        event.listen(engine, "before_cursor_execute", conta)
+        try:
+            adicionados, atualizados, erros = self.importa(entradas, tamanho_lote=10)
+        finally:
+            event.remove(engine, "before_cursor_execute", conta)
+
+        self.assertEqual(len(adicionados), 25)
+        self.assertEqual((atualizados, erros), (0, []))
+        # a verificação dos duplicados é feita por lote, e não por episódio
+        self.assertLessEqual(len(consultas), 3 * 3)
+
+    def test_episodios_ja_importados_sao_erros(self):
+        self.importa([entrada("Primeiro"), entrada("Segundo")])
+
+        adicionados, _, erros = self.importa(
+            [entrada("Terceiro"), entrada("Primeiro"), entrada("Segundo")]
+        )
+
+        self.assertEqual([episodio.titulo for episodio in adicionados], ["Terceiro"])
+        self.assertEqual(
+            erros,
+            [
+                {"message": "Episódio com título 'Primeiro' já existe"},
+                {"message": "Episódio com título 'Segundo' já existe"},
+            ],
+        )
+
+    def test_duplicados_no_mesmo_lote_e_entre_lotes(self):
+        entradas = [
+            entrada("Episódio", audio="https://example.com/1.mp3"),
+            # mesmo título e áudio a menos de maiúsculas e espaços, no mesmo lote
+            entrada("  episódio ", audio="https://example.com/1.mp3"),
+            entrada("Outro"),
+            # repete o primeiro em outro lote
+            entrada("EPISÓDIO", audio="https://example.com/1.mp3"),
+        ]
+
+        adicionados, _, erros = self.importa(entradas, tamanho_lote=2)
+
+        self.assertEqual([episodio.titulo for episodio in adicionados], ["Episódio", "Outro"])
+        self.assertEqual(len(erros), 2)
+        self.assertEqual(Session().query(Episodio).count(), 2)
+
+    def test_mesmo_titulo_com_outro_audio_nao_e_duplicado(self):
+        entradas = [
+            entrada("Episódio", audio="https://example.com/1.mp3"),
+            entrada("Episódio", audio="https://example.com/2.mp3"),
+        ]
+
+        adicionados, _, erros = self.importa(entradas)
+
+        self.assertEqual((len(adicionados), erros), (2, []))
+
+    def test_sincronizar_para_no_primeiro_episodio_importado(self):
+        antigos = [entrada("Antigo %d" % i, "antigo-%d" % i) for i in range(6)]
+        self.importa(Consumo(antigos), feed_id=1)
+
+        # os feeds listam os episódios mais novos primeiro
+        feed = Consumo([entrada("Novo 1", "novo-1"), entrada("Novo 2", "novo-2")] + antigos)
+        adicionados, atualizados, erros = self.importa(feed, sincronizar=True, feed_id=1)
+
+        self.assertEqual([episodio.titulo for episodio in adicionados], ["Novo 1", "Novo 2"])
+        self.assertEqual((atualizados, erros), (0, []))
+        # lê só o lote em que encontrou o primeiro episódio já importado
+        self.assertEqual(feed.lidas, 4)
+
+    def test_sincronizar_atualiza_episodio_editado(self):
+        self.importa([entrada("Original", "guid-1")], feed_id=1)
+
+        editado = entrada("Editado", "guid-1")
+        adicionados, atualizados, _ = self.importa([editado], sincronizar=True, feed_id=1)
+
+        self.assertEqual((adicionados, atualizados), ([], 1))
+        self.assertEqual([e.titulo for e in Session().query(Episodio)], ["Editado"])
+
+    def test_guid_unico_por_feed(self):
+        self.importa([entrada("Do feed A", "1")], feed_id=1)
+        adicionados, _, erros = self.importa([entrada("Do feed B", "1")], feed_id=2)
+
+        self.assertEqual([episodio.titulo for episodio in adicionados], ["Do feed B"])
+        self.assertEqual(erros, [])
+
+        # o mesmo guid no feed A continua reconhecido como já importado
+        adicionados, _, _ = self.importa([entrada("Do feed A", "1")], sincronizar=True, feed_id=1)
+        self.assertEqual(adicionados, [])
+        self.assertEqual(Session().query(Episodio).count(), 2)
+
+    def test_episodio_da_api_passa_a_ser_do_feed(self):
+        episodio_id = self.cria_episodio("Criado pela API")
+
+        _, _, erros = self.importa([entrada("Criado pela API", "guid-1")], feed_id=1)
+
+        self.assertEqual(len(erros), 1)
+        episodio = Session().query(Episodio).get(episodio_id)
+        self.assertEqual((episodio.feed_id, episodio.guid), (1, "guid-1"))
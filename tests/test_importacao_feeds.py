@@ -0,0 +1,81 @@
+import io
+
+from app import create_app
+from model import Episodio, Session
+from tests import ServidorFeeds, TesteBase, rss
+
+
+class TesteImportacaoFeeds(TesteBase):
+    """Importação de vários feeds em POST /importacoes/feeds"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorFeeds()
+        for numero in range(3):
+            self.servidor.feeds["/feed-%d" % numero] = rss(
+                "Podcast %d" % numero, ["Feed %d episódio %d" % (numero, i) for i in range(3)]
+            )
+
+    def tearDown(self):
+        self.servidor.encerra()
+        super().tearDown()
+
+    def importa(self, urls, **campos):
+        return self.cliente.post(
+            "/importacoes/feeds", data={"feeds": urls, "concorrencia": 2, **campos}
+        )
+
+    def test_relatorio_por_feed_na_ordem_recebida(self):
+        urls = [self.servidor.url("/feed-%d" % numero) for numero in (2, 0, 1)]
+        falha = self.servidor.url("/nao-existe")
+
+        resposta = self.importa(urls[:2] + [falha, urls[0]] + urls[2:])
+
+        self.assertEqual(resposta.status_code, 200)
+        relatorios = resposta.json["importacoes"]
+        # endereços repetidos são importados uma vez
+        self.assertEqual([r["feed"] for r in relatorios], urls[:2] + [falha] + urls[2:])
+        self.assertEqual([len(r["episodios"]) for r in relatorios], [3, 3, 0, 3])
+        self.assertIsNotNone(relatorios[2]["message"])
+        self.assertEqual(Session().query(Episodio).count(), 9)
+
+    def test_feeds_inalterados_na_segunda_importacao(self):
+        urls = [self.servidor.url("/feed-%d" % numero) for numero in range(3)]
+        self.importa(urls)
+
+        relatorios = self.importa(urls).json["importacoes"]
+
+        self.assertEqual([r["inalterado"] for r in relatorios], [True, True, True])
+
+    def test_feeds_do_opml(self):
+        opml = (
+            '<opml version="2.0"><body>'
+            '<outline text="Podcasts"><outline xmlUrl="%s"/></outline>'
+            "</body></opml>" % self.servidor.url("/feed-1")
+        ).encode()
+
+        resposta = self.cliente.post(
+            "/importacoes/feeds",
+            data={
+                "feeds": [self.servidor.url("/feed-0")],
+                "opml": (io.BytesIO(opml), "feeds.opml"),
+            },
+        )
+
+        self.assertEqual(
+            [r["feed"] for r in resposta.json["importacoes"]],
+            [self.servidor.url("/feed-0"), self.servidor.url("/feed-1")],
+        )
+
+    def test_opml_invalido_e_sem_feeds(self):
+        resposta = self.cliente.post(
+            "/importacoes/feeds", data={"opml": (io.BytesIO(b"<opml"), "feeds.opml")}
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.cliente.post("/importacoes/feeds", data={})
+        self.assertEqual(resposta.status_code, 400)
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import tests
+
+IMPORTA_MODEL = """
+import logging, threading
+import model, services.importacao
+print(len(logging.getLogger().handlers), threading.active_count())
+"""
+
+
+class TesteLogger(unittest.TestCase):
+    """O logging só é configurado pelo app, e não na importação do model"""
+
+    def test_importar_o_model_nao_configura_o_logging(self):
+        saida = subprocess.run(
+            [sys.executable, "-c", IMPORTA_MODEL],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(tests.__file__))),
+            env=os.environ,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        # sem handlers no logger raiz e sem a thread do QueueListener
+        self.assertEqual(saida.split(), ["0", "1"])
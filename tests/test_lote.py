@@ -0,0 +1,123 @@
+from unittest import mock
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from model import Episodio, Session, engine
+from services import lote
+from tests import TesteBase
+
+
+def episodio(titulo: str, audio: str = None) -> dict:
+    return {
+        "titulo": titulo,
+        "audio": audio or "https://example.com/%s.mp3" % titulo,
+        "capa": "https://example.com/capa.jpg",
+        "descricao": "Descrição de %s" % titulo,
+    }
+
+
+class TesteLote(TesteBase):
+    """Lote de operações de episódio, aplicado em ordem"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def aplica(self, *operacoes) -> list:
+        resposta = self.cliente.post("/episodios/lote", json={"operacoes": list(operacoes)})
+        self.assertEqual(resposta.status_code, 200)
+        return [(resultado["status"], resultado["id"]) for resultado in resposta.json["resultados"]]
+
+    def titulos(self) -> list:
+        return sorted(titulo for titulo, in Session().query(Episodio.titulo))
+
+    def test_operacoes_enxergam_as_anteriores_do_lote(self):
+        existente_id = self.cria_episodio("Existente")
+
+        resultados = self.aplica(
+            {"acao": "remover", "id": existente_id},
+            # o título acabou de ser liberado pela remoção
+            {"acao": "criar", "episodio": episodio("Existente")},
+            {"acao": "criar", "episodio": episodio("Novo")},
+            # repete o anterior, a menos de maiúsculas
+            {"acao": "criar", "episodio": episodio("NOVO", "https://example.com/Novo.mp3")},
+        )
+
+        self.assertEqual([status for status, _ in resultados], [200, 200, 200, 409])
+        self.assertEqual(self.titulos(), ["Existente", "Novo"])
+
+    def test_atualizacao_em_cadeia_no_mesmo_lote(self):
+        primeiro_id = self.cria_episodio("Primeiro")
+        segundo_id = self.cria_episodio("Segundo")
+
+        resultados = self.aplica(
+            # ainda em uso pelo segundo
+            {"acao": "atualizar", "id": primeiro_id, "episodio": episodio("Segundo")},
+            {"acao": "atualizar", "id": segundo_id, "episodio": episodio("Terceiro")},
+            {"acao": "atualizar", "id": primeiro_id, "episodio": episodio("Segundo")},
+            {"acao": "remover", "id": 999999},
+        )
+
+        self.assertEqual(
+            resultados,
+            [(409, primeiro_id), (200, segundo_id), (200, primeiro_id), (404, 999999)],
+        )
+        self.assertEqual(self.titulos(), ["Segundo", "Terceiro"])
+
+    def test_aplicacao_individual_apos_falha_em_massa(self):
+        existente_id = self.cria_episodio("Existente")
+        falha = IntegrityError("INSERT", {}, Exception("conflito"))
+
+        with mock.patch("services.lote._aplica_em_massa", side_effect=falha):
+            resultados = self.aplica(
+                {"acao": "criar", "episodio": episodio("Novo")},
+                {
+                    "acao": "criar",
+                    "episodio": episodio("existente", "https://example.com/Existente.mp3"),
+                },
+                {"acao": "atualizar", "id": existente_id, "episodio": episodio("Novo")},
+                {"acao": "atualizar", "id": existente_id, "episodio": episodio("Outro")},
+            )
+
+        self.assertEqual([status for status, _ in resultados], [200, 409, 409, 200])
+        self.assertEqual(self.titulos(), ["Novo", "Outro"])
+
+    def test_atualizar_e_remover_o_mesmo_episodio(self):
+        episodio_id = self.cria_episodio("Existente")
+
+        resultados = self.aplica(
+            {"acao": "atualizar", "id": episodio_id, "episodio": episodio("Atualizado")},
+            {"acao": "remover", "id": episodio_id},
+            # o título da atualização descartada está livre
+            {"acao": "criar", "episodio": episodio("Atualizado")},
+        )
+
+        self.assertEqual([status for status, _ in resultados], [200, 200, 200])
+        self.assertEqual(self.titulos(), ["Atualizado"])
+
+    def test_episodio_removido_por_outra_escrita(self):
+        removido_id = self.cria_episodio("Removido")
+        # um episódio mais novo impede que o sqlite reaproveite o id removido
+        self.cria_episodio("Mantido")
+        planeja = lote._planeja
+
+        def planeja_e_remove(session, operacoes):
+            planejado = planeja(session, operacoes)
+            # outro processo remove o episódio entre o planejamento e a gravação
+            with engine.begin() as conexao:
+                conexao.execute(
+                    text("DELETE FROM episodio WHERE pk_episodio = :id"), {"id": removido_id}
+                )
+            return planejado
+
+        with mock.patch("services.lote._planeja", side_effect=planeja_e_remove):
+            resultados = self.aplica(
+                {"acao": "criar", "episodio": episodio("Novo")},
+                {"acao": "atualizar", "id": removido_id, "episodio": episodio("Outro")},
+            )
+
+        self.assertEqual(resultados[0][0], 200)
+        self.assertEqual(resultados[1], (404, removido_id))
+        self.assertEqual(self.titulos(), ["Mantido", "Novo"])
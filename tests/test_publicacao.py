@@ -0,0 +1,91 @@
+import io
+from unittest import mock
+
+from app import create_app
+from services import publicacao
+from services.publicacao import FeedPublicado
+from services.rss import LeitorRss
+from tests import TesteBase
+
+
+class TesteFeedPublicado(TesteBase):
+    """Feed rss do catálogo em /feed.xml, regenerado só onde mudou"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        # os fragmentos guardados não passam de um teste para outro
+        patch = mock.patch("app.feed_publicado", FeedPublicado(tamanho_lote=2))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.renderizados = []
+        renderiza = publicacao.renderiza_episodio
+
+        def conta(episodio):
+            self.renderizados.append(episodio.titulo)
+            return renderiza(episodio)
+
+        patch = mock.patch("services.publicacao.renderiza_episodio", side_effect=conta)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def titulos(self) -> list:
+        resposta = self.cliente.get("/feed.xml")
+        self.assertEqual(resposta.mimetype, "application/rss+xml")
+        leitor = LeitorRss(io.BytesIO(resposta.data)).inicia()
+        return [episodio["titulo"] for episodio in leitor.entradas()]
+
+    def altera(self, episodio_id: int, titulo: str):
+        resposta = self.cliente.put(
+            "/episodios/%d" % episodio_id,
+            data={
+                "titulo": titulo,
+                "descricao": "Descrição de %s" % titulo,
+                "audio": "https://example.com/%s.mp3" % titulo,
+            },
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_so_os_episodios_alterados_sao_renderizados(self):
+        ids = [self.cria_episodio("Episódio %d" % numero) for numero in range(3)]
+        self.assertEqual(sorted(self.titulos()), ["Episódio 0", "Episódio 1", "Episódio 2"])
+        self.renderizados.clear()
+
+        self.altera(ids[1], "Alterado")
+        titulos = self.titulos()
+
+        self.assertIn("Alterado", titulos)
+        self.assertNotIn("Episódio 1", titulos)
+        self.assertEqual(self.renderizados, ["Alterado"])
+
+    def test_episodios_novos_e_removidos(self):
+        ids = [self.cria_episodio("Episódio %d" % numero) for numero in range(2)]
+        self.titulos()
+        self.renderizados.clear()
+
+        self.cliente.delete("/episodios/%d" % ids[0])
+        self.cria_episodio("Novo")
+
+        self.assertEqual(sorted(self.titulos()), ["Episódio 1", "Novo"])
+        self.assertEqual(self.renderizados, ["Novo"])
+
+    def test_em_cache_ate_a_proxima_escrita(self):
+        episodio_id = self.cria_episodio("Episódio")
+        primeira = self.cliente.get("/feed.xml")
+
+        condicional = self.cliente.get(
+            "/feed.xml", headers={"If-None-Match": primeira.headers["ETag"]}
+        )
+        self.assertEqual(condicional.status_code, 304)
+
+        self.altera(episodio_id, "Alterado")
+        resposta = self.cliente.get(
+            "/feed.xml", headers={"If-None-Match": primeira.headers["ETag"]}
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn(b"<title>Alterado</title>", resposta.data)
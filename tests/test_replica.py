@@ -0,0 +1,49 @@
+import os
+
+from app import create_app
+from model import Episodio, Session, SessionLeitura, cria_engine, engine, init_db
+from tests import TesteBase, diretorio_base
+
+
+class TesteReplica(TesteBase):
+    """Leituras na réplica e escritas na base principal"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+        cls.replica = cria_engine("sqlite:///%s" % os.path.join(diretorio_base, "replica.sqlite3"))
+        init_db(cls.replica)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.replica.dispose()
+
+    def setUp(self):
+        super().setUp()
+        with self.replica.begin() as conexao:
+            conexao.exec_driver_sql("DELETE FROM episodio")
+
+    def test_sessao_de_leitura_recusa_escrita(self):
+        episodio_id = self.cria_episodio("Original")
+        session = SessionLeitura()
+        session.query(Episodio).get(episodio_id).titulo = "Alterado"
+
+        with self.assertRaises(RuntimeError):
+            session.commit()
+
+        session.rollback()
+        self.assertEqual(Session().query(Episodio.titulo).scalar(), "Original")
+
+    def test_leituras_vao_para_a_replica(self):
+        self.cria_episodio("Na base principal")
+        SessionLeitura.remove()
+        SessionLeitura.configure(bind=self.replica)
+        try:
+            resposta = self.cliente.get("/episodios")
+        finally:
+            SessionLeitura.remove()
+            SessionLeitura.configure(bind=engine)
+
+        # a réplica ainda não recebeu o episódio
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json["episodios"], [])
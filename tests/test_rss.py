@@ -0,0 +1,42 @@
+import io
+
+from model import Episodio, Profile, Session
+from services.importacao import importa_feed
+from services.rss import LeitorRss
+from tests import ServidorFeeds, TesteBase, rss
+
+
+class TesteLeitorRss(TesteBase):
+    """Leitura incremental de feeds rss 2.0"""
+
+    def test_titulo_do_canal_depois_dos_itens(self):
+        feed = rss("", ["Episódio 1", "Episódio 2"]).replace(
+            b"</channel>", b"<title>Podcast</title></channel>"
+        )
+
+        leitor = LeitorRss(io.BytesIO(feed)).inicia()
+
+        self.assertEqual(leitor.canal["nome"], "Podcast")
+        self.assertEqual(
+            [episodio["titulo"] for episodio in leitor.entradas()], ["Episódio 1", "Episódio 2"]
+        )
+
+    def test_erro_no_meio_do_feed_usa_o_feedparser(self):
+        itens = ["Episodio %d" % i for i in range(1, 6)]
+        # xml malformado depois dos primeiros itens
+        feed = rss("Podcast", itens).replace(
+            b"<title>Episodio 4</title>", b"<title>Episodio 4 & 5</title>"
+        )
+        servidor = ServidorFeeds()
+        servidor.feeds["/feed"] = feed
+        try:
+            # lotes de um episódio: sem a validação prévia, os primeiros já estariam gravados
+            resultado = importa_feed(Session(), servidor.url("/feed"), 1)
+        finally:
+            servidor.encerra()
+
+        importados = [episodio["titulo"] for episodio in resultado["episodios"]]
+        self.assertEqual(importados, itens[:3] + ["Episodio 4 & 5", "Episodio 5"])
+        self.assertEqual(resultado["erros"], [])
+        self.assertEqual(Session().query(Episodio).count(), 5)
+        self.assertEqual(Session().query(Profile.nome).scalar(), "Podcast")
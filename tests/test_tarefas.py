@@ -0,0 +1,73 @@
+import time
+from unittest import mock
+
+from app import create_app
+from model import Importacao, Session
+from tests import ServidorFeeds, TesteBase, rss
+
+
+class TesteImportacaoSegundoPlano(TesteBase):
+    """Importação agendada em POST /importacoes/feed-rss e acompanhada pelo status"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cliente = create_app().test_client()
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorFeeds()
+
+    def tearDown(self):
+        self.servidor.encerra()
+        super().tearDown()
+
+    def aguarda(self, importacao_id: int) -> dict:
+        """Consulta o status da importação até que ela termine"""
+        limite = time.monotonic() + 10
+        while time.monotonic() < limite:
+            status = self.cliente.get("/importacoes/%d" % importacao_id).json
+            if status["status"] in ("concluida", "erro"):
+                return status
+            time.sleep(0.02)
+        self.fail("a importação %d não terminou" % importacao_id)
+
+    def test_importacao_concluida(self):
+        self.servidor.feeds["/feed"] = rss("Podcast", ["Episódio 2", "Episódio 1"])
+
+        resposta = self.cliente.post(
+            "/importacoes/feed-rss", data={"feed": self.servidor.url("/feed")}
+        )
+
+        self.assertEqual(resposta.status_code, 202)
+        status = self.aguarda(resposta.json["id"])
+        self.assertEqual(status["status"], "concluida")
+        self.assertEqual((status["total"], status["processados"]), (2, 2))
+        self.assertEqual((status["adicionados"], status["erros"]), (2, []))
+        self.assertIsNotNone(status["data_conclusao"])
+
+    def test_importacao_com_erro(self):
+        self.servidor.feeds["/feed"] = b"<html>sem feed</html>"
+
+        resposta = self.cliente.post(
+            "/importacoes/feed-rss", data={"feed": self.servidor.url("/feed")}
+        )
+
+        status = self.aguarda(resposta.json["id"])
+        self.assertEqual(status["status"], "erro")
+        self.assertEqual(status["erros"], ["Feed RSS inválido ou inacessível"])
+
+    def test_fila_cheia(self):
+        with mock.patch("services.tarefas._vagas") as vagas:
+            vagas.acquire.return_value = False
+            resposta = self.cliente.post(
+                "/importacoes/feed-rss", data={"feed": self.servidor.url("/feed")}
+            )
+
+        self.assertEqual(resposta.status_code, 503)
+        # a importação que não pôde ser agendada não fica registrada
+        self.assertEqual(Session().query(Importacao).count(), 0)
+
+    def test_importacao_inexistente(self):
+        resposta = self.cliente.get("/importacoes/999999")
+
+        self.assertEqual(resposta.status_code, 404)